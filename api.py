@@ -0,0 +1,379 @@
+"""
+Headless HTTP API over the logic/ modules, for ERP and other integrations.
+
+Endpoints (JSON in, JSON out):
+    GET  /health
+    POST /parse                 {"text": "...", "save": false}       -> parsed RFQ (and id when saved)
+    POST /search                {"query": "...", "threshold": 0.5, "limit": 5}
+    GET  /rfqs/{id}/bid-tab     ?currency=USD                        -> lines, bids, supplier totals
+    POST /rfqs/bid-tab          {"rfq_ids": [1, 2, 3]}               -> bid tab over the distinct items of several RFQs
+    POST /rfqs/{id}/award       {"selection": {"1": quote_id, "2": null}} or {"auto": {...}}
+    POST /rfqs/{id}/email       {"instructions": "..."}              -> draft built from saved awards
+
+The bid tabs, award and email read quotes from the last QUOTE_WINDOW_MONTHS; pass
+window_months (0 = all current quotes) or include_archived=true to change that.
+Archived quotes only appear in the bid tabs, never as award candidates.
+
+Handlers are async; the blocking Supabase/Gemini work runs on a bounded thread
+pool (API_THREADS), and Supabase clients come from the same per-credential pool
+as the app, so HTTP connections are kept alive between requests.
+
+Configuration: SUPABASE_URL / SUPABASE_ANON_KEY, GOOGLE_API_KEY, BASE_CURRENCY,
+PROCUREMIND_API_TOKEN (optional; when set, requests need "Authorization: Bearer <token>").
+
+Usage:
+    uvicorn api:app --host 0.0.0.0 --port 8000
+    python api.py --port 8000
+"""
+import os
+import hmac
+import json
+import math
+import logging
+import argparse
+import functools
+import anyio
+import pandas as pd
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+import logic.parser as parser
+import logic.embeddings as embeddings
+from logic.database import TABLE_RFQS, SupabaseClientPool
+from logic.analysis import fetch_candidate_quotes, build_bid_tab
+from logic.consolidate import build_consolidated_bid_tab, merge_rfq_lines
+from logic.award import candidate_bids, solve_award
+from logic.embedding_store import search_products
+from logic.finalize import RECAP_COLUMNS, line_candidates, select_lines
+from logic.prompts import PromptTooLarge
+from logic.quote_archive import QUOTE_WINDOW_MONTHS, months_ago
+from logic.fx import load_fx_rates, latest_rates, normalize_quotes, SUPPORTED_CURRENCIES
+from logic.scorecard import load_awards, save_awards
+from logic.uom import load_uom_conversions
+
+API_THREADS = int(os.getenv("API_THREADS", "32"))
+API_TOKEN = os.getenv("PROCUREMIND_API_TOKEN")
+
+# The logic modules read settings through Streamlit; outside `streamlit run` that
+# works but warns once per worker thread
+for name in ("streamlit.runtime.scriptrunner_utils.script_run_context", "streamlit.runtime.state.session_state_proxy",
+             "streamlit.runtime.caching.cache_data_api", "streamlit.runtime.caching.cache_resource_api"):
+    logging.getLogger(name).setLevel(logging.ERROR)
+
+def records(df: pd.DataFrame):
+    """
+    DataFrame -> list of JSON-safe dicts (NaN -> null, dates as ISO strings).
+    """
+    return json.loads(df.to_json(orient="records", date_format="iso"))
+
+def env_client_factory():
+    pool = SupabaseClientPool()
+    def get_client():
+        url, key = os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_ANON_KEY")
+        if not url or not key:
+            raise HTTPException(503, "Supabase is not configured (SUPABASE_URL / SUPABASE_ANON_KEY)")
+        return pool.get(url, key)
+    return get_client
+
+async def run_blocking(request: Request, fn, *args, **kwargs):
+    return await anyio.to_thread.run_sync(functools.partial(fn, *args, **kwargs), limiter=request.app.state.limiter)
+
+async def read_json(request: Request):
+    try:
+        body = await request.json()
+    except ValueError:
+        raise HTTPException(400, "Request body must be JSON")
+    if not isinstance(body, dict):
+        raise HTTPException(400, "Request body must be a JSON object")
+    return body
+
+def base_currency(value):
+    currency = str(value or os.getenv("BASE_CURRENCY", "USD")).upper()
+    if currency not in SUPPORTED_CURRENCIES:
+        raise HTTPException(400, f"Unsupported currency {currency}")
+    return currency
+
+def quote_scope(params):
+    """
+    (since, include_archived) from query parameters or a JSON body.
+    """
+    if str(params.get("include_archived", "")).lower() in ("1", "true", "yes"):
+        return None, True
+    try:
+        months = int(params.get("window_months", QUOTE_WINDOW_MONTHS))
+    except (TypeError, ValueError):
+        raise HTTPException(400, "'window_months' must be an integer")
+    return (months_ago(months) if months > 0 else None), False
+
+def number(value, name: str, default: float):
+    """
+    A finite float from a request field, else a 400.
+    """
+    try:
+        result = float(default if value is None else value)
+    except (TypeError, ValueError):
+        result = math.nan
+    if not math.isfinite(result):
+        raise HTTPException(400, f"'{name}' must be a number")
+    return result
+
+def integer(value, name: str, default: int):
+    try:
+        return int(default if value is None else value)
+    except (TypeError, ValueError):
+        raise HTTPException(400, f"'{name}' must be an integer")
+
+def auto_award_options(auto):
+    """
+    Validated auto-award settings: prefer_latest, max_suppliers, min_order_value, excluded, time_limit.
+    """
+    if not isinstance(auto, dict):
+        raise HTTPException(400, "'auto' must be an object")
+    excluded = auto.get("excluded") or []
+    if not isinstance(excluded, list):
+        raise HTTPException(400, "'auto.excluded' must be a list of supplier names")
+    return {
+        "prefer_latest": bool(auto.get("prefer_latest")),
+        "max_suppliers": integer(auto.get("max_suppliers") or None, "auto.max_suppliers", 0) or None,
+        "min_order_value": number(auto.get("min_order_value") or None, "auto.min_order_value", 0.0),
+        "excluded": [str(s) for s in excluded],
+        "time_limit": max(number(auto.get("time_limit") or None, "auto.time_limit", 5.0), 0.0),
+    }
+
+def award_selection(selection):
+    """
+    {line: quote id or None} from a request's 'selection' object.
+    """
+    if not isinstance(selection, dict):
+        raise HTTPException(400, "'selection' must be an object of line: quote_id")
+    try:
+        return {int(line): None if quote_id is None else int(quote_id) for line, quote_id in selection.items()}
+    except (TypeError, ValueError):
+        raise HTTPException(400, "'selection' lines and quote ids must be integers")
+
+def require_gemini():
+    if not os.getenv("GOOGLE_API_KEY"):
+        raise HTTPException(503, "Gemini is not configured (GOOGLE_API_KEY)")
+
+def load_rfq(client, rfq_id: int):
+    rows = client.table(TABLE_RFQS).select('*').eq('id', rfq_id).execute().data
+    if not rows:
+        raise HTTPException(404, f"RFQ {rfq_id} not found")
+    rfq = rows[0]
+    items = (rfq.get('parsed_json') or {}).get('items') or []
+    if not items:
+        raise HTTPException(422, f"RFQ {rfq_id} has no items")
+    return rfq, items
+
+def rfq_candidates(client, items, base: str, scope, keep_ids=()):
+    # Awards reference `quotes`, so archived quotes are never award candidates
+    since, _ = scope
+    products, quotes = fetch_candidate_quotes(client, [str(i.get('name') or '') for i in items], since=since,
+                                              keep_ids=keep_ids)
+    rates = latest_rates(load_fx_rates(client))
+    return line_candidates(items, products, quotes, load_uom_conversions(client), base, rates)
+
+# --- WORKFLOWS (blocking, run on the thread pool) ---
+
+def parse_workflow(client, text: str, save: bool):
+    parsed = parser.parse_rfq_text(text)
+    warnings = parsed.pop("warnings", None)
+    if save:
+        parsed["id"] = client.table(TABLE_RFQS).insert({"raw_text": text, "parsed_json": parsed}).execute().data[0]["id"]
+    if warnings:
+        parsed["warnings"] = warnings
+    return parsed
+
+def search_workflow(client, query: str, threshold: float, limit: int):
+    return search_products(client, embeddings.embed_query(query), threshold, limit)
+
+def bid_tab_workflow(client, rfq_id: int, base: str, scope):
+    _, items = load_rfq(client, rfq_id)
+    since, include_archived = scope
+    products, quotes = fetch_candidate_quotes(client, [str(i.get('name') or '') for i in items], since=since,
+                                              include_archived=include_archived)
+    quotes = normalize_quotes(quotes, base, latest_rates(load_fx_rates(client)))
+    if not quotes.empty:
+        quotes = quotes.dropna(subset=['price'])
+    tab = build_bid_tab(pd.DataFrame(items), products, quotes, load_uom_conversions(client))
+    return {"rfq_id": rfq_id, "currency": base, "lines": records(tab["lines"]), "bids": records(tab["bids"]), "suppliers": records(tab["suppliers"])}
+
+def consolidated_bid_tab_workflow(client, rfq_ids: list, base: str, scope):
+    rfqs = client.table(TABLE_RFQS).select('*').in_('id', rfq_ids).execute().data
+    missing = sorted(set(rfq_ids) - {r['id'] for r in rfqs})
+    if missing:
+        raise HTTPException(404, f"RFQ(s) {', '.join(map(str, missing))} not found")
+    since, include_archived = scope
+    products, quotes = fetch_candidate_quotes(client, merge_rfq_lines(rfqs)['name'].dropna().astype(str), since=since,
+                                              include_archived=include_archived)
+    quotes = normalize_quotes(quotes, base, latest_rates(load_fx_rates(client)))
+    if not quotes.empty:
+        quotes = quotes.dropna(subset=['price'])
+    tab = build_consolidated_bid_tab(rfqs, products, quotes, load_uom_conversions(client))
+    return {
+        "rfq_ids": rfq_ids, "currency": base, "items": records(tab["lines"]), "bids": records(tab["bids"]),
+        "suppliers": records(tab["suppliers"]), "allocation": records(tab["allocation"]), "rfqs": records(tab["rfqs"])
+    }
+
+def award_workflow(client, rfq_id: int, base: str, selection: dict, auto: dict, scope):
+    _, items = load_rfq(client, rfq_id)
+    previous = load_awards(client, rfq_id)
+    line_quotes, options, ranks = rfq_candidates(client, items, base, scope, [a['quote_id'] for a in previous.values() if a.get('quote_id')])
+
+    result = {"rfq_id": rfq_id, "currency": base}
+    if auto is not None:
+        comparable = line_quotes.dropna(subset=['price']) if not line_quotes.empty else line_quotes
+        award = solve_award(
+            candidate_bids(comparable, prefer_latest=auto["prefer_latest"]), max_suppliers=auto["max_suppliers"],
+            min_order_value=auto["min_order_value"], excluded=auto["excluded"], time_limit=auto["time_limit"]
+        )
+        chosen = {int(row.line): int(row.quote_id) for row in award["awards"].itertuples()}
+        result.update({"status": award["status"], "suppliers": [str(s) for s in award["suppliers"]], "unawarded": [int(l) for l in award["unawarded"]]})
+    else:
+        # Lines left out of the selection keep their saved winner; null clears one
+        chosen = {line: a.get('quote_id') for line, a in previous.items()}
+        requested = selection
+        chosen.update(requested)
+        unknown = [line for line, q in requested.items() if q is not None and q not in {int(o['quote_id']) for o in options.get(line, [])}]
+        if unknown:
+            raise HTTPException(422, f"Quote not a candidate for line(s) {', '.join(map(str, sorted(unknown)))}")
+
+    awards, recap = select_lines(items, options, chosen, base)
+    result["lines_written"] = save_awards(client, rfq_id, awards, ranks, previous=previous)
+    result["grand_total"] = float(recap["_raw_total"].sum())
+    result["recap"] = records(recap[RECAP_COLUMNS])
+    return result
+
+def email_workflow(client, rfq_id: int, base: str, instructions: str, scope):
+    rfq, items = load_rfq(client, rfq_id)
+    saved = {line: a.get('quote_id') for line, a in load_awards(client, rfq_id).items()}
+    _, options, _ = rfq_candidates(client, items, base, scope, [q for q in saved.values() if q])
+    _, recap = select_lines(items, options, saved, base)
+    draft = parser.generate_email_response(rfq['raw_text'], recap[RECAP_COLUMNS].to_markdown(index=False), instructions)
+    return {"rfq_id": rfq_id, "draft": draft}
+
+# --- HANDLERS ---
+
+async def health(request: Request):
+    return JSONResponse({"status": "ok"})
+
+async def parse(request: Request):
+    body = await read_json(request)
+    text = str(body.get("text") or "").strip()
+    if not text:
+        raise HTTPException(400, "'text' is required")
+    require_gemini()
+    client = request.app.state.get_client() if body.get("save") else None
+    return JSONResponse(await run_blocking(request, parse_workflow, client, text, bool(body.get("save"))))
+
+async def search(request: Request):
+    body = await read_json(request)
+    query = str(body.get("query") or "").strip()
+    if not query:
+        raise HTTPException(400, "'query' is required")
+    require_gemini()
+    results = await run_blocking(
+        request, search_workflow, request.app.state.get_client(), query,
+        number(body.get("threshold"), "threshold", 0.5), min(max(integer(body.get("limit"), "limit", 5), 1), 100)
+    )
+    return JSONResponse({"results": results})
+
+async def bid_tab(request: Request):
+    return JSONResponse(await run_blocking(
+        request, bid_tab_workflow, request.app.state.get_client(),
+        int(request.path_params["rfq_id"]), base_currency(request.query_params.get("currency")),
+        quote_scope(request.query_params)
+    ))
+
+async def consolidated_bid_tab(request: Request):
+    body = await read_json(request)
+    try:
+        if not isinstance(body.get("rfq_ids") or [], list):
+            raise TypeError
+        rfq_ids = sorted({int(i) for i in body.get("rfq_ids") or []})
+    except (TypeError, ValueError):
+        raise HTTPException(400, "'rfq_ids' must be a list of integers")
+    if not rfq_ids:
+        raise HTTPException(400, "'rfq_ids' is required")
+    return JSONResponse(await run_blocking(
+        request, consolidated_bid_tab_workflow, request.app.state.get_client(), rfq_ids,
+        base_currency(body.get("currency")), quote_scope(body)
+    ))
+
+async def award(request: Request):
+    body = await read_json(request)
+    if ("selection" in body) == ("auto" in body):
+        raise HTTPException(400, "Send either 'selection' or 'auto'")
+    if "auto" in body:
+        selection, auto = None, auto_award_options(body["auto"])
+    else:
+        selection, auto = award_selection(body["selection"] or {}), None
+    return JSONResponse(await run_blocking(
+        request, award_workflow, request.app.state.get_client(), int(request.path_params["rfq_id"]),
+        base_currency(body.get("currency")), selection, auto, quote_scope(body)
+    ))
+
+async def email(request: Request):
+    body = await read_json(request)
+    require_gemini()
+    return JSONResponse(await run_blocking(
+        request, email_workflow, request.app.state.get_client(), int(request.path_params["rfq_id"]),
+        base_currency(body.get("currency")), str(body.get("instructions") or ""), quote_scope(body)
+    ))
+
+async def http_error(request: Request, exc: HTTPException):
+    return JSONResponse({"error": exc.detail}, status_code=exc.status_code)
+
+async def prompt_too_large(request: Request, exc: PromptTooLarge):
+    return JSONResponse({"error": str(exc)}, status_code=413)
+
+async def server_error(request: Request, exc: Exception):
+    return JSONResponse({"error": str(exc)}, status_code=500)
+
+class TokenAuth:
+    """
+    ASGI middleware requiring a bearer token on everything but /health.
+    """
+    def __init__(self, app, token: str):
+        self.app = app
+        self.expected = f"Bearer {token}".encode("utf-8")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] != "/health" and \
+                not hmac.compare_digest(dict(scope["headers"]).get(b"authorization", b""), self.expected):
+            await JSONResponse({"error": "Unauthorized"}, status_code=401)(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+def create_app(get_client=None, threads: int = API_THREADS, token: str = API_TOKEN):
+    """
+    `get_client` returns the Supabase client for a request (default: env credentials through a client pool).
+    """
+    app = Starlette(
+        routes=[
+            Route("/health", health),
+            Route("/parse", parse, methods=["POST"]),
+            Route("/search", search, methods=["POST"]),
+            Route("/rfqs/bid-tab", consolidated_bid_tab, methods=["POST"]),
+            Route("/rfqs/{rfq_id:int}/bid-tab", bid_tab),
+            Route("/rfqs/{rfq_id:int}/award", award, methods=["POST"]),
+            Route("/rfqs/{rfq_id:int}/email", email, methods=["POST"]),
+        ],
+        exception_handlers={HTTPException: http_error, PromptTooLarge: prompt_too_large, Exception: server_error},
+    )
+    app.state.get_client = get_client or env_client_factory()
+    app.state.limiter = anyio.CapacityLimiter(threads)
+    return TokenAuth(app, token) if token else app
+
+app = create_app()
+
+if __name__ == "__main__":
+    import uvicorn
+
+    cli = argparse.ArgumentParser(description="Run the ProcureMind HTTP API.")
+    cli.add_argument("--host", default="127.0.0.1")
+    cli.add_argument("--port", type=int, default=8000)
+    args = cli.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port)
@@ -0,0 +1,52 @@
+"""
+Moves old quotes from `quotes` to `quotes_archive`.
+
+Quotes dated more than --months ago (ARCHIVE_AFTER_MONTHS, default 24) are
+moved in batches by the `archive_quotes` SQL function, oldest first, so each
+transaction stays short and the app keeps running. Quotes that an award still
+points at stay in `quotes`. Archived quotes are read only when "Include
+archived quotes" is on in Settings (include_archived=true in the API).
+
+Usage:
+    python archive_quotes.py
+    python archive_quotes.py --months 36 --batch 10000
+    python archive_quotes.py --dry-run
+"""
+import time
+import argparse
+from logic.database import get_supabase, TABLE_QUOTES, TABLE_QUOTES_ARCHIVE
+from logic.quote_archive import ARCHIVE_AFTER_MONTHS, archive_quotes, months_ago
+
+def count(supabase, table, before=None):
+    query = supabase.table(table).select('id', count='exact')
+    if before:
+        query = query.lt('quote_date', before)
+    return query.limit(1).execute().count
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive quotes older than a cutoff.")
+    parser.add_argument("--months", type=int, default=ARCHIVE_AFTER_MONTHS, help="Archive quotes dated more than this many months ago")
+    parser.add_argument("--batch", type=int, default=5000, help="Quotes moved per transaction")
+    parser.add_argument("--dry-run", action="store_true", help="Only count what would be archived")
+    args = parser.parse_args()
+
+    supabase = get_supabase()
+    if not supabase:
+        print("❌ Supabase is not configured (set SUPABASE_URL and SUPABASE_ANON_KEY).")
+        return
+
+    before = months_ago(args.months)
+    print(f"Quotes: {count(supabase, TABLE_QUOTES):,} current, {count(supabase, TABLE_QUOTES_ARCHIVE):,} archived")
+    print(f"Dated before {before}: {count(supabase, TABLE_QUOTES, before):,} (awarded ones stay)")
+    if args.dry_run:
+        return
+
+    start = time.perf_counter()
+    moved = archive_quotes(supabase, months=args.months, batch=args.batch,
+                           progress=lambda n: print(f"  {n:,} moved", end="\r"))
+    print()
+    print(f"Archived {moved:,} quotes in {time.perf_counter() - start:.1f}s")
+    print(f"Quotes: {count(supabase, TABLE_QUOTES):,} current, {count(supabase, TABLE_QUOTES_ARCHIVE):,} archived")
+
+if __name__ == "__main__":
+    main()
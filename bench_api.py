@@ -0,0 +1,133 @@
+"""
+Load test for the HTTP API (api.py) against local stand-ins.
+
+Seeds a stand-in Supabase (SQLite, fixed latency per request) and stand-in
+Gemini calls (logic/standin.py), serves the API with uvicorn on localhost in
+separate worker processes, then drives each endpoint with concurrent clients
+for a fixed duration and reports requests/sec and latency percentiles.
+
+Usage:
+    python bench_api.py --concurrency 32 --duration 10
+    python bench_api.py --workers 4 --backend-ms 20 --gemini-ms 400
+"""
+import os
+import sys
+import time
+import socket
+import random
+import asyncio
+import tempfile
+import argparse
+import subprocess
+
+# Stand-in vectors must never reach the real query cache or embedding store
+if "PROCUREMIND_CACHE_DIR" not in os.environ or "STANDIN_DB" not in os.environ:
+    os.environ["PROCUREMIND_CACHE_DIR"] = tempfile.mkdtemp(prefix="procuremind_bench_cache_")
+os.environ.setdefault("GOOGLE_API_KEY", "standin")
+
+import httpx
+import numpy as np
+from api import create_app
+from logic.standin import StandInSupabase, seed_standin, install_gemini_standin
+
+QUERIES = ["heavy duty pump", "stainless valve", "industrial bearing", "compact motor", "sealed relay", "flexible hose"]
+
+def scenarios(rfq_count):
+    rfq = lambda: random.randint(1, rfq_count)
+    return {
+        "health": lambda: ("GET", "/health", None),
+        "search": lambda: ("POST", "/search", {"query": random.choice(QUERIES), "threshold": 0.3}),
+        "bid-tab": lambda: ("GET", f"/rfqs/{rfq()}/bid-tab", None),
+        "award": lambda: ("POST", f"/rfqs/{rfq()}/award", {"auto": {"time_limit": 1}}),
+        "email": lambda: ("POST", f"/rfqs/{rfq()}/email", {"instructions": "Valid for 30 days"}),
+        "parse": lambda: ("POST", "/parse", {"text": "10 Each heavy duty pump 1\n5 Box sealed relay 87"}),
+    }
+
+async def drive(base_url, make_request, concurrency, duration):
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as http:
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                method, path, body = make_request()
+                start = time.perf_counter()
+                try:
+                    response = await http.request(method, path, json=body)
+                    ok = response.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                latencies.append(time.perf_counter() - start)
+                errors += not ok
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return latencies, errors, elapsed
+
+def standin_app():
+    """
+    App factory run by each uvicorn worker process: the seeded stand-in file from STANDIN_DB.
+    """
+    backend = StandInSupabase(os.environ["STANDIN_DB"], latency=float(os.environ["STANDIN_BACKEND_MS"]) / 1000)
+    install_gemini_standin(latency=float(os.environ["STANDIN_GEMINI_MS"]) / 1000)
+    return create_app(get_client=lambda: backend, threads=int(os.environ["API_THREADS"]), token=None)
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the HTTP API against local stand-ins.")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per scenario")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="uvicorn worker processes")
+    parser.add_argument("--threads", type=int, default=32, help="API threads per worker for blocking calls")
+    parser.add_argument("--backend-ms", type=float, default=10.0, help="Stand-in Supabase latency per request")
+    parser.add_argument("--gemini-ms", type=float, default=300.0, help="Stand-in Gemini latency per call")
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--rfqs", type=int, default=50)
+    parser.add_argument("--only", nargs="*", help="Scenarios to run (default: all)")
+    args = parser.parse_args()
+
+    print(f"Seeding stand-in backend ({args.products:,} products, {args.rfqs} RFQs)...")
+    backend = StandInSupabase()
+    seed_standin(backend, products=args.products, rfqs=args.rfqs)
+
+    port = free_port()
+    env = dict(os.environ, STANDIN_DB=backend.mirror.path, STANDIN_BACKEND_MS=str(args.backend_ms),
+               STANDIN_GEMINI_MS=str(args.gemini_ms), API_THREADS=str(args.threads))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "--factory", "bench_api:standin_app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=env
+    )
+    try:
+        for _ in range(600):
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/health").status_code == 200:
+                    break
+            except httpx.HTTPError:
+                time.sleep(0.1)
+        else:
+            raise RuntimeError("API did not start")
+
+        print(f"{args.workers} workers x {args.threads} threads, concurrency {args.concurrency}, "
+              f"backend {args.backend_ms:.0f}ms/request, Gemini {args.gemini_ms:.0f}ms/call")
+        print()
+        print(f"{'scenario':<10}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50':>10}{'p95':>10}{'p99':>10}")
+        for name, make_request in scenarios(args.rfqs).items():
+            if args.only and name not in args.only:
+                continue
+            latencies, errors, elapsed = asyncio.run(drive(f"http://127.0.0.1:{port}", make_request, args.concurrency, args.duration))
+            ms = np.array(latencies) * 1000
+            print(f"{name:<10}{len(ms):>10}{errors:>8}{len(ms) / elapsed:>10.1f}"
+                  f"{np.percentile(ms, 50):>8.0f}ms{np.percentile(ms, 95):>8.0f}ms{np.percentile(ms, 99):>8.0f}ms")
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+        backend.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""
+Benchmarks the local embedding store against full-precision vectors.
+
+Generates a synthetic clustered catalog, then reports for Python lists, float32,
+float16 and int8 stores: memory/disk footprint, load time, query latency and
+recall@k of the quantized stores versus exact float32 search.
+
+Usage:
+    python bench_embedding_store.py --count 100000 --queries 50
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+from logic.embedding_store import EmbeddingStoreWriter, EmbeddingStore
+
+def synthetic_catalog(count, dim, clusters, seed=42):
+    """
+    Near-duplicate-heavy vectors, closer to a real catalog than pure noise.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=count)
+    return centers[labels] + 0.35 * rng.normal(size=(count, dim)).astype(np.float32)
+
+def python_list_bytes(count, dim):
+    """
+    Approximate size of `count` lists of `dim` Python floats (what supabase returns).
+    """
+    return count * (sys.getsizeof([0.0] * dim) + dim * sys.getsizeof(0.0))
+
+def dir_bytes(path):
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark quantized embedding stores.")
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"Generating {args.count:,} x {args.dim} vectors...")
+    vectors = synthetic_catalog(args.count, args.dim, clusters=max(args.count // 50, 1))
+    ids = np.arange(1, args.count + 1)
+    rng = np.random.default_rng(7)
+    queries = vectors[rng.integers(0, args.count, size=args.queries)] + 0.1 * rng.normal(size=(args.queries, args.dim))
+
+    workdir = tempfile.mkdtemp(prefix="embedding_store_bench_")
+    results = {}
+    try:
+        for dtype in ("float32", "float16", "int8"):
+            path = os.path.join(workdir, dtype)
+            writer = EmbeddingStoreWriter(path, dim=args.dim, dtype=dtype)
+            for start in range(0, args.count, 10_000):
+                writer.append(ids[start:start + 10_000], vectors[start:start + 10_000])
+            writer.close()
+
+            start = time.perf_counter()
+            store = EmbeddingStore(path)
+            load_s = time.perf_counter() - start
+
+            start = time.perf_counter()
+            hits = [[pid for pid, _ in store.search(q, k=args.k)] for q in queries]
+            query_ms = (time.perf_counter() - start) * 1000 / args.queries
+
+            results[dtype] = {"bytes": dir_bytes(path), "load_s": load_s, "query_ms": query_ms, "hits": hits}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    exact = results["float32"]["hits"]
+    print()
+    print(f"{'format':<14}{'size':>12}{'load':>12}{'query':>12}{f'recall@{args.k}':>12}")
+    print(f"{'python lists':<14}{python_list_bytes(args.count, args.dim) / 1e6:>10.0f}MB{'-':>12}{'-':>12}{'-':>12}")
+    for dtype, r in results.items():
+        recall = np.mean([len(set(a) & set(b)) / args.k for a, b in zip(r["hits"], exact)])
+        print(f"{dtype:<14}{r['bytes'] / 1e6:>10.0f}MB{r['load_s'] * 1000:>10.1f}ms{r['query_ms']:>10.1f}ms{recall:>12.3f}")
+
+if __name__ == "__main__":
+    main()
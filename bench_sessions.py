@@ -0,0 +1,253 @@
+"""
+Load test for the Streamlit pages: N concurrent simulated buyer sessions.
+
+Every session drives the pages in-process with streamlit's AppTest (one AppTest
+per page per session, so widget state persists like a browser tab) against the
+local stand-ins for Supabase and Gemini (logic/standin.py). Sessions are
+threads of one process, as in a Streamlit server, and repeat a buyer workflow
+with a think time between steps until the duration is over:
+
+    RFQ Manager   open, parse a pasted RFQ, save it
+    Log Quote     open, semantic search
+    RFQ Analysis  open, pick an RFQ, full bid tab
+    Finalization  open, pick an RFQ, auto-award
+
+Reports rerun latency percentiles per page and action, process memory growth
+per session, and CPU use. With --max-p95-ms the script exits non-zero when any
+action's p95 exceeds the budget, so it can guard CI.
+
+Usage:
+    python bench_sessions.py --sessions 40 --duration 60
+    python bench_sessions.py --sessions 10 --think-ms 0 --max-p95-ms 3000
+"""
+import os
+import ast
+import sys
+import time
+import random
+import logging
+import tempfile
+import argparse
+import threading
+import resource
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Stand-in vectors must never reach the real query cache or embedding store
+os.environ["PROCUREMIND_CACHE_DIR"] = tempfile.mkdtemp(prefix="procuremind_bench_cache_")
+os.environ["GOOGLE_API_KEY"] = "standin"
+os.environ.pop("PROCUREMIND_MIRROR", None)
+
+import numpy as np
+import logic.database as database
+from logic.standin import StandInSupabase, seed_standin, install_gemini_standin
+from streamlit import config
+from streamlit.runtime.runtime import Runtime
+from streamlit.testing.v1 import AppTest
+
+for name in ("streamlit", "streamlit.runtime.caching.cache_data_api", "streamlit.runtime.scriptrunner_utils.script_run_context"):
+    logging.getLogger(name).setLevel(logging.ERROR)
+
+# AppTest compiles the page on every run, and CPython before 3.11.8 can fail
+# concurrent ast.parse calls ("AST constructor recursion depth mismatch")
+if sys.version_info < (3, 11, 8):
+    _parse_lock = threading.Lock()
+    _ast_parse = ast.parse
+
+    def _locked_parse(*args, **kwargs):
+        with _parse_lock:
+            return _ast_parse(*args, **kwargs)
+
+    ast.parse = _locked_parse
+
+# AppTest installs a mock Runtime for each run and clears it when the run ends,
+# which would pull it from under every other session running at that moment.
+# The first mock installed is kept for all of them, like the one Runtime of a server.
+_shared_runtime = []
+_runtime_instance = Runtime.instance.__func__
+
+def _instance(cls):
+    if cls._instance is not None and not _shared_runtime:
+        _shared_runtime.append(cls._instance)
+    return _shared_runtime[0] if _shared_runtime else _runtime_instance(cls)
+
+Runtime.instance = classmethod(_instance)
+Runtime.exists = classmethod(lambda cls: cls._instance is not None or bool(_shared_runtime))
+
+# Each run also patches config.get_option to turn on "global.appTest" (which
+# keeps widget callbacks such as a selectbox's format_func for the test) and
+# restores it when the run ends, turning it off for any session still running
+config.set_option("global.appTest", True)
+
+PAGES = {
+    "RFQ Manager": "pages/1_RFQ_Manager.py",
+    "Log Quote": "pages/2_Log_Quote.py",
+    "RFQ Analysis": "pages/3_RFQ_Analysis.py",
+    "Finalization": "pages/4_Finalization.py",
+}
+
+def rss_mb():
+    """
+    Current resident set size of this process.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3  # Peak, where /proc is missing
+
+def button(at, label):
+    return next(b for b in at.button if b.label == label)
+
+# --- WORKFLOW STEPS: (page, action, step(at, rng, ctx)); each ends with one rerun ---
+
+def open_page(at, rng, ctx):
+    at.run()
+
+def parse_rfq(at, rng, ctx):
+    lines = [f"{rng.randint(1, 50)} Each {name}" for name in rng.sample(ctx["product_names"], 8)]
+    at.text_area(key="rfq_input_area").input("\n".join(lines))
+    button(at, "Parse RFQ").click().run()
+
+def save_rfq(at, rng, ctx):
+    at.button(key="save_ai_rfq").click().run()
+
+def search_products(at, rng, ctx):
+    box = next(t for t in at.text_input if t.label.startswith("Search"))
+    box.input(f"{rng.choice(ctx['adjectives'])} {rng.choice(ctx['nouns'])}").run()
+
+def pick_rfq(label, sidebar=False):
+    def step(at, rng, ctx):
+        boxes = at.sidebar.selectbox if sidebar else at.selectbox
+        box = next(s for s in boxes if s.label == label)
+        box.select_index(rng.randrange(len(box.options))).run()
+    return step
+
+def bid_tab(at, rng, ctx):
+    next(r for r in at.sidebar.radio if r.label == "Analysis Mode").set_value("Full RFQ Bid Tab").run()
+
+def auto_award(at, rng, ctx):
+    button(at, "⚡ Run Auto-Award").click().run()
+
+WORKFLOW = [
+    ("RFQ Manager", "open", open_page),
+    ("RFQ Manager", "parse", parse_rfq),
+    ("RFQ Manager", "save", save_rfq),
+    ("Log Quote", "open", open_page),
+    ("Log Quote", "search", search_products),
+    ("RFQ Analysis", "open", open_page),
+    ("RFQ Analysis", "pick RFQ", pick_rfq("Choose RFQ", sidebar=True)),
+    ("RFQ Analysis", "bid tab", bid_tab),
+    ("Finalization", "open", open_page),
+    ("Finalization", "pick RFQ", pick_rfq("Select RFQ to Finalize")),
+    ("Finalization", "auto-award", auto_award),
+]
+
+class Session:
+    """
+    One simulated buyer: an AppTest per page, kept for the whole run.
+    """
+    def __init__(self, n: int, ctx: dict, timeout: float):
+        self.rng = random.Random(n)
+        self.ctx = ctx
+        self.apps = {page: AppTest.from_file(os.path.join(ROOT, path), default_timeout=timeout) for page, path in PAGES.items()}
+
+    def run(self, deadline: float, think: float, results):
+        while time.perf_counter() < deadline:
+            for page, action, step in WORKFLOW:
+                if time.perf_counter() >= deadline:
+                    return
+                at = self.apps[page]
+                start = time.perf_counter()
+                try:
+                    step(at, self.rng, self.ctx)
+                    error = at.exception[0].value if at.exception else None
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+                results[(page, action)].append((time.perf_counter() - start, error))
+                if think:
+                    time.sleep(self.rng.uniform(0.5, 1.5) * think)
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Streamlit pages with concurrent simulated sessions.")
+    parser.add_argument("--sessions", type=int, default=10, help="Concurrent simulated buyers")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds of load after warm-up")
+    parser.add_argument("--think-ms", type=float, default=1000.0, help="Mean pause between a session's steps")
+    parser.add_argument("--backend-ms", type=float, default=10.0, help="Stand-in Supabase latency per request")
+    parser.add_argument("--gemini-ms", type=float, default=300.0, help="Stand-in Gemini latency per call")
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--rfqs", type=int, default=30)
+    parser.add_argument("--timeout", type=float, default=300.0, help="Seconds before a single rerun counts as hung")
+    parser.add_argument("--max-p95-ms", type=float, help="Fail if any action's p95 rerun latency exceeds this")
+    args = parser.parse_args()
+
+    print(f"Seeding stand-in backend ({args.products:,} products, {args.rfqs} RFQs)...")
+    backend = StandInSupabase(latency=args.backend_ms / 1000)
+    seed_standin(backend, products=args.products, rfqs=args.rfqs)
+    install_gemini_standin(latency=args.gemini_ms / 1000)
+    database.get_supabase = lambda: backend  # Pages import it on every run
+
+    names = [r["name"] for r in backend.table("products").select("name").limit(500).execute().data]
+    ctx = {
+        "product_names": names,
+        "adjectives": sorted({" ".join(n.split()[:-2]) for n in names}),
+        "nouns": sorted({n.split()[-2] for n in names}),
+    }
+
+    # One untimed pass loads modules and fills the shared caches, as a running server would have
+    warm = Session(-1, ctx, args.timeout)
+    for page, action, step in WORKFLOW:
+        step(warm.apps[page], warm.rng, ctx)
+    del warm
+
+    base_rss = rss_mb()
+    sessions = [Session(n, ctx, args.timeout) for n in range(args.sessions)]
+    results = defaultdict(list)
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    deadline = wall_start + args.duration
+    threads = [threading.Thread(target=s.run, args=(deadline, args.think_ms / 1000, results), daemon=True) for s in sessions]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    end_rss = rss_mb()
+
+    print(f"{args.sessions} sessions for {wall:.0f}s, think {args.think_ms:.0f}ms, "
+          f"backend {args.backend_ms:.0f}ms/request, Gemini {args.gemini_ms:.0f}ms/call")
+    print()
+    print(f"{'page':<14}{'action':<12}{'reruns':>8}{'errors':>8}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    failures = []
+    total = 0
+    for page, action, _ in WORKFLOW:
+        runs = results.get((page, action))
+        if not runs:
+            continue
+        ms = np.array([r[0] for r in runs]) * 1000
+        errors = [r[1] for r in runs if r[1]]
+        total += len(runs)
+        p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+        print(f"{page:<14}{action:<12}{len(ms):>8}{len(errors):>8}{p50:>8.0f}ms{p95:>8.0f}ms{p99:>8.0f}ms{ms.max():>8.0f}ms")
+        if errors:
+            failures.append(f"{page} / {action}: {len(errors)} failed reruns, e.g. {str(errors[0])[:200]}")
+        if args.max_p95_ms and p95 > args.max_p95_ms:
+            failures.append(f"{page} / {action}: p95 {p95:.0f}ms (budget {args.max_p95_ms:.0f}ms)")
+
+    print()
+    print(f"Throughput: {total / wall:.1f} reruns/s")
+    print(f"CPU: {cpu / wall:.2f} cores busy on average ({os.cpu_count()} available)")
+    print(f"Memory: {base_rss:.0f} MB after warm-up, {end_rss:.0f} MB with {args.sessions} sessions open "
+          f"= {(end_rss - base_rss) / max(args.sessions, 1):.1f} MB per session")
+    print(f"Stand-in Supabase requests: {backend.requests:,}")
+    backend.close()
+
+    if failures:
+        print()
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmarks cold start: import time per module and time to first rendered page.
+
+Every measurement runs in a fresh interpreter, as after a container scale-up.
+Imports report their own cost plus which heavy SDKs they pulled in; pages are
+rendered once with streamlit's AppTest (no credentials, so no network calls).
+With --max-import-ms / --max-page-ms the script exits non-zero when a budget is
+exceeded or a logic module loads an SDK eagerly, so it can guard CI.
+
+Usage:
+    python bench_startup.py --repeat 3
+    python bench_startup.py --max-import-ms 1500 --max-page-ms 4000
+"""
+import os
+import sys
+import json
+import glob
+import argparse
+import subprocess
+import statistics
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Only imported when a feature actually needs them
+HEAVY_SDKS = ["google.generativeai", "supabase"]
+
+MODULES = [
+    "streamlit", "pandas",
+    "logic.database", "logic.parser", "logic.embeddings", "logic.embedding_store", "logic.fx", "logic.uom",
+    "logic.analysis", "logic.award", "logic.price_stats", "logic.price_history", "logic.scorecard",
+    "logic.dedupe", "logic.mirror", "logic.fetch", "logic.finalize", "logic.rfqs", "logic.attachments", "logic.prompts",
+    "logic.quote_archive", "logic.consolidate",
+] + HEAVY_SDKS
+
+IMPORT_PROBE = """
+import sys, json, time, warnings
+warnings.simplefilter("ignore")
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"ms": elapsed * 1000, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+PAGE_PROBE = """
+import sys, json, time, warnings
+warnings.simplefilter("ignore")
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({path!r}, default_timeout=60)
+at.run()
+elapsed = time.perf_counter() - start
+print(json.dumps({{"ms": elapsed * 1000, "errors": [e.value for e in at.exception],
+                   "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+def run_probe(code):
+    env = {k: v for k, v in os.environ.items() if k not in ("SUPABASE_URL", "SUPABASE_ANON_KEY", "GOOGLE_API_KEY")}
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True)
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1] if out.stderr.strip() else "probe failed")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def measure(code, repeat):
+    runs = [run_probe(code) for _ in range(repeat)]
+    return statistics.median(r["ms"] for r in runs), runs[-1]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cold-start import and first-page times.")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per measurement (median is reported)")
+    parser.add_argument("--max-import-ms", type=float, help="Fail if any logic module imports slower than this")
+    parser.add_argument("--max-page-ms", type=float, help="Fail if any page takes longer than this to first render")
+    args = parser.parse_args()
+
+    failures = []
+
+    print(f"{'module':<26}{'import':>10}  heavy SDKs loaded")
+    for module in MODULES:
+        ms, last = measure(IMPORT_PROBE.format(module=module, heavy=HEAVY_SDKS), args.repeat)
+        loaded = [m for m in last["loaded"] if m != module and not module.startswith(m)]
+        print(f"{module:<26}{ms:>8.0f}ms  {', '.join(loaded) or '-'}")
+        if module.startswith("logic."):
+            if loaded:
+                failures.append(f"{module} imports {', '.join(loaded)} at module level")
+            if args.max_import_ms and ms > args.max_import_ms:
+                failures.append(f"{module} import took {ms:.0f}ms (budget {args.max_import_ms:.0f}ms)")
+
+    print()
+    print(f"{'page':<30}{'first render':>14}  heavy SDKs loaded")
+    pages = [os.path.join(ROOT, "streamlit_app.py")] + sorted(glob.glob(os.path.join(ROOT, "pages", "*.py")))
+    for path in pages:
+        ms, last = measure(PAGE_PROBE.format(path=path, heavy=HEAVY_SDKS), args.repeat)
+        name = os.path.relpath(path, ROOT)
+        print(f"{name:<30}{ms:>12.0f}ms  {', '.join(last['loaded']) or '-'}")
+        if last["errors"]:
+            failures.append(f"{name} raised: {last['errors'][0]}")
+        if args.max_page_ms and ms > args.max_page_ms:
+            failures.append(f"{name} first render took {ms:.0f}ms (budget {args.max_page_ms:.0f}ms)")
+
+    if failures:
+        print()
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""
+Builds the local memory-mapped embedding store from `products.embedding`.
+
+Usage:
+    python build_embedding_store.py                 # float16 (half the size, near-lossless)
+    python build_embedding_store.py --dtype int8    # quarter size, small recall loss
+"""
+import time
+import argparse
+from logic.database import get_supabase
+from logic.embedding_store import build_from_supabase, client_store_path
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the local embedding store.")
+    parser.add_argument("--dtype", choices=["float32", "float16", "int8"], default="float16")
+    parser.add_argument("--path", help="Store directory (default: one per Supabase project under .cache/)")
+    parser.add_argument("--page-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    supabase = get_supabase()
+    if not supabase:
+        print("❌ Supabase is not configured (set SUPABASE_URL and SUPABASE_ANON_KEY).")
+        return
+
+    path = args.path or client_store_path(supabase)
+    start = time.perf_counter()
+    count = build_from_supabase(supabase, path, args.dtype, args.page_size)
+    print(f"✅ Stored {count} embeddings as {args.dtype} in {path} ({time.perf_counter() - start:.1f}s).")
+
+if __name__ == "__main__":
+    main()
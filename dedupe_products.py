@@ -0,0 +1,46 @@
+"""
+Batch near-duplicate detection for the products table.
+
+Prints proposed merge groups; with --apply, merges every group into its oldest
+product (repointing quotes in bulk). Review groups in the Deduplicate page when
+in doubt.
+
+Usage:
+    python dedupe_products.py
+    python dedupe_products.py --threshold 0.95 --apply
+"""
+import time
+import argparse
+from logic.database import get_supabase
+from logic.embedding_store import get_embedding_store, client_store_path
+from logic.dedupe import load_products_for_dedupe, find_duplicate_groups, merge_products
+
+def main():
+    parser = argparse.ArgumentParser(description="Find and merge near-duplicate products.")
+    parser.add_argument("--threshold", type=float, default=0.93, help="Embedding cosine similarity to merge")
+    parser.add_argument("--apply", action="store_true", help="Merge every proposed group into its oldest product")
+    args = parser.parse_args()
+
+    supabase = get_supabase()
+    if not supabase:
+        print("❌ Supabase is not configured (set SUPABASE_URL and SUPABASE_ANON_KEY).")
+        return
+
+    start = time.perf_counter()
+    products, vectors = load_products_for_dedupe(supabase, store=get_embedding_store(client_store_path(supabase)))
+    groups = find_duplicate_groups(products, vectors, cosine_threshold=args.threshold)
+    print(f"Scanned {len(products):,} products in {time.perf_counter() - start:.1f}s: {len(groups)} groups.")
+
+    for group in groups:
+        keep, *dupes = group
+        print(f"\n#{keep['id']} {keep['name']}")
+        for p in dupes:
+            print(f"  <- #{p['id']} {p['name']} ({p['score']:.2f})")
+        if args.apply:
+            merge_products(supabase, keep['id'], [p['id'] for p in dupes])
+
+    if args.apply:
+        print(f"\n✅ Merged {sum(len(g) - 1 for g in groups)} duplicates.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import numpy as np
+import pandas as pd
+from logic.database import TABLE_PRODUCTS, TABLE_QUOTES
+from logic.fetch import fetch_all
+from logic.quote_archive import quote_tables, in_window
+from logic.uom import apply_uom
+
+# --- BID TABULATION ---
+# Whole-RFQ analysis: candidate products and quotes are fetched once for all
+# lines, then every line x supplier figure is computed in vectorized pandas.
+
+def normalize_item_name(series: pd.Series):
+    return series.fillna("").astype(str).str.strip().str.lower()
+
+def _ilike_filter(names):
+    """
+    PostgREST `or` filter matching any of the names case-insensitively,
+    equivalent to one `.ilike('name', n)` per name.
+    """
+    quoted = []
+    for n in names:
+        escaped = n.replace("\\", "\\\\").replace('"', '\\"')
+        quoted.append(f'name.ilike."{escaped}"')
+    return ",".join(quoted)
+
+def fetch_candidate_quotes(supabase, names, chunk_size: int = 50, since: str = None, include_archived: bool = False,
+                           keep_ids=()):
+    """
+    Loads products whose name matches any RFQ line name, and their quotes dated
+    `since` or later (archived ones too with `include_archived`, see
+    quote_archive.quote_scope), in a handful of requests. Returns (products_df, quotes_df).
+    Quotes in `keep_ids` (e.g. already awarded) are loaded whatever their date.
+    Chunks are fetched concurrently: two round trips however long the RFQ.
+    """
+    names = sorted({str(n).strip() for n in names if n and str(n).strip()})
+    product_chunks = fetch_all(supabase, {
+        start: lambda c, chunk=names[start:start + chunk_size]: c.table(TABLE_PRODUCTS).select('id, name, description').or_(_ilike_filter(chunk))
+        for start in range(0, len(names), chunk_size)
+    })
+    products = [p for rows in product_chunks.values() for p in rows]
+
+    p_ids = sorted({p['id'] for p in products})
+    queries = {
+        (table, start): lambda c, table=table, chunk=p_ids[start:start + 200]:
+            in_window(c.table(table).select('*, suppliers(name)').in_('product_id', chunk), since)
+        for table in quote_tables(include_archived) for start in range(0, len(p_ids), 200)
+    }
+    if keep_ids and p_ids:
+        # Awarded quotes are never archived, but can be older than the window
+        kept = sorted({int(i) for i in keep_ids})
+        queries["kept"] = lambda c: c.table(TABLE_QUOTES).select('*, suppliers(name)').in_('id', kept)
+    quote_chunks = fetch_all(supabase, queries)
+    quotes = list({q['id']: q for rows in quote_chunks.values() for q in rows}.values())
+
+    products_df = pd.DataFrame(products, columns=['id', 'name', 'description'])
+    quotes_df = pd.DataFrame(quotes)
+    if not quotes_df.empty:
+        quotes_df['supplier'] = quotes_df['suppliers'].str.get('name')
+        quotes_df['price'] = pd.to_numeric(quotes_df['price'])
+    return products_df, quotes_df
+
+def prepare_lines(items: pd.DataFrame):
+    """
+    RFQ items with a 1-based 'line' number, a normalized match 'key' and a numeric 'qty' (defaults to 1).
+    """
+    lines = items.reset_index(drop=True).copy()
+    lines['line'] = np.arange(1, len(lines) + 1)
+    for col in ('name', 'uom'):
+        if col not in lines:
+            lines[col] = None
+    lines['key'] = normalize_item_name(lines['name'])
+    lines['qty'] = pd.to_numeric(lines['quantity'], errors='coerce') if 'quantity' in lines else np.nan
+    lines['qty'] = lines['qty'].where(lines['qty'] > 0, 1.0).fillna(1.0)
+    return lines
+
+def match_line_quotes(lines: pd.DataFrame, products: pd.DataFrame, quotes: pd.DataFrame, conversions: pd.DataFrame = None):
+    """
+    Every candidate quote for every line (exact case-insensitive name match),
+    one row per line x quote. With `conversions`, prices are per base unit and
+    quantities in base units (see uom.apply_uom).
+    """
+    columns = ['line', 'name', 'qty', 'line_uom', 'product_id', 'quote_id', 'supplier', 'price', 'currency', 'uom', 'quote_date']
+    if products.empty or quotes.empty:
+        return pd.DataFrame(columns=columns)
+    prod = products[['id']].assign(key=normalize_item_name(products['name']))
+    quote_cols = [c for c in ['id', 'product_id', 'supplier_id', 'supplier', 'price', 'currency', 'uom',
+                              'uom_factor', 'base_uom', 'quote_date', 'original_price', 'original_currency'] if c in quotes]
+    rows = lines[['line', 'name', 'key', 'qty', 'uom']].rename(columns={'uom': 'line_uom'}) \
+        .merge(prod, on='key') \
+        .merge(quotes[quote_cols].rename(columns={'id': 'quote_id'}), left_on='id', right_on='product_id') \
+        .drop(columns=['id', 'key'])
+    if conversions is not None:
+        rows = apply_uom(rows, conversions)
+    return rows
+
+def build_bid_tab(items: pd.DataFrame, products: pd.DataFrame, quotes: pd.DataFrame, conversions: pd.DataFrame = None):
+    """
+    Builds the bid tabulation for every RFQ line against every quoting supplier.
+    Quotes without a comparable price (no FX rate, incompatible unit) are left out.
+
+    Returns a dict of DataFrames:
+      - 'bids':      one row per line x supplier (cheapest quote of that supplier),
+                     with unit price, extended total and rank
+      - 'unit':      line x supplier matrix of unit prices
+      - 'extended':  line x supplier matrix of extended totals
+      - 'lines':     per-line best supplier, best/second-best price and savings
+      - 'suppliers': per-supplier lines covered, lines won and total of won lines
+    """
+    lines = prepare_lines(items)
+
+    empty = {
+        "bids": pd.DataFrame(columns=['line', 'name', 'supplier', 'price', 'currency', 'qty', 'extended', 'rank']),
+        "unit": pd.DataFrame(), "extended": pd.DataFrame(),
+        "lines": lines[['line', 'name']].assign(best_supplier=None, best_price=np.nan, second_price=np.nan, savings=np.nan),
+        "suppliers": pd.DataFrame(columns=['supplier', 'lines_quoted', 'lines_won', 'won_total']),
+    }
+    bids = match_line_quotes(lines, products, quotes, conversions).dropna(subset=['price'])
+    if bids.empty:
+        return empty
+
+    # Keep each supplier's cheapest quote per line (latest date breaks ties)
+    bids = bids.sort_values(['line', 'price', 'quote_date'], ascending=[True, True, False]) \
+        .drop_duplicates(['line', 'supplier'])
+    bids['extended'] = bids['price'] * bids['qty']
+    bids['rank'] = bids.groupby('line')['price'].rank(method='min').astype(int)
+
+    unit = bids.pivot(index='line', columns='supplier', values='price')
+    extended = bids.pivot(index='line', columns='supplier', values='extended')
+
+    position = bids.groupby('line').cumcount()
+    best = bids[position == 0].set_index('line')
+    second = bids[position == 1].set_index('line')['price']
+    line_summary = lines.set_index('line')[['name', 'qty']].join(
+        best[['supplier', 'price', 'extended', 'currency']].rename(columns={
+            'supplier': 'best_supplier', 'price': 'best_price', 'extended': 'best_total'
+        })
+    )
+    line_summary['second_price'] = second
+    line_summary['savings'] = (line_summary['second_price'] - line_summary['best_price']) * line_summary['qty']
+    line_summary['bids'] = bids.groupby('line').size()
+    line_summary['bids'] = line_summary['bids'].fillna(0).astype(int)
+
+    supplier_summary = bids.groupby('supplier').agg(lines_quoted=('line', 'nunique'))
+    won = bids[bids['rank'] == 1].groupby('supplier').agg(lines_won=('line', 'nunique'), won_total=('extended', 'sum'))
+    supplier_summary = supplier_summary.join(won).fillna({'lines_won': 0, 'won_total': 0.0})
+    supplier_summary['lines_won'] = supplier_summary['lines_won'].astype(int)
+    supplier_summary = supplier_summary.sort_values(['lines_won', 'won_total'], ascending=False).reset_index()
+
+    return {
+        "bids": bids.reset_index(drop=True),
+        "unit": unit,
+        "extended": extended,
+        "lines": line_summary.reset_index(),
+        "suppliers": supplier_summary,
+    }
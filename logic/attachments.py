@@ -0,0 +1,253 @@
+import io
+import os
+import re
+import csv
+import itertools
+
+# --- RFQ ATTACHMENTS ---
+# Spreadsheet and PDF attachments are usually already tables, so they are read
+# locally instead of being pasted into the Gemini parser: the first rows are
+# scanned for a header, its columns are mapped to the parsed_json item fields,
+# and the remaining rows become items. Files are read as row streams (CSV line
+# by line, XLSX in openpyxl's read-only mode, PDF page by page), so a large
+# attachment is never loaded whole. openpyxl and pdfplumber are only imported
+# when such a file is opened.
+
+ATTACHMENT_TYPES = ["xlsx", "xlsm", "csv", "pdf"]
+ITEM_FIELDS = ["item_code", "name", "description", "quantity", "uom", "brand", "specs"]
+HEADER_SCAN_ROWS = 25
+RAW_TEXT_CHARS = 20000  # Kept as rfqs.raw_text (email drafting context), not the whole file
+
+HEADER_ALIASES = {
+    "item_code": ["item code", "code", "part no", "part number", "p n", "pn", "sku", "material", "material code",
+                  "item no", "article no", "catalog no", "kode", "kode barang"],
+    "name": ["name", "item", "item name", "product", "product name", "article", "nama", "nama barang"],
+    "description": ["description", "desc", "item description", "details", "deskripsi", "keterangan", "uraian"],
+    "quantity": ["qty", "quantity", "qty req", "qty required", "req qty", "order qty", "jumlah", "jml", "volume"],
+    "uom": ["uom", "unit", "units", "unit of measure", "measure", "satuan"],
+    "brand": ["brand", "make", "manufacturer", "maker", "merk", "merek"],
+    "specs": ["specs", "spec", "specification", "specifications", "size", "technical", "spesifikasi"],
+}
+
+# Headers such as "Unit Price" or "Total Qty Value" are prices, not item fields
+PRICE_WORDS = {"price", "prices", "cost", "amount", "total", "value", "rate", "harga", "nilai"}
+
+# Longest aliases first, so "item code" wins over "item" and "unit of measure" over "unit"
+_ALIASES = sorted(((a, f) for f, aliases in HEADER_ALIASES.items() for a in aliases), key=lambda x: -len(x[0]))
+
+def _norm(value):
+    return re.sub(r"[^a-z0-9]+", " ", str(value or "").lower()).strip()
+
+def _clean(value):
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = re.sub(r"\s+", " ", str(value)).strip()
+    return text or None
+
+# --- ROW STREAMS ---
+
+CSV_DELIMITERS = ",;\t|"
+
+def _csv_dialect(sample: str):
+    """
+    Dialect of a CSV sample. Exports often start with a title and blank lines, on
+    which the sniffer gives up, so it is retried from each of the first non-blank
+    lines; failing that, the most frequent delimiter in the sample is used.
+    """
+    lines = [line for line in sample.splitlines() if line.strip()]
+    for start in range(min(len(lines), HEADER_SCAN_ROWS)):
+        try:
+            return csv.Sniffer().sniff("\n".join(lines[start:]), delimiters=CSV_DELIMITERS)
+        except csv.Error:
+            continue
+
+    class Dialect(csv.excel):
+        delimiter = max(CSV_DELIMITERS, key=sample.count)
+    return Dialect
+
+def _csv_rows(file):
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", errors="replace", newline="")
+    try:
+        sample = text.read(65536)
+        text.seek(0)
+        yield from csv.reader(text, _csv_dialect(sample))
+    finally:
+        text.detach()  # Leave the upload open for the next pass
+
+def _xlsx_rows(file):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+def _pdf_rows(file):
+    import pdfplumber
+
+    with pdfplumber.open(file) as pdf:
+        for page in pdf.pages:
+            for table in page.extract_tables():
+                yield from table
+            page.close()  # Drop the page's parsed objects before the next one
+
+def iter_rows(file, filename: str):
+    """
+    Rows of the attachment's table(s) as lists of raw cell values.
+    """
+    ext = os.path.splitext(filename)[1].lower().lstrip(".")
+    readers = {"csv": _csv_rows, "xlsx": _xlsx_rows, "xlsm": _xlsx_rows, "pdf": _pdf_rows}
+    if ext not in readers:
+        raise ValueError(f"Unsupported attachment type .{ext}")
+    file.seek(0)
+    yield from readers[ext](file)
+
+# --- HEADER DETECTION & MAPPING ---
+
+def map_columns(header) -> dict:
+    """
+    {field: column index} for the header cells that name an item field.
+    """
+    mapping = {}
+    for col, cell in enumerate(header):
+        norm = _norm(cell)
+        if not norm or PRICE_WORDS & set(norm.split()):
+            continue
+        for alias, field in _ALIASES:
+            if field not in mapping and (norm == alias or norm.startswith(alias + " ")):
+                mapping[field] = col
+                break
+    return mapping
+
+def is_item_header(mapping: dict) -> bool:
+    return "quantity" in mapping and ("name" in mapping or "description" in mapping)
+
+def find_header(rows):
+    """
+    (row number, header cells, {field: column}) of the most header-like of `rows`,
+    or None when no row names a quantity and a name/description.
+    """
+    best = None
+    for n, row in enumerate(rows):
+        mapping = map_columns(row)
+        if is_item_header(mapping) and (best is None or len(mapping) > len(best[2])):
+            best = (n, [_clean(c) or f"Column {i + 1}" for i, c in enumerate(row)], mapping)
+    return best
+
+# --- ITEMS ---
+
+def parse_quantity(value):
+    """
+    (quantity, unit or None) from a cell: 12, "1,200", "1.200", "2.5", "0.500", "10 pcs", "1.000,5".
+    """
+    if isinstance(value, (int, float)):
+        return (int(value) if float(value).is_integer() else float(value)), None
+    match = re.match(r"^\s*([\d.,]+)\s*([^\d\s].*)?$", str(value or ""))
+    if not match:
+        return None, None
+    number, unit = match.group(1), _clean(match.group(2))
+    if "," in number and "." in number:
+        # The later separator is the decimal one
+        number = number.replace(".", "").replace(",", ".") if number.rfind(",") > number.rfind(".") else number.replace(",", "")
+    elif "," in number:
+        number = number.replace(",", "") if re.fullmatch(r"[1-9]\d{0,2}(,\d{3})+", number) else number.replace(",", ".")
+    elif re.fullmatch(r"[1-9]\d{0,2}(\.\d{3})+", number):
+        number = number.replace(".", "")  # "1.200" is a thousands separator, not 1.2; "0.500" is 0.5
+    try:
+        qty = float(number)
+    except ValueError:
+        return None, None
+    return (int(qty) if qty.is_integer() else qty), unit
+
+def row_item(row, mapping: dict):
+    """
+    parsed_json item for a data row, or None for blank, subtotal and note rows.
+    """
+    def cell(field):
+        col = mapping.get(field)
+        return row[col] if col is not None and col < len(row) else None
+
+    name, description = _clean(cell("name")), _clean(cell("description"))
+    if not (name or description) or _norm(name or description).startswith(("total", "subtotal", "grand total")):
+        return None
+    qty, unit = parse_quantity(cell("quantity"))
+    if qty is None:
+        return None
+    return {
+        "item_code": _clean(cell("item_code")),
+        "description": description or name,
+        "quantity": qty,
+        "uom": _clean(cell("uom")) or unit,
+        "name": name or description,
+        "brand": _clean(cell("brand")),
+        "specs": _clean(cell("specs")),
+    }
+
+def iter_items(rows, header_row: int, mapping: dict):
+    """
+    Items of every row after the header; header rows repeated on later PDF pages are skipped.
+    """
+    header = None
+    for n, row in enumerate(rows):
+        if n < header_row:
+            continue
+        if n == header_row:
+            header = [_norm(c) for c in row]
+            continue
+        if [_norm(c) for c in row] == header:
+            continue
+        item = row_item(row, mapping)
+        if item:
+            yield item
+
+def attachment_text(file, filename: str, limit: int = RAW_TEXT_CHARS):
+    """
+    Plain text of the attachment, up to `limit` characters: tab-separated rows for
+    spreadsheets, page text for PDFs. Used as raw_text and for the Gemini fallback.
+    """
+    if filename.lower().endswith(".pdf"):
+        import pdfplumber
+
+        def lines():
+            file.seek(0)
+            with pdfplumber.open(file) as pdf:
+                for page in pdf.pages:
+                    yield page.extract_text() or ""
+                    page.close()
+    else:
+        def lines():
+            for row in iter_rows(file, filename):
+                yield "\t".join(_clean(c) or "" for c in row).rstrip()
+
+    parts, size = [], 0
+    for line in lines():
+        if size + len(line) + 1 > limit:
+            parts.append(line[:max(limit - size, 0)])
+            break
+        parts.append(line)
+        size += len(line) + 1
+    return "\n".join(parts).strip()
+
+def parse_attachment(file, filename: str, header_row: int = None, mapping: dict = None):
+    """
+    Reads a tabular attachment in one pass. Returns (parsed_json or None, header):
+    `header` is (row number, header cells, {field: column}) as detected in the
+    first HEADER_SCAN_ROWS rows, or None; `header_row` / `mapping` override it.
+    parsed_json is None when there is no usable header or no item rows, so the
+    caller can fall back to Gemini.
+    """
+    rows = iter_rows(file, filename)
+    head = list(itertools.islice(rows, HEADER_SCAN_ROWS))
+    header = find_header(head)
+    if header_row is None or mapping is None:
+        if header is None:
+            return None, None
+        header_row = header[0] if header_row is None else header_row
+        mapping = header[2] if mapping is None else mapping
+    items = list(iter_items(itertools.chain(head, rows), header_row, mapping))
+    if not items:
+        return None, header
+    return {"title": f"RFQ - {os.path.splitext(os.path.basename(filename))[0]}", "items": items}, header
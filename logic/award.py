@@ -0,0 +1,342 @@
+import time
+import numpy as np
+import pandas as pd
+
+# --- COST-OPTIMAL AWARD SOLVER ---
+# Picks one winning quote per RFQ line minimizing the grand total, subject to:
+#   - max_suppliers:    at most K distinct winning suppliers
+#   - min_order_value:  every winning supplier's awarded total >= a minimum
+#   - excluded:         suppliers that must not win anything
+#
+# Without minimums, once the winning supplier set is fixed each line simply goes
+# to the cheapest supplier in the set, so the search is over supplier sets only:
+# greedy forward selection + swap local search, then a depth-first
+# branch-and-bound over include/exclude decisions (bounded by a relaxation that
+# ignores K and minimums) until it proves optimality or hits the time limit.
+# With minimums, the cheapest assignment of a set may leave a supplier short;
+# the greedy phase repairs it by moving lines onto that supplier, and the
+# branch-and-bound solves each set's assignment exactly with a search over lines.
+
+MAX_EXACT_LINES = 800  # Per-set line search depth; larger sets keep the heuristic assignment
+
+def candidate_bids(line_quotes: pd.DataFrame, prefer_latest: bool = False):
+    """
+    Reduces every line x quote row (see analysis.match_line_quotes) to one bid
+    per line x supplier: the cheapest quote, or the most recent one if
+    `prefer_latest` (cheapest breaks same-day ties).
+    """
+    if prefer_latest:
+        order, ascending = ['line', 'supplier', 'quote_date', 'price'], [True, True, False, True]
+    else:
+        order, ascending = ['line', 'supplier', 'price', 'quote_date'], [True, True, True, False]
+    bids = line_quotes.dropna(subset=['price']).sort_values(order, ascending=ascending).drop_duplicates(['line', 'supplier']).copy()
+    bids['extended'] = bids['price'] * bids['qty']
+    return bids
+
+def _group_cumsum(keys: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """
+    Running sum of `values` within each key, in the original order.
+    """
+    order = np.argsort(keys, kind='stable')
+    sorted_keys, sorted_values = keys[order], values[order]
+    running = np.cumsum(sorted_values)
+    starts = np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]
+    first = np.maximum.accumulate(np.where(starts, np.arange(len(keys)), 0))
+    out = np.empty_like(running)
+    out[order] = running - running[first] + sorted_values[first]
+    return out
+
+class _AwardProblem:
+    def __init__(self, cost: np.ndarray, min_order_value: float):
+        self.cost = cost  # lines x suppliers extended totals, inf = no bid
+        self.min_order_value = min_order_value or 0.0
+        self.n_lines, self.n_suppliers = cost.shape
+        self.best_possible = cost.min(axis=1)
+        self.coverable = np.isfinite(self.best_possible)
+
+    def assign(self, chosen):
+        """
+        Assigns each line to its cheapest supplier in `chosen`, then moves lines
+        onto suppliers short of the minimum order value, dropping those that
+        still miss it until all winners comply. Fast, but not always optimal
+        with minimums (see assign_exact).
+        Returns (objective, winners per line or -1, final supplier set).
+        """
+        chosen = list(chosen)
+        while True:
+            if not chosen:
+                return self._objective(np.full(self.n_lines, -1), np.zeros(self.n_lines)), np.full(self.n_lines, -1), []
+            sub = self.cost[:, chosen]
+            pick = sub.argmin(axis=1)
+            line_cost = sub[np.arange(self.n_lines), pick]
+            winners = np.where(np.isfinite(line_cost), np.array(chosen)[pick], -1)
+
+            if self.min_order_value > 0:
+                winners, line_cost = self._repair(chosen, winners, line_cost)
+                totals = self._totals(winners, line_cost)
+                failing = [s for s in chosen if 0 < totals[s] < self.min_order_value]
+                if failing:
+                    # Drop the smallest violator and reassign its lines
+                    chosen.remove(min(failing, key=lambda s: totals[s]))
+                    continue
+                chosen = [s for s in chosen if totals[s] > 0]
+            else:
+                chosen = sorted(set(winners[winners >= 0].tolist()))
+            return self._objective(winners, line_cost), winners, chosen
+
+    def _totals(self, winners, line_cost):
+        won = winners >= 0
+        return np.bincount(winners[won], weights=line_cost[won], minlength=self.n_suppliers)
+
+    def _repair(self, chosen, winners, line_cost):
+        """
+        Moves lines onto each supplier short of the minimum, least extra cost per
+        unit of value first, without taking a donor below the minimum.
+        """
+        winners, line_cost = winners.copy(), line_cost.copy()
+        totals = self._totals(winners, line_cost)
+        for s in sorted(chosen, key=lambda s: -totals[s]):
+            if not 0 < totals[s] < self.min_order_value:
+                continue
+            gain = self.cost[:, s]
+            moves = np.flatnonzero((winners >= 0) & (winners != s) & np.isfinite(gain))
+            if not len(moves):
+                continue
+            moves = moves[np.argsort((gain[moves] - line_cost[moves]) / gain[moves], kind='stable')]
+            # A donor gives lines, in move order, only while it stays at the minimum
+            donors = winners[moves]
+            moves = moves[totals[donors] - _group_cumsum(donors, line_cost[moves]) >= self.min_order_value]
+            if not len(moves):
+                continue
+            reach = np.cumsum(gain[moves])
+            moves = moves[:np.searchsorted(reach, self.min_order_value - totals[s]) + 1]
+            totals -= np.bincount(winners[moves], weights=line_cost[moves], minlength=self.n_suppliers)
+            totals[s] += gain[moves].sum()
+            winners[moves], line_cost[moves] = s, gain[moves]
+        return winners, line_cost
+
+    def assign_exact(self, chosen, deadline: float):
+        """
+        Cheapest assignment of the lines to suppliers in `chosen` (some may end up
+        unused) where every used supplier meets the minimum order value.
+        Returns (objective, winners, final supplier set, proven); `proven` is False
+        when the deadline cut the search short.
+        """
+        heuristic = self.assign(chosen)
+        chosen = list(chosen)
+        if not self.min_order_value or not chosen:
+            return (*heuristic, True)
+        sub = self.cost[:, chosen]
+        cheapest = sub.min(axis=1)
+        pick = np.array(chosen)[sub.argmin(axis=1)]
+        won = np.isfinite(cheapest)
+        totals = np.bincount(pick[won], weights=cheapest[won], minlength=self.n_suppliers)
+        if not any(0 < totals[s] < self.min_order_value for s in chosen):
+            return (*heuristic, True)  # The cheapest assignment already complies
+        lines = [l for l in range(self.n_lines) if won[l]]
+        if len(lines) > MAX_EXACT_LINES:
+            return (*heuristic, False)
+
+        # Most contested lines first: largest gap between best and second-best bid
+        finite = np.where(np.isfinite(sub), sub, np.nan)
+        regret = [np.nansum(np.sort(finite[l])[:2] * [-1, 1]) if np.isfinite(sub[l]).sum() > 1 else np.inf for l in lines]
+        lines = [lines[i] for i in np.argsort(regret)[::-1]]
+        options = [[j for j in np.argsort(sub[l]) if np.isfinite(sub[l, j])] + [-1] for l in lines]
+        line_min = np.array([cheapest[l] for l in lines])
+        suffix_min = np.append(np.cumsum(line_min[::-1])[::-1], 0.0)
+        capacity = np.where(np.isfinite(sub[lines]), sub[lines], 0.0)
+        suffix_cap = np.vstack([np.cumsum(capacity[::-1], axis=0)[::-1], np.zeros(len(chosen))])
+        base_uncovered = int((self.coverable & ~won).sum())
+
+        best_obj, best_winners, _ = heuristic
+        current = np.full(self.n_lines, -1)
+        set_totals = np.zeros(len(chosen))
+        timed_out = False
+
+        # Depth-first over lines with an explicit stack: level i holds the next
+        # option to try for lines[i], the option taken and the running objective
+        n = len(lines)
+        next_option = [0] * n
+        taken = [None] * n
+        uncovered = [base_uncovered] + [0] * n
+        total = [0.0] * (n + 1)
+        i, entering = 0, True
+        while i >= 0:
+            if entering:
+                if time.perf_counter() > deadline:
+                    timed_out = True
+                    break
+                short = (set_totals > 0) & (set_totals < self.min_order_value)
+                if ((uncovered[i], total[i] + suffix_min[i]) >= best_obj
+                        or (set_totals[short] + suffix_cap[i][short] < self.min_order_value).any()):
+                    i, entering = i - 1, False
+                    continue
+                if i == n:
+                    if not short.any():
+                        best_obj, best_winners = (uncovered[i], total[i]), current.copy()
+                    i, entering = i - 1, False
+                    continue
+                next_option[i] = 0
+            l = lines[i]
+            if taken[i] is not None:
+                set_totals[taken[i]] -= sub[l, taken[i]]
+                current[l], taken[i] = -1, None
+            if next_option[i] == len(options[i]):
+                i, entering = i - 1, False
+                continue
+            j = options[i][next_option[i]]
+            next_option[i] += 1
+            if j < 0:
+                uncovered[i + 1], total[i + 1] = uncovered[i] + 1, total[i]
+            else:
+                set_totals[j] += sub[l, j]
+                current[l], taken[i] = chosen[j], j
+                uncovered[i + 1], total[i + 1] = uncovered[i], total[i] + sub[l, j]
+            i, entering = i + 1, True
+
+        line_cost = np.where(best_winners >= 0, self.cost[np.arange(self.n_lines), np.maximum(best_winners, 0)], 0.0)
+        final_set = sorted(set(best_winners[best_winners >= 0].tolist()))
+        return self._objective(best_winners, line_cost), best_winners, final_set, not timed_out
+
+    def _objective(self, winners, line_cost):
+        # Leaving a coverable line unawarded costs more than any real award
+        uncovered = int(((winners < 0) & self.coverable).sum())
+        total = float(np.where(winners >= 0, line_cost, 0.0).sum())
+        return (uncovered, total)
+
+    def lower_bound(self, included, remaining):
+        """
+        Relaxation ignoring K and minimum order values: each line at its cheapest
+        bid among included + still-undecided suppliers.
+        """
+        cols = list(included) + list(remaining)
+        if not cols:
+            return (int(self.coverable.sum()), 0.0)
+        best = self.cost[:, cols].min(axis=1)
+        uncovered = int((~np.isfinite(best) & self.coverable).sum())
+        return (uncovered, float(np.where(np.isfinite(best), best, 0.0).sum()))
+
+def _greedy(problem: _AwardProblem, max_suppliers: int, deadline: float):
+    """
+    Forward selection then 1-swap local search over supplier sets.
+    Returns (objective, supplier set, finished); on the deadline the search
+    stops with the best set so far and `finished` False.
+    """
+    chosen = []
+    best_obj, _, _ = problem.assign(chosen)
+    while len(chosen) < max_suppliers:
+        trials = []
+        for s in range(problem.n_suppliers):
+            if s in chosen:
+                continue
+            if time.perf_counter() > deadline:
+                return best_obj, chosen, False
+            trials.append((problem.assign(chosen + [s])[0], s))
+        if not trials:
+            break
+        obj, s = min(trials)
+        if obj >= best_obj:
+            break
+        chosen.append(s)
+        best_obj = obj
+
+    # 1-swap local search
+    improved = True
+    while improved:
+        improved = False
+        for out in list(chosen):
+            for s in range(problem.n_suppliers):
+                if s in chosen:
+                    continue
+                if time.perf_counter() > deadline:
+                    return best_obj, chosen, False
+                trial = [c for c in chosen if c != out] + [s]
+                obj = problem.assign(trial)[0]
+                if obj < best_obj:
+                    chosen, best_obj, improved = trial, obj, True
+                    break
+            if improved:
+                break
+    return best_obj, chosen, True
+
+def _branch_and_bound(problem: _AwardProblem, max_suppliers: int, incumbent, deadline: float):
+    best_obj, best_set = incumbent
+    best_winners = problem.assign(best_set)[1]
+    # Most useful suppliers first: those that are cheapest on the most lines
+    finite_cost = np.where(np.isfinite(problem.cost), problem.cost, np.inf)
+    wins = np.bincount(finite_cost.argmin(axis=1)[problem.coverable], minlength=problem.n_suppliers)
+    order = [int(s) for s in np.argsort(-wins)]
+    proven = True
+
+    def dfs(depth, included):
+        nonlocal best_obj, best_set, best_winners, proven
+        if time.perf_counter() > deadline:
+            proven = False
+            return
+        remaining = order[depth:] if len(included) < max_suppliers else []
+        if problem.lower_bound(included, remaining) >= best_obj:
+            return
+        if depth == len(order) or len(included) == max_suppliers:
+            obj, winners, final_set, exact = problem.assign_exact(included, deadline)
+            proven = proven and exact
+            if obj < best_obj:
+                best_obj, best_set, best_winners = obj, final_set, winners
+            return
+        dfs(depth + 1, included + [order[depth]])
+        dfs(depth + 1, included)
+
+    dfs(0, [])
+    return (best_obj, best_winners, best_set), proven
+
+def solve_award(bids: pd.DataFrame, max_suppliers: int = None, min_order_value: float = 0.0,
+                excluded=(), time_limit: float = 5.0):
+    """
+    Chooses one winning bid per line.
+
+    `bids` has one row per line x supplier with 'line', 'supplier', 'quote_id'
+    and 'extended' (see candidate_bids). Returns a dict with the winning rows
+    ('awards'), 'total', 'suppliers', 'unawarded' line numbers and 'status'
+    ('optimal' or 'time_limit'; with a minimum order value, 'optimal' only
+    when every supplier set's assignment was searched exhaustively).
+    """
+    bids = bids[~bids['supplier'].isin(list(excluded))]
+    lines = sorted(bids['line'].unique()) if not bids.empty else []
+    if not lines:
+        return {"awards": bids.iloc[0:0], "total": 0.0, "suppliers": [], "unawarded": [], "status": "optimal"}
+
+    suppliers = sorted(bids['supplier'].unique())
+    line_idx = pd.Index(lines)
+    supplier_idx = pd.Index(suppliers)
+    cost = np.full((len(lines), len(suppliers)), np.inf)
+    cost[line_idx.get_indexer(bids['line']), supplier_idx.get_indexer(bids['supplier'])] = bids['extended'].to_numpy(dtype=float)
+
+    problem = _AwardProblem(cost, min_order_value)
+    k = min(max_suppliers or len(suppliers), len(suppliers))
+    deadline = time.perf_counter() + time_limit
+
+    if k >= len(suppliers) and not problem.min_order_value:
+        # Unconstrained: cheapest bid per line is optimal
+        obj, winners, chosen = problem.assign(range(len(suppliers)))
+        status = "optimal"
+    else:
+        best_obj, best_set, finished = _greedy(problem, k, deadline)
+        if finished:
+            (obj, winners, chosen), proven = _branch_and_bound(problem, k, (best_obj, best_set), deadline)
+        else:
+            obj, winners, chosen = problem.assign(best_set)
+            proven = False
+        status = "optimal" if proven else "time_limit"
+
+    awarded = pd.DataFrame({
+        'line': [line for line, w in zip(lines, winners) if w >= 0],
+        'supplier': [suppliers[w] for w in winners if w >= 0],
+    })
+    awards = bids.merge(awarded, on=['line', 'supplier']).sort_values('line').reset_index(drop=True)
+
+    return {
+        "awards": awards,
+        "total": obj[1],
+        "suppliers": [suppliers[s] for s in chosen],
+        "unawarded": [line for line, w in zip(lines, winners) if w < 0],
+        "status": status,
+    }
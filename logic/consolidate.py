@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+from logic.analysis import normalize_item_name, build_bid_tab
+from logic.uom import canonical_uom
+
+# --- CONSOLIDATED DEMAND ---
+# Several RFQs (often from the same customer in one week) ask for the same
+# items. Their lines are merged and grouped into distinct items: same item code,
+# or same name when a line has no code, in the same canonical unit. Quantities
+# are summed per item, so matching, quote lookup and the bid tab run once per
+# distinct item; the best bid is then allocated back to every source line.
+
+_NO_CODE = {"", "-", "n/a", "na", "none", "null"}
+
+def rfq_title(rfq: dict) -> str:
+    return (rfq.get('parsed_json') or {}).get('title') or f"RFQ #{rfq['id']}"
+
+def merge_rfq_lines(rfqs) -> pd.DataFrame:
+    """
+    Items of all `rfqs`, one row per RFQ line, with 'rfq_id', 'rfq_title' and the 1-based 'rfq_line'.
+    """
+    frames = []
+    for rfq in rfqs:
+        items = (rfq.get('parsed_json') or {}).get('items') or []
+        if items:
+            frames.append(pd.DataFrame(items).assign(
+                rfq_id=rfq['id'], rfq_title=rfq_title(rfq), rfq_line=np.arange(1, len(items) + 1)
+            ))
+    lines = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['rfq_id', 'rfq_title', 'rfq_line'])
+    for col in ('item_code', 'name', 'description', 'uom', 'quantity'):
+        if col not in lines:
+            lines[col] = None
+    return lines
+
+def _most_common(items: pd.Series, values: pd.Series) -> pd.Series:
+    """
+    Most frequent non-blank value per item (first seen wins ties), indexed by item.
+    """
+    df = pd.DataFrame({'item': items, 'value': values})
+    df = df[df['value'].notna() & (df['value'].astype(str).str.strip() != "")]
+    counts = df.groupby(['item', 'value'], sort=False).size().rename('n').reset_index()
+    return counts.sort_values('n', ascending=False, kind='stable').drop_duplicates('item').set_index('item')['value']
+
+def consolidate_lines(lines: pd.DataFrame, products: pd.DataFrame = None):
+    """
+    Groups merged RFQ lines (see merge_rfq_lines) into distinct items.
+
+    Lines with the same item code are one item; a line without a code joins the
+    coded item of the same name if there is exactly one, otherwise it is grouped
+    by name. Items are also split by canonical unit, since quantities in
+    different units cannot be summed. Each item's name is the most common one
+    among its lines, preferring names that match a product in `products`.
+
+    Returns (demand, sources):
+      - demand:  one row per item: 'item', 'item_code', 'name', 'description',
+                 'uom', 'quantity' (summed), 'rfqs' and 'lines' (counts)
+      - sources: `lines` with the 'item' each line was grouped into
+    """
+    sources = lines.reset_index(drop=True).copy()
+    demand_cols = ['item', 'item_code', 'name', 'description', 'uom', 'quantity', 'rfqs', 'lines']
+    if sources.empty:
+        return pd.DataFrame(columns=demand_cols), sources.assign(item=pd.Series(dtype=int))
+
+    code = sources['item_code'].fillna("").astype(str).str.strip().str.upper()
+    code = code.where(~code.str.lower().isin(_NO_CODE), "")
+    name = normalize_item_name(sources['name'])
+    unit = sources['uom'].map(canonical_uom).fillna("")
+
+    coded = pd.DataFrame({'name': name, 'code': code})[code != ""].drop_duplicates()
+    unique_code = coded.groupby('name')['code'].agg(lambda c: c.iloc[0] if len(c) == 1 else "")
+    code = code.where(code != "", name.map(unique_code).fillna(""))
+    group = np.where(code != "", "code:" + code, "name:" + name)
+    # Lines with neither a code nor a name stay on their own
+    sources['group'] = np.where((code == "") & (name == ""), "line:" + sources.index.astype(str), group + "|" + unit)
+    # Items numbered in order of first appearance
+    sources['item'] = pd.factorize(sources['group'])[0] + 1
+
+    qty = pd.to_numeric(sources['quantity'], errors='coerce')
+    sources['qty'] = qty.where(qty > 0, 1.0).fillna(1.0)
+
+    item = sources['item']
+    matched = sources['name']
+    if products is not None and not products.empty:
+        matched = matched.where(name.isin(set(normalize_item_name(products['name']))))
+    groups = sources.groupby('item', sort=True)
+    demand = pd.DataFrame({
+        'quantity': groups['qty'].sum(),
+        'rfqs': groups['rfq_id'].nunique(),
+        'lines': groups.size(),
+    })
+    demand['item_code'] = _most_common(item, sources['item_code'])
+    demand['name'] = _most_common(item, matched).combine_first(_most_common(item, sources['name']))
+    demand['description'] = _most_common(item, sources['description'])
+    demand['uom'] = _most_common(item, sources['uom'])
+    demand = demand.rename_axis('item').reset_index()
+    return demand[demand_cols], sources.drop(columns=['group'])
+
+def allocate(sources: pd.DataFrame, item_summary: pd.DataFrame) -> pd.DataFrame:
+    """
+    Every source line with its item's best supplier and its share of the item's
+    best total, pro rata to quantity ('unit_price' is per the line's unit).
+    """
+    best = item_summary.rename(columns={'line': 'item', 'quantity': 'item_qty'})[
+        ['item', 'item_qty', 'best_supplier', 'currency', 'best_total']]
+    alloc = sources[['rfq_id', 'rfq_title', 'rfq_line', 'item', 'item_code', 'name', 'qty', 'uom']].merge(best, on='item', how='left')
+    alloc['unit_price'] = alloc['best_total'] / alloc['item_qty']
+    alloc['line_total'] = alloc['unit_price'] * alloc['qty']
+    return alloc.drop(columns=['item_qty', 'best_total'])
+
+def build_consolidated_bid_tab(rfqs, products: pd.DataFrame, quotes: pd.DataFrame, conversions: pd.DataFrame = None):
+    """
+    Bid tab over the distinct items of several RFQs (see analysis.build_bid_tab,
+    whose 'line' is the item number here), plus:
+      - 'demand':     consolidated items with summed quantities
+      - 'allocation': best bid per source RFQ line
+      - 'rfqs':       per-RFQ line count, lines with a bid and best-bid total
+    `products` and `quotes` come from one fetch_candidate_quotes call over all line names.
+    """
+    demand, sources = consolidate_lines(merge_rfq_lines(rfqs), products)
+    tab = build_bid_tab(demand, products, quotes, conversions)
+    tab["lines"] = tab["lines"].merge(demand[['item', 'item_code', 'uom', 'quantity', 'rfqs', 'lines']].rename(
+        columns={'item': 'line', 'lines': 'source_lines'}), on='line', how='left')
+    for col, empty in (('qty', np.nan), ('currency', None), ('best_total', np.nan), ('bids', 0)):
+        if col not in tab["lines"]:
+            tab["lines"][col] = empty  # No bids at all (see build_bid_tab)
+    allocation = allocate(sources, tab["lines"])
+    per_rfq = allocation.groupby(['rfq_id', 'rfq_title'], sort=False).agg(
+        lines=('rfq_line', 'size'), lines_with_bid=('line_total', 'count'), best_total=('line_total', 'sum')
+    ).reset_index()
+    return {**tab, "demand": demand, "allocation": allocation, "rfqs": per_rfq}
@@ -1,8 +1,17 @@
 import os
+import time
+import asyncio
+import hashlib
+import weakref
+import threading
+from collections import OrderedDict
 import streamlit as st
-from supabase import create_client, Client
+from typing import TYPE_CHECKING
 from dotenv import load_dotenv
 
+if TYPE_CHECKING:
+    from supabase import Client
+
 load_dotenv()
 
 # --- SUPABASE CONFIGURATION ---
@@ -34,11 +43,165 @@ def get_supabase_credentials():
         
     return None, None
 
+# --- CLIENT POOL ---
+# Credentials are per session (Settings page), so clients are pooled per
+# (URL, key hash) instead of one process-wide client: each user keeps a warm
+# client and its keep-alive HTTP connections, and changing credentials never
+# drops anyone else's. Each entry can also hold an async client for the same
+# credentials (see logic/fetch.py); those live on one event loop thread per pool.
+
+SUPABASE_POOL_SIZE = int(os.getenv("SUPABASE_POOL_SIZE", "16"))
+SUPABASE_POOL_IDLE_SECONDS = float(os.getenv("SUPABASE_POOL_IDLE_SECONDS", "900"))
+
+def client_pool_key(url: str, key: str):
+    return url.rstrip("/"), hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+def client_cache_key(client):
+    """
+    Hash for st.cache_data arguments: cached reads are shared per project/key, never across them.
+    """
+    return getattr(client, "pool_key", None)
+
+# Use as st.cache_data(hash_funcs=CLIENT_HASH_FUNCS) on functions taking the client
+CLIENT_HASH_FUNCS = {
+    "supabase._sync.client.SyncClient": client_cache_key,
+    "supabase._sync.client.Client": client_cache_key,
+    "logic.mirror.MirroredClient": client_cache_key,
+    "logic.standin.StandInSupabase": client_cache_key,
+}
+
+class SupabaseClientPool:
+    """
+    Bounded LRU of clients keyed by (URL, SHA-256 of the key); the key itself is
+    never stored. Clients idle for longer than `idle_seconds` are evicted on the
+    next lookup, and the least recently used one when the pool is full. A
+    session or in-flight request may still hold an evicted client, so its
+    connections are only closed once the last reference to it is gone.
+    """
+    def __init__(self, max_size: int = SUPABASE_POOL_SIZE, idle_seconds: float = SUPABASE_POOL_IDLE_SECONDS):
+        self.max_size = max_size
+        self.idle_seconds = idle_seconds
+        self._clients = OrderedDict()  # pool key -> [client, http client, last used, async client, async http client]
+        self._lock = threading.Lock()
+        self._loop = None
+        self.created = 0
+        self.evicted = 0
+
+    def get(self, url: str, key: str):
+        with self._lock:
+            return self._entry(url, key)[0]
+
+    def get_async(self, url: str, key: str):
+        """
+        The async client for the same credentials. Only use it through `run()`:
+        it is bound to the pool's event loop.
+        """
+        loop = self._event_loop()
+        with self._lock:
+            entry = self._entry(url, key)
+            if entry[3] is None:
+                entry[3:5] = asyncio.run_coroutine_threadsafe(self._create_async(url, key), loop).result()
+            return entry[3]
+
+    def run(self, coro, timeout: float = None):
+        """
+        Runs a coroutine on the pool's event loop thread and waits for its result.
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self._event_loop()).result(timeout)
+
+    def discard(self, url: str, key: str):
+        with self._lock:
+            entry = self._clients.pop(client_pool_key(url, key), None)
+            if entry:
+                self._close(entry)
+
+    def stats(self):
+        with self._lock:
+            return {"clients": len(self._clients), "max_size": self.max_size, "created": self.created, "evicted": self.evicted}
+
+    def _entry(self, url, key):
+        # Caller holds the lock
+        pool_key = client_pool_key(url, key)
+        self._evict_idle()
+        entry = self._clients.get(pool_key)
+        if entry is None:
+            entry = self._clients[pool_key] = list(self._create(url, key, pool_key)) + [0.0, None, None]
+            self.created += 1
+            while len(self._clients) > self.max_size:
+                self._close(self._clients.popitem(last=False)[1])
+        self._clients.move_to_end(pool_key)
+        entry[2] = time.monotonic()
+        return entry
+
+    def _event_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="supabase-async", daemon=True).start()
+            return self._loop
+
+    def _create(self, url, key, pool_key):
+        # Imported here: the SDK (httpx, realtime, storage...) is slow to load and
+        # only needed once credentials exist
+        import httpx
+        from supabase import create_client, ClientOptions
+
+        # One keep-alive connection pool per client, shared by its REST, auth and storage calls
+        http = httpx.Client(
+            timeout=httpx.Timeout(120.0, connect=10.0),
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60.0),
+        )
+        client = create_client(url, key, ClientOptions(httpx_client=http))
+        client.pool_key = pool_key
+        client.client_pool = self
+
+        # Optional local read replica of the catalog tables (see logic/mirror.py)
+        from logic.mirror import mirror_enabled, MirroredClient
+        if mirror_enabled():
+            client = MirroredClient(client, get_local_mirror(url))
+        return client, http
+
+    async def _create_async(self, url, key):
+        import httpx
+        from supabase import acreate_client, AsyncClientOptions
+
+        http = httpx.AsyncClient(
+            timeout=httpx.Timeout(120.0, connect=10.0),
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60.0),
+        )
+        return await acreate_client(url, key, AsyncClientOptions(httpx_client=http)), http
+
+    def _evict_idle(self):
+        now = time.monotonic()
+        for pool_key in [k for k, entry in self._clients.items() if now - entry[2] > self.idle_seconds]:
+            self._close(self._clients.pop(pool_key))
+
+    def _close(self, entry):
+        # Drops the pool's references; the clients close when their last holder lets go
+        self.evicted += 1
+        client, http, _, async_client, async_http = entry
+        entry.clear()
+        weakref.finalize(client, _close_quietly, http)
+        if async_client is not None:
+            weakref.finalize(async_client, self._aclose, async_http)
+
+    def _aclose(self, http):
+        asyncio.run_coroutine_threadsafe(http.aclose(), self._loop)
+
+def _close_quietly(http):
+    try:
+        http.close()
+    except Exception:
+        pass
+
 @st.cache_resource
-def get_supabase() -> Client:
+def get_client_pool():
+    return SupabaseClientPool()
+
+def get_supabase() -> "Client":
     """
-    Creates and caches the Supabase client.
-    Clearing cache (st.cache_resource.clear()) forces re-initialization.
+    Returns the pooled Supabase client for the current credentials, or None when
+    none are configured. Cheap to call on every rerun.
     """
     url, key = get_supabase_credentials()
     
@@ -46,14 +209,23 @@ def get_supabase() -> Client:
         # If credentials are missing, we might still want to return a dummy or raise warning
         # For now, let's return None and handle it in pages
         return None
-        
-    return create_client(url, key)
+
+    return get_client_pool().get(url, key)
+
+@st.cache_resource
+def get_local_mirror(url: str):
+    """
+    The SQLite mirror of one project, shared by all sessions on this server that use it.
+    """
+    from logic.mirror import LocalMirror, mirror_path
+    return LocalMirror(mirror_path(url))
 
 # --- UTILS / MODELS REPRESENTATION ---
 # While we don't use SQLAlchemy ORM for REST, these names help maintain alignment
 TABLE_SUPPLIERS = "suppliers"
 TABLE_PRODUCTS = "products"
 TABLE_QUOTES = "quotes"
+TABLE_QUOTES_ARCHIVE = "quotes_archive"
 TABLE_RFQS = "rfqs"
 
 def get_db():
@@ -0,0 +1,162 @@
+import re
+from collections import defaultdict
+import numpy as np
+from logic.database import TABLE_PRODUCTS, TABLE_QUOTES, TABLE_QUOTES_ARCHIVE
+from logic.embeddings import parse_vector
+
+# --- NEAR-DUPLICATE PRODUCT DETECTION ---
+# Products are only compared inside blocks (shared part code, or a shared
+# random-hyperplane LSH bucket of their embedding), never all-pairs, so the
+# job stays roughly linear in catalog size.
+
+def name_tokens(name: str):
+    """
+    Uppercased alphanumeric tokens: "BELT, V, OPTIBELT-SK 2120" -> ['BELT', 'V', 'OPTIBELT', 'SK', '2120'].
+    """
+    return re.findall(r"[A-Z0-9]+", (name or "").upper())
+
+def code_keys(name: str):
+    """
+    Part-code-like keys: tokens containing digits, plus letter+number pairs
+    glued together so "SK 2120", "SK-2120" and "SK2120" all yield "SK2120".
+    """
+    tokens = name_tokens(name)
+    keys = {t for t in tokens if any(c.isdigit() for c in t) and len(t) >= 3}
+    for a, b in zip(tokens, tokens[1:]):
+        if a.isalpha() and b.isdigit():
+            keys.add(a + b)
+    return keys
+
+def jaccard(a: set, b: set):
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+def lsh_buckets(vectors: np.ndarray, bands: int = 8, bits: int = 12, seed: int = 0, chunk_size: int = 50000):
+    """
+    Random-hyperplane LSH. Returns one int64 bucket key per (row, band).
+    Rows with cosine close to 1 share at least one band key with high probability.
+    """
+    rng = np.random.default_rng(seed)
+    planes = rng.normal(size=(vectors.shape[1], bands * bits)).astype(np.float32)
+    weights = (1 << np.arange(bits)).astype(np.int64)
+    keys = np.empty((len(vectors), bands), dtype=np.int64)
+    for start in range(0, len(vectors), chunk_size):
+        signs = (vectors[start:start + chunk_size] @ planes) > 0
+        signs = signs.reshape(len(signs), bands, bits)
+        keys[start:start + chunk_size] = (signs * weights).sum(axis=2) + np.arange(bands) * (1 << bits)
+    return keys
+
+def candidate_pairs(products: list, vectors: np.ndarray = None, max_block: int = 200):
+    """
+    Yields (i, j) index pairs that share a code key or an LSH bucket.
+    Oversized blocks (generic codes, dense buckets) are skipped.
+    """
+    blocks = defaultdict(list)
+    for i, p in enumerate(products):
+        for key in code_keys(p['name']):
+            blocks[("code", key)].append(i)
+
+    if vectors is not None:
+        has_vector = np.flatnonzero(np.abs(vectors).sum(axis=1) > 0)
+        keys = lsh_buckets(vectors[has_vector])
+        for row, bucket_keys in zip(has_vector, keys):
+            for key in bucket_keys:
+                blocks[("lsh", int(key))].append(int(row))
+
+    seen = set()
+    for members in blocks.values():
+        if len(members) < 2 or len(members) > max_block:
+            continue
+        for x in range(len(members)):
+            for y in range(x + 1, len(members)):
+                pair = (members[x], members[y]) if members[x] < members[y] else (members[y], members[x])
+                if pair not in seen:
+                    seen.add(pair)
+                    yield pair
+
+def find_duplicate_groups(products: list, vectors: np.ndarray = None, cosine_threshold: float = 0.93,
+                          code_cosine_threshold: float = 0.85, code_jaccard_threshold: float = 0.3):
+    """
+    Clusters products into proposed merge groups.
+
+    A pair is linked when its embeddings are very close, or when it shares a part
+    code and is either semantically close or shares enough name tokens.
+    `vectors` rows must be L2-normalized and aligned with `products` (zeros = missing).
+    Returns a list of groups, each a list of product dicts with a 'score' field.
+    """
+    parent = list(range(len(products)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    tokens = [set(name_tokens(p['name'])) for p in products]
+    codes = [code_keys(p['name']) for p in products]
+    best_score = defaultdict(float)
+
+    for i, j in candidate_pairs(products, vectors):
+        cos = float(vectors[i] @ vectors[j]) if vectors is not None else 0.0
+        shared_code = bool(codes[i] & codes[j])
+        linked = cos >= cosine_threshold or (
+            shared_code and (cos >= code_cosine_threshold or jaccard(tokens[i], tokens[j]) >= code_jaccard_threshold)
+        )
+        if linked:
+            parent[find(i)] = find(j)
+            score = max(cos, jaccard(tokens[i], tokens[j]))
+            best_score[i] = max(best_score[i], score)
+            best_score[j] = max(best_score[j], score)
+
+    groups = defaultdict(list)
+    for i in range(len(products)):
+        groups[find(i)].append(i)
+
+    result = []
+    for members in groups.values():
+        if len(members) > 1:
+            result.append([{**products[i], "score": best_score[i]} for i in sorted(members, key=lambda m: products[m]['id'])])
+    return sorted(result, key=len, reverse=True)
+
+# --- LOADING & MERGING ---
+
+def load_products_for_dedupe(supabase, store=None, page_size: int = 1000):
+    """
+    Loads (products, normalized vectors) in keyset pages. Vectors come from the
+    local embedding store when available, otherwise from `products.embedding`.
+    """
+    products, vectors = [], []
+    columns = 'id, name, description' if store is not None else 'id, name, description, embedding'
+    last_id = 0
+    while True:
+        rows = supabase.table(TABLE_PRODUCTS).select(columns).gt('id', last_id).order('id').limit(page_size).execute().data
+        if not rows:
+            break
+        for r in rows:
+            vec = store.vector(r['id']) if store is not None else parse_vector(r.pop('embedding', None))
+            products.append(r)
+            vectors.append(vec)
+        last_id = rows[-1]['id']
+
+    if not products:
+        return [], None
+    dim = next((len(v) for v in vectors if v is not None), None)
+    if dim is None:
+        return products, None
+    matrix = np.zeros((len(products), dim), dtype=np.float32)
+    for i, v in enumerate(vectors):
+        if v is not None:
+            matrix[i] = v
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return products, matrix / np.where(norms == 0, 1.0, norms)
+
+def merge_products(supabase, keep_id: int, duplicate_ids: list, chunk_size: int = 200):
+    """
+    Repoints every quote of the duplicates (archived ones too) to `keep_id` in bulk, then deletes the duplicates.
+    """
+    duplicate_ids = [d for d in duplicate_ids if d != keep_id]
+    for start in range(0, len(duplicate_ids), chunk_size):
+        chunk = duplicate_ids[start:start + chunk_size]
+        supabase.table(TABLE_QUOTES).update({"product_id": keep_id}).in_('product_id', chunk).execute()
+        supabase.table(TABLE_QUOTES_ARCHIVE).update({"product_id": keep_id}).in_('product_id', chunk).execute()
+        supabase.table(TABLE_PRODUCTS).delete().in_('id', chunk).execute()
+    return len(duplicate_ids)
@@ -0,0 +1,261 @@
+import os
+import json
+import hashlib
+import logging
+import numpy as np
+import streamlit as st
+from logic.database import TABLE_PRODUCTS
+from logic.parser import EMBEDDING_MODEL
+from logic.embeddings import CACHE_DIR, parse_vector
+
+# --- COMPACT LOCAL EMBEDDING STORE ---
+# Product vectors as flat quantized arrays on disk, opened with np.memmap so a
+# 500k-product catalog costs one page-cache-backed file instead of ~1.5 GB of
+# Python lists. Vectors are L2-normalized on write, so a dot product is cosine.
+#
+# Layout of a store directory (one per Supabase project, see store_path):
+#   meta.json    dtype, dim, count, model, max_id, max_updated_at
+#   ids.bin      int64 product ids, ascending
+#   vectors.bin  float16 or int8 rows
+#   scales.bin   float32 per-row scale (int8 only)
+#
+# The store is a snapshot: products inserted or re-embedded after the build
+# (id > max_id or updated_at > max_updated_at) are read from `products` at
+# search time and scored alongside it, until the delta grows past
+# STORE_MAX_DELTA and search falls back to the `match_products` RPC.
+
+STORE_PATH = os.getenv("EMBEDDING_STORE_PATH", os.path.join(CACHE_DIR, "embedding_store"))
+STORE_MAX_DELTA = int(os.getenv("EMBEDDING_STORE_MAX_DELTA", "2000"))
+DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+
+logger = logging.getLogger(__name__)
+
+def store_path(url: str):
+    """
+    One store directory per Supabase project, so a store built from one project never answers for another.
+    """
+    return f"{STORE_PATH}-{hashlib.sha256(url.rstrip('/').encode('utf-8')).hexdigest()[:12]}"
+
+def client_store_path(supabase):
+    return store_path(str(supabase.supabase_url))
+
+def quantize(vectors: np.ndarray, dtype: str):
+    """
+    Normalizes rows and converts them to the storage dtype.
+    Returns (quantized rows, per-row scales or None).
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms == 0, 1.0, norms)
+
+    if dtype == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales = np.where(scales == 0, 1.0, scales).astype(np.float32)
+        return np.round(vectors / scales[:, None]).astype(np.int8), scales
+    return vectors.astype(DTYPES[dtype]), None
+
+class EmbeddingStoreWriter:
+    """
+    Appends (ids, vectors) batches to a store directory; call close() to publish it.
+    Ids must arrive in ascending order (keyset pages do this naturally).
+    """
+    def __init__(self, path: str, dim: int, dtype: str = "float16", model: str = EMBEDDING_MODEL):
+        if dtype not in DTYPES:
+            raise ValueError(f"Unsupported dtype '{dtype}'. Use one of {list(DTYPES)}.")
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.meta = {"dtype": dtype, "dim": dim, "count": 0, "model": model, "max_id": 0, "max_updated_at": None}
+        # Write next to the live files and swap on close, so readers never see a half-built store
+        self._ids = open(os.path.join(path, "ids.bin.tmp"), "wb")
+        self._vectors = open(os.path.join(path, "vectors.bin.tmp"), "wb")
+        self._scales = open(os.path.join(path, "scales.bin.tmp"), "wb")
+
+    def append(self, ids, vectors, updated_at=()):
+        if len(ids) == 0:
+            return
+        self.meta["max_id"] = max(self.meta["max_id"], int(max(ids)))
+        stamps = [u for u in updated_at if u] + ([self.meta["max_updated_at"]] if self.meta["max_updated_at"] else [])
+        if stamps:
+            self.meta["max_updated_at"] = max(stamps)
+        rows, scales = quantize(vectors, self.meta["dtype"])
+        if rows.shape[1] != self.meta["dim"]:
+            raise ValueError(f"Expected {self.meta['dim']}-dim vectors, got {rows.shape[1]}.")
+        np.asarray(ids, dtype=np.int64).tofile(self._ids)
+        rows.tofile(self._vectors)
+        if scales is not None:
+            scales.tofile(self._scales)
+        self.meta["count"] += len(ids)
+
+    def close(self):
+        for f in (self._ids, self._vectors, self._scales):
+            f.close()
+        for name in ("ids.bin", "vectors.bin", "scales.bin"):
+            os.replace(os.path.join(self.path, name + ".tmp"), os.path.join(self.path, name))
+        with open(os.path.join(self.path, "meta.json"), "w") as f:
+            json.dump(self.meta, f)
+
+class EmbeddingStore:
+    """
+    Read-only, memory-mapped view of a store directory.
+    """
+    def __init__(self, path: str):
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        count, dim = self.meta["count"], self.meta["dim"]
+        dtype = DTYPES[self.meta["dtype"]]
+
+        self.path = path
+        self.ids = np.memmap(os.path.join(path, "ids.bin"), dtype=np.int64, mode="r", shape=(count,)) if count else np.empty(0, np.int64)
+        self.vectors = np.memmap(os.path.join(path, "vectors.bin"), dtype=dtype, mode="r", shape=(count, dim)) if count else np.empty((0, dim), dtype)
+        self.scales = None
+        if self.meta["dtype"] == "int8" and count:
+            self.scales = np.memmap(os.path.join(path, "scales.bin"), dtype=np.float32, mode="r", shape=(count,))
+
+    def __len__(self):
+        return self.meta["count"]
+
+    def row_of(self, product_id: int):
+        """
+        Row index of a product id, or None. Ids are sorted, so this is a binary search.
+        """
+        pos = int(np.searchsorted(self.ids, product_id))
+        if pos < len(self.ids) and self.ids[pos] == product_id:
+            return pos
+        return None
+
+    def vector(self, product_id: int):
+        row = self.row_of(product_id)
+        if row is None:
+            return None
+        vec = self.vectors[row].astype(np.float32)
+        return vec * self.scales[row] if self.scales is not None else vec
+
+    def scores(self, query, chunk_size: int = 65536):
+        """
+        Cosine similarity of the query against every stored vector, scanned in chunks.
+        """
+        q = np.asarray(query, dtype=np.float32)
+        q = q / (np.linalg.norm(q) or 1.0)
+        out = np.empty(len(self), dtype=np.float32)
+        for start in range(0, len(self), chunk_size):
+            stop = min(start + chunk_size, len(self))
+            chunk = self.vectors[start:stop].astype(np.float32) @ q
+            if self.scales is not None:
+                chunk *= self.scales[start:stop]
+            out[start:stop] = chunk
+        return out
+
+    def search(self, query, k: int = 5, threshold: float = None):
+        """
+        Returns [(product_id, similarity)] for the top-k rows, best first.
+        """
+        if len(self) == 0:
+            return []
+        sims = self.scores(query)
+        k = min(k, len(sims))
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.argsort(-sims[top])]
+        results = [(int(self.ids[i]), float(sims[i])) for i in top]
+        if threshold is not None:
+            results = [r for r in results if r[1] > threshold]
+        return results
+
+def build_from_supabase(supabase, path: str = None, dtype: str = "float16", page_size: int = 1000):
+    """
+    Streams `products.embedding` into a store in keyset pages (the client's
+    project store by default). Returns the row count.
+    """
+    path = path or client_store_path(supabase)
+    writer = None
+    last_id = 0
+    while True:
+        rows = supabase.table(TABLE_PRODUCTS).select('id, embedding, updated_at') \
+            .gt('id', last_id).not_.is_('embedding', 'null').order('id').limit(page_size).execute().data
+        if not rows:
+            break
+        vectors = np.array([parse_vector(r['embedding']) for r in rows], dtype=np.float32)
+        if writer is None:
+            writer = EmbeddingStoreWriter(path, dim=vectors.shape[1], dtype=dtype)
+        writer.append([r['id'] for r in rows], vectors, [r.get('updated_at') for r in rows])
+        last_id = rows[-1]['id']
+
+    if writer is None:
+        return 0
+    writer.close()
+    return writer.meta["count"]
+
+@st.cache_resource
+def load_embedding_store(path: str, mtime: float = None):
+    return EmbeddingStore(path)
+
+def get_embedding_store(path: str):
+    """
+    Returns the local store at `path` (see client_store_path) for the current
+    model, or None if none has been built.
+    The meta.json mtime is part of the cache key, so a rebuild is picked up automatically.
+    """
+    meta_path = os.path.join(path, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    store = load_embedding_store(path, os.path.getmtime(meta_path))
+    if store.meta.get("model") != EMBEDDING_MODEL:
+        return None
+    return store
+
+def fetch_store_delta(supabase, store):
+    """
+    Products inserted or updated since the store was built, as [(id, vector)],
+    or None when there are more than STORE_MAX_DELTA of them (or the store
+    predates this bookkeeping).
+    """
+    meta = store.meta
+    if "max_id" not in meta:
+        return None
+    query = supabase.table(TABLE_PRODUCTS).select('id, embedding').not_.is_('embedding', 'null')
+    if meta.get("max_updated_at"):
+        query = query.or_(f'id.gt.{meta["max_id"]},updated_at.gt."{meta["max_updated_at"]}"')
+    else:
+        query = query.gt('id', meta["max_id"])
+    rows = query.order('id').limit(STORE_MAX_DELTA + 1).execute().data
+    if len(rows) > STORE_MAX_DELTA:
+        logger.warning("Embedding store at %s is more than %d products behind; rebuild it with build_embedding_store.py",
+                       store.path, STORE_MAX_DELTA)
+        return None
+    return [(r['id'], parse_vector(r['embedding'])) for r in rows]
+
+def match_products_local(supabase, store, query_embedding, match_threshold: float, match_count: int, delta=()):
+    """
+    Local equivalent of the `match_products` RPC: scans the store and the
+    `delta` rows from fetch_store_delta (whose vectors replace stored ones),
+    then fetches only the matched product rows.
+    """
+    fresh = {pid: vec for pid, vec in delta}
+    hits = [h for h in store.search(query_embedding, k=match_count + len(fresh), threshold=match_threshold) if h[0] not in fresh]
+    if fresh:
+        q = np.asarray(query_embedding, dtype=np.float32)
+        q = q / (np.linalg.norm(q) or 1.0)
+        matrix = np.asarray(list(fresh.values()), dtype=np.float32)
+        sims = matrix @ q / np.where(np.linalg.norm(matrix, axis=1) == 0, 1.0, np.linalg.norm(matrix, axis=1))
+        hits += [(pid, float(sim)) for pid, sim in zip(fresh, sims) if sim > match_threshold]
+    hits = sorted(hits, key=lambda h: -h[1])[:match_count]
+    if not hits:
+        return []
+    res = supabase.table(TABLE_PRODUCTS).select('id, name, description, specs').in_('id', [h[0] for h in hits]).execute()
+    by_id = {p['id']: p for p in res.data}
+    return [{**by_id[pid], "similarity": sim} for pid, sim in hits if pid in by_id]
+
+def search_products(supabase, query_embedding, match_threshold: float = 0.5, match_count: int = 5):
+    """
+    Semantic product search: the project's local store (plus products added
+    since it was built) when one exists for this model, otherwise the
+    `match_products` RPC.
+    """
+    store = get_embedding_store(client_store_path(supabase))
+    delta = fetch_store_delta(supabase, store) if store is not None else None
+    if delta is not None:
+        return match_products_local(supabase, store, query_embedding, match_threshold, match_count, delta)
+    return supabase.rpc('match_products', {
+        'query_embedding': query_embedding,
+        'match_threshold': match_threshold,
+        'match_count': match_count
+    }).execute().data
@@ -0,0 +1,197 @@
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+import streamlit as st
+from logic.database import TABLE_PRODUCTS
+from logic.parser import EMBEDDING_MODEL, generate_embedding
+
+# --- PRODUCT EMBEDDING HELPERS ---
+# Product vectors are built from the same text everywhere (Log Quote, backfill),
+# so the hash of that text tells us whether a stored vector is still current.
+
+def product_embedding_text(name, description, specs):
+    """
+    Builds the text that is embedded for a product. Missing fields are left
+    out rather than embedded (and hashed) as "None".
+    """
+    parts = ["" if value is None else str(value) for value in (name, description, specs)]
+    return " ".join(p for p in parts if p.strip()).strip()
+
+def embedding_hash(text: str):
+    """
+    Returns a stable SHA-256 hex digest of the embedded text.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def needs_embedding(row: dict, text_hash: str, model: str = EMBEDDING_MODEL, prefix: str = "embedding"):
+    """
+    True if the stored vector for this row is missing or stale.
+    `prefix` selects the column set ('embedding' or the 'embedding_next' shadow).
+    """
+    return row.get(f"{prefix}_hash") != text_hash or row.get(f"{prefix}_model") != model
+
+# --- LOCAL EMBEDDING CACHE ---
+# A small SQLite file keyed by model + text hash. It survives restarts and is
+# shared by every session on the same server, so identical text is embedded once.
+
+CACHE_DIR = os.getenv("PROCUREMIND_CACHE_DIR", ".cache")
+
+class EmbeddingCache:
+    """
+    Persistent key -> vector store backed by SQLite (vectors kept as float32 blobs).
+    """
+    def __init__(self, path=None, table="product_vectors"):
+        self.path = path or os.path.join(CACHE_DIR, "embeddings.sqlite")
+        self.table = table
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS {self.table} (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self._conn.commit()
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._conn.execute(f"SELECT vector FROM {self.table} WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        vector = array("f")
+        vector.frombytes(row[0])
+        return vector.tolist()
+
+    def put(self, key: str, vector):
+        blob = array("f", vector).tobytes()
+        with self._lock:
+            self._conn.execute(f"INSERT OR REPLACE INTO {self.table} (key, vector) VALUES (?, ?)", (key, blob))
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+_product_cache = None
+
+def get_product_cache():
+    global _product_cache
+    if _product_cache is None:
+        _product_cache = EmbeddingCache()
+    return _product_cache
+
+def cache_key(text_hash: str, model: str = EMBEDDING_MODEL):
+    return f"{model}:{text_hash}"
+
+def parse_vector(value):
+    """
+    PostgREST returns pgvector columns as '[0.1,0.2,...]' strings.
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return json.loads(value)
+    return list(value)
+
+# --- DUPLICATE DETECTION & REUSE ---
+
+def find_product_by_hash(supabase, text_hash: str, with_embedding: bool = False):
+    """
+    Returns an existing product whose embedded text is identical, or None.
+    """
+    columns = "id, name, embedding_model" + (", embedding" if with_embedding else "")
+    res = supabase.table(TABLE_PRODUCTS).select(columns).eq('embedding_hash', text_hash).order('id').limit(1).execute()
+    return res.data[0] if res.data else None
+
+def get_product_embedding(supabase, text: str):
+    """
+    Returns (embedding, text_hash) for a product text, embedding only on a miss.
+    Lookup order: local cache -> an identical product already in the database -> Gemini.
+    """
+    text_hash = embedding_hash(text)
+    key = cache_key(text_hash)
+
+    vector = get_product_cache().get(key)
+    if vector is not None:
+        return vector, text_hash
+
+    existing = find_product_by_hash(supabase, text_hash, with_embedding=True) if supabase else None
+    if existing and existing.get('embedding_model') == EMBEDDING_MODEL and existing.get('embedding') is not None:
+        vector = parse_vector(existing['embedding'])
+    else:
+        vector = generate_embedding(text)
+
+    get_product_cache().put(key, vector)
+    return vector, text_hash
+
+# --- QUERY EMBEDDING CACHE ---
+# Buyers type the same short queries all day. An in-memory LRU sits in front of
+# the SQLite cache; both are shared across Streamlit sessions in this process.
+
+def normalize_query(query: str):
+    return " ".join(query.lower().split())
+
+class QueryEmbeddingCache:
+    """
+    LRU + on-disk cache of search-query embeddings with hit-rate counters.
+    """
+    def __init__(self, max_items: int = 1024, disk: EmbeddingCache = None):
+        self.max_items = max_items
+        self.disk = disk or EmbeddingCache(table="query_vectors")
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get_or_embed(self, query: str):
+        key = f"{EMBEDDING_MODEL}:{normalize_query(query)}"
+
+        with self._lock:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                self.memory_hits += 1
+                return self._lru[key]
+
+        vector = self.disk.get(key)
+        if vector is not None:
+            with self._lock:
+                self.disk_hits += 1
+        else:
+            vector = generate_embedding(normalize_query(query))
+            self.disk.put(key, vector)
+            with self._lock:
+                self.misses += 1
+
+        with self._lock:
+            self._lru[key] = vector
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_items:
+                self._lru.popitem(last=False)
+        return vector
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "lookups": lookups,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_entries": len(self._lru),
+            }
+
+@st.cache_resource
+def get_query_cache():
+    """
+    One query cache per server process, shared by every session.
+    """
+    return QueryEmbeddingCache(max_items=int(os.getenv("QUERY_CACHE_SIZE", "1024")))
+
+def embed_query(query: str):
+    """
+    Cached replacement for generate_embedding() on search queries.
+    """
+    return get_query_cache().get_or_embed(query)
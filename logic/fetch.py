@@ -0,0 +1,40 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from logic.mirror import MirroredClient
+
+# --- CONCURRENT READS ---
+# A page declares the independent reads it needs as {name: build(client) -> query}
+# and gets them back together, so it waits for its slowest query instead of the
+# sum of all of them. Pooled Supabase clients run the queries on the async
+# client for the same credentials (one event loop per pool); mirrored and
+# stand-in clients, whose reads are local, run the same builders on threads.
+
+FETCH_THREADS = 8
+
+_executor = ThreadPoolExecutor(max_workers=FETCH_THREADS, thread_name_prefix="fetch")
+
+def fetch_all(supabase, queries: dict) -> dict:
+    """
+    Executes independent reads concurrently and returns {name: rows}, e.g.
+
+        fetch_all(supabase, {
+            "suppliers": lambda c: c.table(TABLE_SUPPLIERS).select('id, name').order('name'),
+            "products": lambda c: c.table(TABLE_PRODUCTS).select('id, name').order('name'),
+        })
+
+    Builders must not call `.execute()`. The first failing query raises.
+    """
+    if len(queries) <= 1:
+        return {name: build(supabase).execute().data for name, build in queries.items()}
+
+    pool = getattr(supabase, "client_pool", None)
+    if pool is not None and not isinstance(supabase, MirroredClient):
+        async_client = pool.get_async(str(supabase.supabase_url), supabase.supabase_key)
+        return pool.run(_gather(async_client, queries))
+
+    futures = {name: _executor.submit(lambda build=build: build(supabase).execute().data) for name, build in queries.items()}
+    return {name: future.result() for name, future in futures.items()}
+
+async def _gather(client, queries: dict):
+    results = await asyncio.gather(*(build(client).execute() for build in queries.values()))
+    return {name: result.data for name, result in zip(queries, results)}
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+from logic.analysis import prepare_lines, match_line_quotes
+from logic.fx import normalize_quotes, format_money
+from logic.scorecard import rank_bids
+
+# --- FINALIZATION LINES ---
+# Shared by the Finalization page and the HTTP API: every line's candidate
+# quotes priced in the base currency per RFQ unit, the bidders' ranks, and the
+# award / recap rows produced by a winner selection.
+
+RECAP_COLUMNS = ["Item Code", "Name", "Qty", "UOM", "Specs", "Brand", "Description", "Winner", "Quoted Price", "Single Price", "Total Price"]
+
+def unit_of(q):
+    return q['uom'] if isinstance(q['uom'], str) and q['uom'] else None
+
+def line_candidates(items, products: pd.DataFrame, quotes: pd.DataFrame, conversions: pd.DataFrame, base: str, rates: pd.Series):
+    """
+    Returns (line_quotes, options, ranks):
+      - line_quotes: one row per line x quote with 'line_total' and 'rfq_unit_price' in `base`
+      - options:     {line: [quote rows cheapest first]}
+      - ranks:       {line: {supplier_id: rank}} of every bidding supplier, for the scorecard
+    """
+    quotes = normalize_quotes(quotes, base, rates)
+    line_quotes = match_line_quotes(prepare_lines(pd.DataFrame(items)), products, quotes, conversions)
+    if line_quotes.empty:
+        return line_quotes, {}, {}
+    line_quotes['supplier'] = line_quotes['supplier'].fillna("Unknown")
+    line_quotes['line_total'] = line_quotes['price'] * line_quotes['qty']
+    line_quotes['rfq_unit_price'] = line_quotes['line_total'] / line_quotes['quoted_qty']
+    line_quotes = line_quotes.sort_values(['line', 'line_total'], na_position='last')
+    options = {line: group.to_dict('records') for line, group in line_quotes.groupby('line')}
+
+    ranks = {}
+    for line, line_options in options.items():
+        supplier_totals = {}
+        for q in line_options:
+            if pd.notna(q['supplier_id']) and int(q['supplier_id']) not in supplier_totals:
+                supplier_totals[int(q['supplier_id'])] = q['line_total']
+        ranks[line] = rank_bids(supplier_totals)
+    return line_quotes, options, ranks
+
+def line_result(item, q, base: str):
+    """
+    (award row or None, recap row) for an RFQ line and its selected quote (None = pending).
+    """
+    qty = float(item.get('quantity', 1) or 1)
+    recap = {
+        "Item Code": item.get('item_code', '-'), "Name": item.get('name', 'Unknown'), "Qty": qty,
+        "UOM": item.get('uom', '-'), "Specs": item.get('specs', '-'), "Brand": item.get('brand', '-'),
+        "Description": f"{item.get('description', '')}", "Winner": "PENDING",
+        "Quoted Price": "-", "Single Price": "-", "Total Price": "-", "_raw_total": np.nan
+    }
+    if q is None:
+        return None, recap
+    recap.update({
+        "Winner": q['supplier'],
+        "Quoted Price": f"{q['original_currency']} {float(q['original_price']):,.0f}",
+        "Single Price": format_money(q['rfq_unit_price'], base),
+        "Total Price": format_money(q['line_total'], base),
+        "_raw_total": q['line_total']
+    })
+    award = {
+        "item_name": recap["Name"],
+        "quote_id": int(q['quote_id']),
+        "supplier_id": None if pd.isna(q['supplier_id']) else int(q['supplier_id']),
+        "qty": qty,
+        "unit_price": None if np.isnan(q['rfq_unit_price']) else round(float(q['rfq_unit_price']), 6),
+        "line_total": None if np.isnan(q['line_total']) else round(float(q['line_total']), 6),
+        "currency": base
+    }
+    return award, recap
+
+def select_lines(items, options: dict, selection: dict, base: str):
+    """
+    Awards and recap rows for a full selection {line: quote_id or None}.
+    Returns ({line: award or None}, recap DataFrame with '_raw_total').
+    """
+    awards, recaps = {}, []
+    for idx, item in enumerate(items):
+        line = idx + 1
+        by_id = {int(q['quote_id']): q for q in options.get(line, [])}
+        quote_id = selection.get(line)
+        awards[line], recap = line_result(item, by_id.get(int(quote_id)) if quote_id is not None else None, base)
+        if not by_id:
+            recap["Winner"] = "NO QUOTES"
+        recaps.append(recap)
+    return awards, pd.DataFrame(recaps, columns=RECAP_COLUMNS + ["_raw_total"])
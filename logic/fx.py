@@ -0,0 +1,98 @@
+import os
+import numpy as np
+import pandas as pd
+import streamlit as st
+from logic.database import CLIENT_HASH_FUNCS
+
+# --- CURRENCY NORMALIZATION ---
+# Rates are stored as "1 unit of currency = rate_to_usd USD" with a date, in the
+# `fx_rates` table and/or a local CSV. Converting A -> B is amount * r[A] / r[B],
+# done for whole columns at once so rankings and totals are in one currency.
+
+SUPPORTED_CURRENCIES = ["IDR", "USD", "EUR", "GBP"]
+FX_RATES_PATH = os.getenv("FX_RATES_PATH", "fx_rates.csv")
+TABLE_FX_RATES = "fx_rates"
+
+def get_base_currency():
+    """
+    Base currency for rankings and totals: Session > Env > USD.
+    """
+    return st.session_state.get("BASE_CURRENCY") or os.getenv("BASE_CURRENCY", "USD")
+
+def read_rates_file(path: str = FX_RATES_PATH):
+    """
+    Reads a CSV with columns currency, rate_date, rate_to_usd. Missing file -> empty.
+    """
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=["currency", "rate_date", "rate_to_usd"])
+    return pd.read_csv(path, dtype={"currency": str})
+
+@st.cache_data(ttl=300, show_spinner=False, hash_funcs=CLIENT_HASH_FUNCS)
+def load_fx_rates(supabase, path: str = FX_RATES_PATH):
+    """
+    All known dated rates from the database and the local file.
+    Database rows win over file rows for the same currency and date.
+    """
+    frames = [read_rates_file(path).assign(source="file")]
+    if supabase is not None:
+        try:
+            rows = supabase.table(TABLE_FX_RATES).select('currency, rate_date, rate_to_usd').execute().data
+            frames.append(pd.DataFrame(rows, columns=["currency", "rate_date", "rate_to_usd"]).assign(source="database"))
+        except Exception:
+            pass  # Table not created yet; file rates still apply
+    rates = pd.concat(frames, ignore_index=True)
+    rates["currency"] = rates["currency"].str.upper().str.strip()
+    rates["rate_date"] = pd.to_datetime(rates["rate_date"]).dt.date
+    rates["rate_to_usd"] = pd.to_numeric(rates["rate_to_usd"], errors="coerce")
+    rates = rates.dropna(subset=["rate_to_usd"])
+    return rates.drop_duplicates(["currency", "rate_date"], keep="last").sort_values(["currency", "rate_date"]).reset_index(drop=True)
+
+def latest_rates(rates: pd.DataFrame, as_of=None):
+    """
+    Series currency -> rate_to_usd using the most recent rate on or before `as_of`.
+    """
+    if as_of is not None:
+        rates = rates[rates["rate_date"] <= as_of]
+    rates = rates.sort_values("rate_date").drop_duplicates("currency", keep="last")
+    series = rates.set_index("currency")["rate_to_usd"].copy()
+    if "USD" not in series.index:
+        series.loc["USD"] = 1.0
+    return series
+
+def convert(amounts, currencies, base: str, rates: pd.Series):
+    """
+    Vectorized conversion of amounts into `base`. Unknown currencies give NaN.
+    """
+    amounts = pd.to_numeric(pd.Series(amounts), errors="coerce").to_numpy(dtype=float)
+    currencies = pd.Series(currencies).fillna(base).astype(str).str.upper().to_numpy()
+    if base not in rates.index:
+        # Without a base rate only same-currency amounts can be expressed
+        return np.where(currencies == base, amounts, np.nan)
+    factors = pd.Series(currencies).map(rates / rates[base]).to_numpy(dtype=float)
+    factors = np.where(currencies == base, 1.0, factors)
+    return amounts * factors
+
+def convert_amount(amount, currency: str, base: str, rates: pd.Series):
+    return float(convert([amount], [currency], base, rates)[0])
+
+def normalize_quotes(quotes: pd.DataFrame, base: str, rates: pd.Series):
+    """
+    Returns a copy of a quotes frame with 'price' and 'currency' expressed in
+    `base`; the quoted values are kept as 'original_price'/'original_currency'.
+    Quotes in a currency without a rate get a NaN price.
+    """
+    if quotes.empty:
+        return quotes
+    out = quotes.copy()
+    out["original_price"] = out["price"]
+    out["original_currency"] = out["currency"]
+    out["price"] = convert(out["price"], out["currency"], base, rates)
+    if "unit_price_base" in out:
+        out["unit_price_base"] = convert(out["unit_price_base"], out["currency"], base, rates)
+    out["currency"] = base
+    return out
+
+def format_money(amount, currency: str):
+    if amount is None or (isinstance(amount, float) and np.isnan(amount)):
+        return f"{currency} -"
+    return f"{currency} {amount:,.0f}"
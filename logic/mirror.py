@@ -0,0 +1,502 @@
+import os
+import json
+import hashlib
+import time
+import sqlite3
+import logging
+import threading
+import datetime
+import pandas as pd
+from logic.database import TABLE_SUPPLIERS, TABLE_PRODUCTS, TABLE_QUOTES
+from logic.embeddings import CACHE_DIR
+
+# --- LOCAL CATALOG MIRROR ---
+# A SQLite copy of suppliers, products and quotes, kept current by pulling only
+# rows whose `updated_at` is past the last watermark (plus `deleted_rows`
+# tombstones for deletes). MirroredClient wraps the Supabase client: selects on
+# mirrored tables run against the local file, while writes, RPCs and other
+# tables go upstream. Rows returned by upstream writes are applied locally at
+# once so a page sees its own writes before the next sync.
+#
+# `updated_at` and tombstone ids are stamped when a statement runs, not when it
+# commits, so a long transaction can commit rows older than the watermark. Each
+# sync therefore re-reads the last MIRROR_SYNC_OVERLAP seconds before it;
+# upserts and deletes are idempotent, so re-read rows are harmless.
+
+MIRROR_PATH = os.getenv("PROCUREMIND_MIRROR_PATH", os.path.join(CACHE_DIR, "mirror.db"))
+MIRROR_TABLES = [TABLE_SUPPLIERS, TABLE_PRODUCTS, TABLE_QUOTES]
+MIRROR_SYNC_INTERVAL = float(os.getenv("PROCUREMIND_MIRROR_SYNC_INTERVAL", "60"))
+MIRROR_SYNC_OVERLAP = float(os.getenv("PROCUREMIND_MIRROR_SYNC_OVERLAP", "600"))
+TABLE_DELETED_ROWS = "deleted_rows"
+
+logger = logging.getLogger(__name__)
+
+# Embedded resources the pages use, e.g. select('*, suppliers(name)'): relation -> (foreign key, table)
+EMBEDS = {TABLE_SUPPLIERS: ("supplier_id", TABLE_SUPPLIERS), TABLE_PRODUCTS: ("product_id", TABLE_PRODUCTS)}
+
+def mirror_path(url: str):
+    """
+    One mirror file per Supabase project, so pooled clients for different projects never share rows.
+    """
+    root, ext = os.path.splitext(MIRROR_PATH)
+    return f"{root}-{hashlib.sha256(url.rstrip('/').encode('utf-8')).hexdigest()[:12]}{ext}"
+
+def mirror_enabled():
+    return os.getenv("PROCUREMIND_MIRROR", "").lower() in ("1", "true", "yes")
+
+def _quote_ident(name: str):
+    return '"' + name.replace('"', '""') + '"'
+
+def _overlap_start(ts: str, seconds: float = MIRROR_SYNC_OVERLAP):
+    """
+    ISO timestamp `seconds` before the watermark `ts`.
+    """
+    start = datetime.datetime.fromisoformat(str(ts).replace("Z", "+00:00")) - datetime.timedelta(seconds=seconds)
+    return start.isoformat()
+
+def _local_value(value):
+    return json.dumps(value) if isinstance(value, (dict, list)) else value
+
+class LocalMirror:
+    """
+    The SQLite side: schema follows whatever columns upstream returns, plus a
+    `_sync_state` row per table with its watermark and last sync time.
+    """
+    def __init__(self, path: str = MIRROR_PATH, tables=MIRROR_TABLES):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.tables = list(tables)
+        self._local = threading.local()
+        self._sync_lock = threading.Lock()
+        self._columns = {}
+        with self.connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS _sync_state (table_name TEXT PRIMARY KEY, watermark_ts TEXT, watermark_id INTEGER,"
+                " tombstone_id INTEGER DEFAULT 0, last_sync_at REAL, last_duration REAL, rows_synced INTEGER DEFAULT 0)"
+            )
+            for table in self.tables:
+                conn.execute(f"CREATE TABLE IF NOT EXISTS {_quote_ident(table)} (id INTEGER PRIMARY KEY)")
+
+    def connect(self):
+        # One connection per thread; background syncs write while pages read (WAL)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def columns(self, table: str):
+        if table not in self._columns:
+            self._columns[table] = [r["name"] for r in self.connect().execute(f"PRAGMA table_info({_quote_ident(table)})")]
+        return self._columns[table]
+
+    def upsert_rows(self, table: str, rows):
+        if not rows:
+            return
+        conn = self.connect()
+        known = set(self.columns(table))
+        for col in [k for k in dict.fromkeys(k for r in rows for k in r) if k not in known]:
+            conn.execute(f"ALTER TABLE {_quote_ident(table)} ADD COLUMN {_quote_ident(col)}")
+        self._columns.pop(table, None)
+        cols = self.columns(table)
+        conn.executemany(
+            f"INSERT OR REPLACE INTO {_quote_ident(table)} ({', '.join(map(_quote_ident, cols))}) VALUES ({', '.join('?' * len(cols))})",
+            [tuple(_local_value(r.get(c)) for c in cols) for r in rows]
+        )
+
+    def delete_ids(self, table: str, ids):
+        ids = list(ids)
+        if ids:
+            self.connect().execute(f"DELETE FROM {_quote_ident(table)} WHERE id IN ({', '.join('?' * len(ids))})", ids)
+
+    def state(self, table: str):
+        row = self.connect().execute("SELECT * FROM _sync_state WHERE table_name = ?", (table,)).fetchone()
+        return dict(row) if row else {}
+
+    def is_ready(self, table: str):
+        return table in self.tables and bool(self.state(table).get("last_sync_at"))
+
+    # --- SYNC ---
+
+    def sync_table(self, supabase, table: str, page_size: int = 1000):
+        """
+        Pulls rows changed since MIRROR_SYNC_OVERLAP before the watermark in
+        (updated_at, id) keyset order, committing after every page so an
+        interrupted sync resumes, then applies tombstones from the same overlap.
+        Returns the number of rows pulled.
+        """
+        start = time.time()
+        conn = self.connect()
+        state = self.state(table)
+        since = _overlap_start(state["watermark_ts"]) if state.get("watermark_ts") else None
+        wm_ts, wm_id = since, 0
+        pulled = 0
+        while True:
+            query = supabase.table(table).select('*')
+            if wm_ts:
+                query = query.or_(f'updated_at.gt."{wm_ts}",and(updated_at.eq."{wm_ts}",id.gt.{wm_id})')
+            rows = query.order('updated_at').order('id').limit(page_size).execute().data
+            if not rows:
+                break
+            self.upsert_rows(table, rows)
+            wm_ts, wm_id = rows[-1]['updated_at'], rows[-1]['id']
+            conn.execute(
+                "INSERT INTO _sync_state (table_name, watermark_ts, watermark_id) VALUES (?, ?, ?) "
+                "ON CONFLICT(table_name) DO UPDATE SET watermark_ts = excluded.watermark_ts, watermark_id = excluded.watermark_id",
+                (table, wm_ts, wm_id)
+            )
+            conn.commit()
+            pulled += len(rows)
+            if len(rows) < page_size:
+                break
+
+        tombstone_id = state.get("tombstone_id") or 0
+        if since and tombstone_id:
+            # Tombstones committed late can have ids below the last one applied
+            late = supabase.table(TABLE_DELETED_ROWS).select('id').eq('table_name', table) \
+                .gte('deleted_at', since).order('id').limit(1).execute().data
+            if late:
+                tombstone_id = min(tombstone_id, late[0]['id'] - 1)
+        while True:
+            tombstones = supabase.table(TABLE_DELETED_ROWS).select('id, row_id').eq('table_name', table) \
+                .gt('id', tombstone_id).order('id').limit(page_size).execute().data
+            if not tombstones:
+                break
+            self.delete_ids(table, [t['row_id'] for t in tombstones])
+            tombstone_id = tombstones[-1]['id']
+            if len(tombstones) < page_size:
+                break
+
+        conn.execute(
+            "INSERT INTO _sync_state (table_name, tombstone_id, last_sync_at, last_duration, rows_synced) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(table_name) DO UPDATE SET tombstone_id = excluded.tombstone_id, last_sync_at = excluded.last_sync_at, "
+            "last_duration = excluded.last_duration, rows_synced = excluded.rows_synced",
+            (table, tombstone_id, time.time(), time.time() - start, pulled)
+        )
+        conn.commit()
+        return pulled
+
+    def sync(self, supabase, page_size: int = 1000):
+        """
+        Syncs every mirrored table; concurrent calls wait for the running sync instead of duplicating it.
+        """
+        with self._sync_lock:
+            return {table: self.sync_table(supabase, table, page_size) for table in self.tables}
+
+    def sync_in_background(self, supabase):
+        if self._sync_lock.locked():
+            return
+        threading.Thread(target=self._background_sync, args=(supabase,), daemon=True).start()
+
+    def _background_sync(self, supabase):
+        try:
+            self.sync(supabase)
+        except Exception:
+            logger.exception("Mirror sync failed")
+
+    def is_stale(self):
+        last = [self.state(t).get("last_sync_at") or 0 for t in self.tables]
+        return time.time() - min(last) > MIRROR_SYNC_INTERVAL
+
+    def status(self):
+        """
+        Per table: local row count, watermark, time of the last sync and its lag in seconds.
+        """
+        rows = []
+        for table in self.tables:
+            state = self.state(table)
+            last = state.get("last_sync_at")
+            rows.append({
+                "table": table,
+                "local_rows": self.connect().execute(f"SELECT COUNT(*) FROM {_quote_ident(table)}").fetchone()[0],
+                "watermark": state.get("watermark_ts"),
+                "last_sync": datetime.datetime.fromtimestamp(last).isoformat(timespec="seconds") if last else None,
+                "lag_seconds": round(time.time() - last, 1) if last else None,
+                "last_pulled": state.get("rows_synced"),
+            })
+        return pd.DataFrame(rows)
+
+# --- POSTGREST FILTER TRANSLATION ---
+
+_OPS = {"eq": "=", "neq": "!=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+class UnsupportedQuery(Exception):
+    """Raised for builder features the local translation does not cover; the query then runs upstream."""
+
+def _condition(column, op, value, negate=False):
+    col = _quote_ident(column)
+    if op in _OPS:
+        sql, params = f"{col} {_OPS[op]} ?", [value]
+    elif op in ("ilike", "like"):
+        # SQLite LIKE is case-insensitive for ASCII, which matches ilike; PostgREST also accepts * for %
+        if op == "like":
+            raise UnsupportedQuery("like")
+        sql, params = f"{col} LIKE ? ESCAPE '\\'", [str(value).replace("*", "%")]
+    elif op == "is":
+        if str(value).lower() != "null":
+            raise UnsupportedQuery(f"is.{value}")
+        sql, params = f"{col} IS NULL", []
+    elif op == "in":
+        values = list(value)
+        sql, params = (f"{col} IN ({', '.join('?' * len(values))})", values) if values else ("0 = 1", [])
+    else:
+        raise UnsupportedQuery(op)
+    return (f"NOT ({sql})", params) if negate else (sql, params)
+
+def _coerce(value: str):
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
+
+def parse_or_filter(expr: str):
+    """
+    PostgREST logic trees, e.g. 'name.ilike."a",and(product_id.eq.1,id.gt.5)' -> (sql, params).
+    """
+    pos = 0
+
+    def parse_value():
+        nonlocal pos
+        if expr.startswith('"', pos):
+            pos += 1
+            out = []
+            while expr[pos] != '"':
+                if expr[pos] == "\\":
+                    pos += 1
+                out.append(expr[pos])
+                pos += 1
+            pos += 1
+            return "".join(out)
+        end = pos
+        while end < len(expr) and expr[end] not in ",)":
+            end += 1
+        value, pos = expr[pos:end], end
+        return _coerce(value)
+
+    def parse_list(joiner):
+        nonlocal pos
+        parts, params = [], []
+        while True:
+            sql, p = parse_item()
+            parts.append(f"({sql})")
+            params += p
+            if pos < len(expr) and expr[pos] == ",":
+                pos += 1
+                continue
+            return f" {joiner} ".join(parts), params
+
+    def parse_item():
+        nonlocal pos
+        for group, joiner in (("and(", "AND"), ("or(", "OR")):
+            if expr.startswith(group, pos):
+                pos += len(group)
+                sql, params = parse_list(joiner)
+                pos += 1  # ')'
+                return sql, params
+        column_end = expr.index(".", pos)
+        column = expr[pos:column_end]
+        pos = column_end + 1
+        negate = expr.startswith("not.", pos)
+        if negate:
+            pos += 4
+        op_end = expr.index(".", pos)
+        op = expr[pos:op_end]
+        pos = op_end + 1
+        if op == "in":
+            pos += 1  # '('
+            values = []
+            while expr[pos] != ")":
+                values.append(parse_value())
+                if expr[pos] == ",":
+                    pos += 1
+            pos += 1
+            return _condition(column, op, values, negate)
+        return _condition(column, op, parse_value(), negate)
+
+    return parse_list("OR")
+
+def _split_select(select: str):
+    """
+    '*, suppliers(name)' -> (['*'], {'suppliers': ['name']}).
+    """
+    columns, embeds, depth, current = [], {}, 0, ""
+    for ch in select + ",":
+        if ch == "," and depth == 0:
+            item = current.strip()
+            current = ""
+            if not item:
+                continue
+            if "(" in item:
+                rel, inner = item.split("(", 1)
+                embeds[rel.strip()] = [c.strip() for c in inner.rstrip(")").split(",") if c.strip()]
+            else:
+                columns.append(item)
+            continue
+        depth += ch == "("
+        depth -= ch == ")"
+        current += ch
+    return columns, embeds
+
+class _Result:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+class MirrorQuery:
+    """
+    Records builder calls. Plain selects run locally; anything else (writes,
+    unsupported filters) is replayed on the upstream builder.
+    """
+    def __init__(self, client, table: str):
+        self.client = client
+        self.table = table
+        self.calls = []
+        self.write = None
+
+    def _record(self, name, *args, **kwargs):
+        self.calls.append((name, args, kwargs))
+        return self
+
+    @property
+    def not_(self):
+        return self._record("not_")
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        def method(*args, **kwargs):
+            if name in ("insert", "update", "upsert", "delete"):
+                self.write = name
+            return self._record(name, *args, **kwargs)
+        return method
+
+    def _upstream(self):
+        builder = self.client.upstream.table(self.table)
+        for name, args, kwargs in self.calls:
+            builder = getattr(builder, name) if name == "not_" else getattr(builder, name)(*args, **kwargs)
+        return builder.execute()
+
+    def execute(self):
+        mirror = self.client.mirror
+        if self.write or not mirror.is_ready(self.table):
+            result = self._upstream()
+            if self.write and self.table in mirror.tables:
+                if self.write == "delete":
+                    mirror.delete_ids(self.table, [r['id'] for r in result.data or [] if 'id' in r])
+                else:
+                    mirror.upsert_rows(self.table, result.data or [])
+                mirror.connect().commit()
+            return result
+        try:
+            return self._local()
+        except (UnsupportedQuery, sqlite3.Error):
+            return self._upstream()
+
+    def _local(self):
+        mirror = self.client.mirror
+        select, count, where, params, order, limit, negate = "*", None, [], [], [], None, False
+        for name, args, kwargs in self.calls:
+            if name == "select":
+                select = ", ".join(args) if args else "*"
+                count = kwargs.get("count")
+            elif name == "not_":
+                negate = True
+                continue
+            elif name in _OPS or name in ("ilike", "like"):
+                sql, p = _condition(args[0], name, args[1], negate)
+                where.append(sql)
+                params += p
+            elif name == "in_":
+                sql, p = _condition(args[0], "in", args[1], negate)
+                where.append(sql)
+                params += p
+            elif name == "is_":
+                sql, p = _condition(args[0], "is", args[1], negate)
+                where.append(sql)
+                params += p
+            elif name == "or_":
+                sql, p = parse_or_filter(args[0])
+                where.append(f"NOT ({sql})" if negate else f"({sql})")
+                params += p
+            elif name == "order":
+                col = _quote_ident(args[0])
+                desc = kwargs.get("desc", args[1] if len(args) > 1 else False)
+                # PostgREST puts NULLs last ascending and first descending
+                order.append(f"{col} IS NULL DESC, {col} DESC" if desc else f"{col} IS NULL, {col}")
+            elif name == "limit":
+                limit = int(args[0])
+            else:
+                raise UnsupportedQuery(name)
+            negate = False
+
+        columns, embeds = _split_select(select)
+        if any(rel not in EMBEDS for rel in embeds):
+            raise UnsupportedQuery("embed")
+        local_cols = mirror.columns(self.table)
+        wanted = list(local_cols) if "*" in columns or not columns else columns
+        if not set(wanted) <= set(local_cols):
+            raise UnsupportedQuery("columns")
+        fetch = wanted + [EMBEDS[rel][0] for rel in embeds if EMBEDS[rel][0] not in wanted]
+
+        sql = f"SELECT {', '.join(map(_quote_ident, fetch))} FROM {_quote_ident(self.table)}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        if order:
+            sql += " ORDER BY " + ", ".join(order)
+        total = None
+        if count:
+            total = mirror.connect().execute(f"SELECT COUNT(*) FROM ({sql})", params).fetchone()[0]
+        if limit is not None:
+            sql += f" LIMIT {limit}"
+        rows = [dict(r) for r in mirror.connect().execute(sql, params)]
+
+        for rel, rel_cols in embeds.items():
+            fk, rel_table = EMBEDS[rel]
+            ids = sorted({r[fk] for r in rows if r.get(fk) is not None})
+            lookup = {}
+            if ids:
+                select_cols = "*" if rel_cols == ["*"] else ", ".join(map(_quote_ident, dict.fromkeys(["id"] + rel_cols)))
+                for r in mirror.connect().execute(
+                    f"SELECT {select_cols} FROM {_quote_ident(rel_table)} WHERE id IN ({', '.join('?' * len(ids))})", ids
+                ):
+                    r = dict(r)
+                    lookup[r["id"]] = r if rel_cols == ["*"] else {c: r[c] for c in rel_cols}
+            for r in rows:
+                r[rel] = lookup.get(r.get(fk))
+
+        if not ("*" in columns or not columns):
+            keep = set(columns) | set(embeds)
+            rows = [{k: v for k, v in r.items() if k in keep} for r in rows]
+        return _Result(rows, total)
+
+class MirroredClient:
+    """
+    Drop-in for the Supabase client: mirrored reads are local, everything else is upstream.
+    """
+    def __init__(self, upstream, mirror: LocalMirror):
+        self.upstream = upstream
+        self.mirror = mirror
+
+    def table(self, name: str):
+        if name in self.mirror.tables:
+            if self.mirror.is_stale():
+                self.mirror.sync_in_background(self.upstream)
+            return MirrorQuery(self, name)
+        return self.upstream.table(name)
+
+    def rpc(self, *args, **kwargs):
+        return self.upstream.rpc(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.upstream, name)
+
+def upstream_counts(supabase, tables=MIRROR_TABLES):
+    """
+    Row counts on the server, to compare with the local mirror.
+    """
+    client = supabase.upstream if isinstance(supabase, MirroredClient) else supabase
+    return {t: client.table(t).select('id', count='exact').limit(1).execute().count for t in tables}
@@ -1,15 +1,19 @@
 import os
 import json
+import time
+import logging
 import streamlit as st
-import google.generativeai as genai
 from dotenv import load_dotenv
+from logic.prompts import OUTPUT_BUDGETS, estimate_tokens, fit_thread, remaining_budget, truncate_to_tokens
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Use gemini-2.0-flash
 # Use gemini-2.5-flash
 PARSER_MODEL = "gemini-2.5-flash"
-EMBEDDING_MODEL = "models/text-embedding-004"
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "models/text-embedding-004")
 
 def get_api_key():
     """
@@ -36,16 +40,48 @@ def get_api_key():
     st.stop()
     return None
 
-def parse_rfq_text(text: str):
+def get_genai():
     """
-    Parses RFQ text into structured JSON using Gemini 2.0 Flash.
+    Imports the Gemini SDK on first use and configures it with the current key.
+    The SDK (gRPC/protobuf) is the slowest import in the app, so pages and reruns
+    that never call Gemini don't pay for it.
     """
-    api_key = get_api_key()
-    genai.configure(api_key=api_key)
-    
-    model = genai.GenerativeModel(PARSER_MODEL)
-    
-    prompt = f"""
+    import google.generativeai as genai
+    genai.configure(api_key=get_api_key())
+    return genai
+
+def generate(model, call: str, prompt: str, trim: dict = None):
+    """
+    model.generate_content with the call's output cap, logging the token usage
+    Gemini reports (and what trimming removed) at INFO on this module's logger.
+    """
+    config = {"max_output_tokens": OUTPUT_BUDGETS[call]} if OUTPUT_BUDGETS.get(call) else None
+    start = time.perf_counter()
+    response = model.generate_content(prompt, generation_config=config)
+    usage = getattr(response, "usage_metadata", None)
+    logger.info(
+        "gemini %s: %s prompt tokens (estimated %s), %s output tokens, %s total, %.0f ms%s",
+        call, getattr(usage, "prompt_token_count", "?"), estimate_tokens(prompt),
+        getattr(usage, "candidates_token_count", "?"), getattr(usage, "total_token_count", "?"),
+        (time.perf_counter() - start) * 1000,
+        f"; input text ~{trim['tokens_after']} of ~{trim['tokens_before']} tokens kept, "
+        f"{trim['messages_dropped']} of {trim['messages']} messages dropped" if trim else ""
+    )
+    return response
+
+def trim_warnings(trim: dict) -> list:
+    warnings = []
+    if trim["truncated"]:
+        warnings.append("The RFQ text was cut to fit the token budget; items near the end may be missing.")
+    if trim["messages_dropped"]:
+        warnings.append(f"{trim['messages_dropped']} earlier message(s) of the thread were left out to fit the token budget.")
+    if trim.get("removed_lines"):
+        sample = "; ".join(f'"{line[:60]}"' for line in trim["removed_lines"][:3])
+        warnings.append(f"{len(trim['removed_lines'])} line(s) that look like items were removed with a signature or disclaimer: {sample}. Check them.")
+    return warnings
+
+def _rfq_prompt(text: str):
+    return f"""
     Act as a procurement expert. Parse the following RFQ email text into a structured JSON format.
     1. Generate a short, descriptive TITLE for this RFQ (e.g., "RFQ from [Company] - [Date]" or "Request for [Item Categories]").
     2. Extract each item with ALL available details, including Item Code, Quantity, Unit of Measure (UOM), Name/Description, Brand, and Specs.
@@ -69,8 +105,20 @@ def parse_rfq_text(text: str):
         ]
     }}
     """
+
+def parse_rfq_text(text: str):
+    """
+    Parses RFQ text into structured JSON using Gemini 2.0 Flash.
+    The thread is cleaned and fitted to the parse_rfq token budget first;
+    a "warnings" list is added when anything beyond boilerplate was cut.
+    """
+    genai = get_genai()
     
-    response = model.generate_content(prompt)
+    model = genai.GenerativeModel(PARSER_MODEL)
+    
+    # Forwarded threads often carry the actual request in an older message, so history is kept while it fits
+    fitted, trim = fit_thread(text, remaining_budget("parse_rfq", _rfq_prompt("")))
+    response = generate(model, "parse_rfq", _rfq_prompt(fitted), trim)
     
     # Extract JSON from response text (handling potential markdown formatting)
     content = response.text
@@ -80,17 +128,20 @@ def parse_rfq_text(text: str):
         content = content.split("```")[1].split("```")[0].strip()
         
     try:
-        return json.loads(content)
+        parsed = json.loads(content)
     except Exception as e:
         print(f"Error parsing Gemini response: {e}")
-        return {{"items": [], "error": str(e)}}
+        return {"items": [], "error": str(e)}
+    warnings = trim_warnings(trim)
+    if warnings and isinstance(parsed, dict):
+        parsed["warnings"] = warnings
+    return parsed
 
 def generate_embedding(text: str):
     """
     Generates a 768-dimension embedding using Gemini's embedding model.
     """
-    api_key = get_api_key()
-    genai.configure(api_key=api_key)
+    genai = get_genai()
 
     result = genai.embed_content(
         model=EMBEDDING_MODEL,
@@ -99,16 +150,22 @@ def generate_embedding(text: str):
     )
     return result['embedding']
 
-def generate_email_response(original_text: str, quote_data: str, user_instructions: str = ""):
+def generate_embeddings(texts: list):
     """
-    Generates a response email based on the original RFQ and the constructed quote.
+    Generates embeddings for a batch of texts in a single request.
+    Returns one vector per input text, in the same order.
     """
-    api_key = get_api_key()
-    genai.configure(api_key=api_key)
-    
-    model = genai.GenerativeModel(PARSER_MODEL)
-    
-    prompt = f"""
+    genai = get_genai()
+
+    result = genai.embed_content(
+        model=EMBEDDING_MODEL,
+        content=texts,
+        task_type="retrieval_document"
+    )
+    return result['embedding']
+
+def _email_prompt(original_text: str, quote_data: str, user_instructions: str):
+    return f"""
     Act as a Professional Procurement Officer. Write a reply to the email below, attaching the following commercial quote/proposal.
     
     ORIGINAL EMAIL:
@@ -130,20 +187,23 @@ def generate_email_response(original_text: str, quote_data: str, user_instructio
     4. Do NOT include the full quote table.
     5. Write in PLAIN TEXT (No Markdown tables).
     """
-    
-    response = model.generate_content(prompt)
-    return response.text
 
-def refine_email_response(current_draft: str, feedback: str):
+def generate_email_response(original_text: str, quote_data: str, user_instructions: str = ""):
     """
-    Refines an existing email draft based on user feedback.
+    Generates a response email based on the original RFQ and the constructed quote.
+    Only the newest message of the original thread is sent, fitted to what the
+    quote table and instructions leave of the email budget (PromptTooLarge if nothing).
     """
-    api_key = get_api_key()
-    genai.configure(api_key=api_key)
+    genai = get_genai()
     
     model = genai.GenerativeModel(PARSER_MODEL)
     
-    prompt = f"""
+    fitted, trim = fit_thread(original_text, remaining_budget("email", _email_prompt("", quote_data, user_instructions)), history=False)
+    response = generate(model, "email", _email_prompt(fitted, quote_data, user_instructions), trim)
+    return response.text
+
+def _refine_prompt(current_draft: str, feedback: str):
+    return f"""
     Act as a Professional Procurement Officer. 
     Refine the following email draft based strictly on the user's feedback.
     
@@ -158,6 +218,16 @@ def refine_email_response(current_draft: str, feedback: str):
     2. Maintain the structure: Commercial Offer, Scope & Terms, Remarks.
     3. Output ONLY the new email body (Plain Text).
     """
+
+def refine_email_response(current_draft: str, feedback: str):
+    """
+    Refines an existing email draft based on user feedback.
+    The draft is sent whole (PromptTooLarge if it exceeds the refine budget); the feedback is truncated to fit.
+    """
+    genai = get_genai()
+    
+    model = genai.GenerativeModel(PARSER_MODEL)
     
-    response = model.generate_content(prompt)
+    feedback = truncate_to_tokens(feedback, remaining_budget("refine", _refine_prompt(current_draft, "")))
+    response = generate(model, "refine", _refine_prompt(current_draft, feedback))
     return response.text
@@ -0,0 +1,124 @@
+import warnings
+import numpy as np
+import pandas as pd
+import streamlit as st
+from logic.database import TABLE_QUOTES, CLIENT_HASH_FUNCS
+from logic.fx import convert
+from logic.quote_archive import fetch_quotes
+
+# --- PRICE HISTORY & ANOMALY FLAGS ---
+# Quotes become a time series per product (and per product x supplier). Every
+# statistic is a groupby transform over whole columns, so one call handles any
+# number of products; the table-wide scan pages through quotes ordered by
+# product so each chunk holds complete products and memory stays bounded.
+
+HISTORY_COLUMNS = ["id", "product_id", "supplier_id", "price", "currency", "unit_price_base", "quote_date"]
+
+def _history_frame(rows):
+    history = pd.DataFrame(rows, columns=HISTORY_COLUMNS + (["suppliers"] if rows and "suppliers" in rows[0] else []))
+    if "suppliers" in history:
+        history["supplier"] = history.pop("suppliers").str.get("name")
+    for col in ("price", "unit_price_base"):
+        history[col] = pd.to_numeric(history[col], errors="coerce")
+    history["quote_date"] = pd.to_datetime(history["quote_date"], errors="coerce")
+    return history
+
+@st.cache_data(ttl=300, show_spinner=False, hash_funcs=CLIENT_HASH_FUNCS)
+def load_product_history(supabase, product_id: int, since: str = None, include_archived: bool = False):
+    """
+    Quotes of one product in scope, cached per product so moving between items only loads new ones.
+    """
+    rows = fetch_quotes(supabase, ", ".join(HISTORY_COLUMNS) + ", suppliers(name)",
+                        lambda q: q.eq('product_id', product_id), since, include_archived)
+    return _history_frame(rows)
+
+def load_history(supabase, product_ids, since: str = None, include_archived: bool = False):
+    frames = [load_product_history(supabase, int(p), since, include_archived) for p in sorted(set(product_ids))]
+    return pd.concat(frames, ignore_index=True) if frames else _history_frame([])
+
+def iter_quote_history(supabase, page_size: int = 5000):
+    """
+    Yields frames of quotes covering complete products, in (product_id, id)
+    keyset order. The trailing product of each page is held back until its
+    last quote has been read.
+    """
+    last_product, last_id = None, 0
+    carry = _history_frame([])
+    while True:
+        query = supabase.table(TABLE_QUOTES).select(", ".join(HISTORY_COLUMNS)).not_.is_('product_id', 'null')
+        if last_product is not None:
+            query = query.or_(f"product_id.gt.{last_product},and(product_id.eq.{last_product},id.gt.{last_id})")
+        rows = query.order('product_id').order('id').limit(page_size).execute().data
+        if not rows:
+            break
+        page = pd.concat([carry, _history_frame(rows)], ignore_index=True)
+        last_product, last_id = rows[-1]['product_id'], rows[-1]['id']
+        if len(rows) < page_size:
+            carry = page
+            break
+        complete = page['product_id'] != last_product
+        carry = page[~complete]
+        if complete.any():
+            yield page[complete].reset_index(drop=True)
+    if not carry.empty:
+        yield carry.reset_index(drop=True)
+
+def compute_price_flags(history: pd.DataFrame, base: str, rates: pd.Series, window: int = 5,
+                        z_threshold: float = 3.0, iqr_k: float = 1.5, min_quotes: int = 4,
+                        min_deviation: float = 0.25):
+    """
+    Adds comparable prices, rolling statistics and outlier flags to a quote history.
+
+    Prices use unit_price_base when stored, converted into `base`. Per product:
+    median, z-score and the Tukey fences (Q1 - k*IQR, Q3 + k*IQR); per product x
+    supplier: rolling mean/median over the last `window` quotes and the change
+    from that supplier's previous quote. Products with fewer than `min_quotes`
+    comparable quotes are never flagged, nor are prices within `min_deviation`
+    (a fraction) of the product median, however tight the distribution.
+    """
+    if history.empty:
+        return history.assign(cmp_price=[], product_median=[], ratio_to_median=[], z_score=[],
+                               rolling_mean=[], rolling_median=[], change_pct=[],
+                               z_outlier=[], iqr_outlier=[], is_outlier=[])
+    out = history.copy()
+    raw = out["unit_price_base"].fillna(out["price"]) if "unit_price_base" in out else out["price"]
+    out["cmp_price"] = convert(raw, out["currency"], base, rates)
+    out = out.sort_values(["product_id", "quote_date", "id"], kind="stable").reset_index(drop=True)
+
+    by_product = out.groupby("product_id")["cmp_price"]
+    count = by_product.transform("count")
+    mean = by_product.transform("mean")
+    std = by_product.transform("std")
+    q1 = by_product.transform("quantile", 0.25)
+    q3 = by_product.transform("quantile", 0.75)
+    out["product_median"] = by_product.transform("median")
+    out["ratio_to_median"] = out["cmp_price"] / out["product_median"]
+    out["z_score"] = ((out["cmp_price"] - mean) / std.where(std > 0)).where(count >= min_quotes)
+
+    iqr = q3 - q1
+    enough = (count >= min_quotes) & ((out["ratio_to_median"] - 1).abs() >= min_deviation)
+    out["z_outlier"] = enough & (out["z_score"].abs() >= z_threshold)
+    out["iqr_outlier"] = enough & ((out["cmp_price"] < q1 - iqr_k * iqr) | (out["cmp_price"] > q3 + iqr_k * iqr))
+    out["is_outlier"] = out["z_outlier"] | out["iqr_outlier"]
+
+    # Rolling window as `window` shifted columns: groupby.rolling is a Python
+    # loop per group and crawls with hundreds of thousands of product x supplier pairs
+    by_series = out.groupby(["product_id", "supplier_id"], dropna=False)["cmp_price"]
+    lagged = np.column_stack([by_series.shift(lag).to_numpy(dtype=float) for lag in range(window)])
+    with np.errstate(all="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN windows
+        out["rolling_mean"] = np.nanmean(lagged, axis=1)
+        out["rolling_median"] = np.nanmedian(lagged, axis=1)
+    out["change_pct"] = (out["cmp_price"] / by_series.shift(1) - 1) * 100
+    return out
+
+def flag_label(row):
+    """
+    Short text for a flagged quote, e.g. "⚠️ 3.1× median (z 4.2)"; empty when normal.
+    """
+    if not row.get("is_outlier"):
+        return ""
+    ratio = row.get("ratio_to_median")
+    label = f"⚠️ {ratio:.1f}× median" if pd.notna(ratio) else "⚠️ outlier"
+    z = row.get("z_score")
+    return f"{label} (z {z:+.1f})" if pd.notna(z) else label
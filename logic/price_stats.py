@@ -0,0 +1,65 @@
+import pandas as pd
+from logic.fx import convert
+
+# --- PRODUCT PRICE STATISTICS ---
+# Reads the `product_price_stats` aggregate (maintained by triggers on quotes,
+# see schema.sql) instead of pulling every raw quote into Python.
+
+TABLE_PRICE_STATS = "product_price_stats"
+STATS_COLUMNS = ["product_id", "supplier_id", "currency", "quote_count", "min_price", "max_price",
+                 "median_price", "avg_price", "latest_price", "latest_date"]
+PRICE_COLUMNS = ["min_price", "max_price", "median_price", "avg_price", "latest_price"]
+
+def fetch_price_stats(supabase, product_ids, by_supplier: bool = False, chunk_size: int = 200):
+    """
+    Stats rows for the given products: all-supplier rows, or per-supplier rows
+    (with the supplier name) when `by_supplier`.
+    """
+    product_ids = sorted(set(product_ids))
+    select = "*, suppliers(name)" if by_supplier else "*"
+    rows = []
+    for start in range(0, len(product_ids), chunk_size):
+        query = supabase.table(TABLE_PRICE_STATS).select(select).in_('product_id', product_ids[start:start + chunk_size])
+        query = query.not_.is_('supplier_id', 'null') if by_supplier else query.is_('supplier_id', 'null')
+        rows += query.execute().data
+
+    stats = pd.DataFrame(rows, columns=STATS_COLUMNS + (["suppliers"] if by_supplier else []))
+    if by_supplier:
+        stats["supplier"] = stats.pop("suppliers").str.get("name")
+    for col in PRICE_COLUMNS:
+        stats[col] = pd.to_numeric(stats[col])
+    return stats
+
+def stats_in_base_currency(stats: pd.DataFrame, base: str, rates: pd.Series):
+    """
+    Converts every price column into `base`, then folds rows that only differed
+    by currency into one, weighting averages by quote count.
+    """
+    if stats.empty:
+        return stats
+    out = stats.copy()
+    for col in PRICE_COLUMNS:
+        out[col] = convert(out[col], out["currency"], base, rates)
+    out["currency"] = base
+    keys = ["product_id"] + (["supplier_id", "supplier"] if "supplier" in out else [])
+    out["_weighted_avg"] = out["avg_price"] * out["quote_count"]
+    out = out.sort_values("latest_date")
+    folded = out.groupby(keys, dropna=False).agg(
+        currency=("currency", "first"),
+        quote_count=("quote_count", "sum"),
+        min_price=("min_price", "min"),
+        max_price=("max_price", "max"),
+        median_price=("median_price", "median"),
+        _weighted_avg=("_weighted_avg", "sum"),
+        latest_price=("latest_price", "last"),
+        latest_date=("latest_date", "last"),
+    ).reset_index()
+    folded["avg_price"] = folded.pop("_weighted_avg") / folded["quote_count"]
+    return folded
+
+def refresh_price_stats(supabase, product_ids=None):
+    """
+    Forces a recompute (all products when None), e.g. after a bulk import that bypassed triggers.
+    """
+    params = {"p_product_ids": list(product_ids)} if product_ids is not None else {}
+    return supabase.rpc('refresh_product_price_stats', params).execute().data
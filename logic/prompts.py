@@ -0,0 +1,192 @@
+import os
+import re
+import math
+
+# --- PROMPT BUDGETS ---
+# User text reaches the Gemini prompts as pasted: whole email threads with quoted
+# replies, signatures and legal disclaimers. Before a call, the text is cleaned
+# (boilerplate dropped, the thread split into messages) and fitted into the call's
+# token budget, newest message first; older messages go when they don't fit.
+# Tokens are estimated locally (no count_tokens round trip); the exact counts
+# come back with each response and are logged by logic.parser.
+
+CHARS_PER_TOKEN = 4  # Gemini averages about 4 characters per token on English text
+
+# Input tokens allowed per call, whole prompt included
+PROMPT_BUDGETS = {
+    "parse_rfq": int(os.getenv("PARSE_RFQ_TOKEN_BUDGET", "24000")),
+    "email": int(os.getenv("EMAIL_TOKEN_BUDGET", "12000")),
+    "refine": int(os.getenv("REFINE_TOKEN_BUDGET", "6000")),
+}
+
+# Output token cap per call; unset means the model default. gemini-2.5-flash
+# counts its thinking tokens against this, so keep it generous.
+OUTPUT_BUDGETS = {
+    call: int(os.environ[f"{call.upper()}_MAX_OUTPUT_TOKENS"]) if os.getenv(f"{call.upper()}_MAX_OUTPUT_TOKENS") else None
+    for call in PROMPT_BUDGETS
+}
+
+MIN_MESSAGE_TOKENS = 500  # The newest message keeps at least this much when other parts crowd the budget
+TRUNCATION_NOTE = "[... truncated to fit the token budget]"
+
+class PromptTooLarge(ValueError):
+    """
+    Parts of a prompt that cannot be trimmed (our quote table, a draft) exceed the call's budget.
+    """
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text or "") / CHARS_PER_TOKEN)
+
+# --- EMAIL CLEANUP ---
+
+_REPLY_HEADERS = [
+    re.compile(r"^\s*(On|Pada)\b.{0,300}\b(wrote|menulis)\s*:\s*$", re.IGNORECASE),
+    re.compile(r"^\s*-{2,}\s*(Original Message|Forwarded message|Pesan Asli|Pesan yang diteruskan)\s*-{2,}", re.IGNORECASE),
+    re.compile(r"^\s*Begin forwarded message\s*:", re.IGNORECASE),
+]
+_OUTLOOK_FROM = re.compile(r"^\s*\*?(From|Dari)\s*:\*?\s+\S", re.IGNORECASE)
+_OUTLOOK_NEXT = re.compile(r"^\s*\*?(Sent|Date|To|Dikirim|Tanggal|Kepada)\s*:", re.IGNORECASE)
+_HEADER_FIELD = re.compile(r"^\s*\*?(From|Sent|Date|To|Cc|Subject|Dari|Dikirim|Tanggal|Kepada|Perihal|Subjek)\s*:", re.IGNORECASE)
+_SIGNATURE_START = re.compile(r"^-- ?$")  # The usenet/RFC 3676 signature delimiter
+_MOBILE_FOOTER = re.compile(r"^\s*(Sent from my \w+|Sent from (Outlook|Mail) for|Get Outlook for|Dikirim dari)\b", re.IGNORECASE)
+_DISCLAIMER_WORDS = re.compile(
+    r"confidential|intended recipient|privileged|disclaimer|unauthori[sz]ed|virus|legally binding|"
+    r"rahasia|penerima yang dimaksud", re.IGNORECASE
+)
+# Numbered/bulleted lines or "<qty> <unit>": worth a warning if boilerplate removal took them
+_ITEM_LINE = re.compile(
+    r"^\s*(\d+[.)]|[-*•])\s+\S|\b\d+(\.\d+)?\s*(pcs|pc|units?|ea|each|box(es)?|sets?|kg|ltr?|m|pails?|rolls?|drums?|buah)\b",
+    re.IGNORECASE
+)
+
+def _is_header(lines, i):
+    if any(p.match(lines[i]) for p in _REPLY_HEADERS):
+        return True
+    # Outlook: "From: ..." followed by "Sent:" / "Date:" / "To:" within the next lines
+    return bool(_OUTLOOK_FROM.match(lines[i])) and any(_OUTLOOK_NEXT.match(l) for l in lines[i + 1:i + 4])
+
+def _unquote(line: str) -> str:
+    return re.sub(r"^(\s*>)+ ?", "", line)
+
+def _disclaimer_terms(text: str) -> int:
+    return len(set(m.lower() for m in _DISCLAIMER_WORDS.findall(text)))
+
+def _strip_boilerplate(body: str, removed: list = None) -> str:
+    """
+    A message without its signature block, mobile footers and trailing
+    disclaimer. Lines that look like items but went with them are added to `removed`.
+    """
+    lines, dropped = [], []
+    for i, line in enumerate(body.splitlines()):
+        if _SIGNATURE_START.match(line):
+            dropped += body.splitlines()[i + 1:]
+            break
+        if not _MOBILE_FOOTER.match(line):
+            lines.append(line.rstrip())
+    paragraphs = [p.split("\n") for p in re.split(r"\n\s*\n", "\n".join(lines))]
+    # A disclaimer closes a message: drop the last paragraph if it has two
+    # disclaimer terms (item specs rarely hit more than one), from its first such line on
+    while paragraphs and not "".join(paragraphs[-1]).strip():
+        paragraphs.pop()
+    if paragraphs and _disclaimer_terms("\n".join(paragraphs[-1])) >= 2:
+        para = paragraphs.pop()
+        start = next(i for i, line in enumerate(para) if _DISCLAIMER_WORDS.search(line))
+        dropped += para[start:]
+        if start:
+            paragraphs.append(para[:start])
+    if removed is not None:
+        removed += [line.strip() for line in dropped if _ITEM_LINE.search(line)]
+    return "\n\n".join("\n".join(p).strip("\n") for p in paragraphs).strip()
+
+def split_thread(text: str, removed: list = None) -> list:
+    """
+    Messages of an email thread, newest first, each without quoting marks and boilerplate.
+    Replies quoted with ">" and no header line count as an older message too.
+    Item-like lines removed as boilerplate are added to `removed`.
+    """
+    lines = str(text or "").replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    messages, current, quoted = [], [], []
+    in_header = False
+    for i, line in enumerate(lines):
+        if _is_header(lines, i):
+            messages.append(current)
+            current, in_header = [], True
+        elif in_header and _HEADER_FIELD.match(line):
+            continue  # From: / Sent: / Subject: lines of the message that just started
+        elif not messages and line.lstrip().startswith(">"):
+            quoted.append(_unquote(line))  # Quoted inline in the newest message
+        else:
+            in_header = False
+            current.append(_unquote(line))
+    messages.append(current)
+    if quoted:
+        messages.insert(1, quoted)
+
+    cleaned, seen = [], set()
+    for message in messages:
+        body = _strip_boilerplate("\n".join(message), removed)
+        key = re.sub(r"\s+", " ", body).lower()
+        if body and key not in seen:
+            seen.add(key)
+            cleaned.append(body)
+    return cleaned
+
+# --- FITTING ---
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    """
+    `text` cut at a line boundary to about `budget` tokens, with a note where it was cut.
+    """
+    if estimate_tokens(text) <= budget:
+        return text
+    limit = max(budget * CHARS_PER_TOKEN - len(TRUNCATION_NOTE) - 1, 0)
+    cut = text[:limit]
+    if "\n" in cut:
+        cut = cut[:cut.rfind("\n")]
+    return f"{cut.rstrip()}\n{TRUNCATION_NOTE}"
+
+def fit_thread(text: str, budget: int, history: bool = True):
+    """
+    Cleaned thread text of about `budget` tokens at most, and a report of what was cut:
+    {"tokens_before", "tokens_after", "messages", "messages_dropped", "truncated",
+    "removed_lines" (item-like lines that went with a signature or disclaimer)}.
+    Older messages are kept while they fit, the first one that doesn't is cut
+    (all of them are dropped when `history` is False); the newest one is
+    truncated if it alone is over budget.
+    """
+    removed = []
+    messages = split_thread(text, removed)
+    report = {"tokens_before": estimate_tokens(text), "messages": len(messages), "messages_dropped": 0, "truncated": False,
+              "removed_lines": removed}
+    if not messages:
+        report["tokens_after"] = 0
+        return "", report
+
+    newest = truncate_to_tokens(messages[0], budget)
+    report["truncated"] = newest != messages[0]
+    parts, used = [newest], estimate_tokens(newest)
+    for older in messages[1:] if history else []:
+        part = f"--- Earlier message ---\n{older}"
+        if used + estimate_tokens(part) > budget:
+            # A forwarded RFQ under a one-line "please quote" is cut, not lost
+            if budget - used >= MIN_MESSAGE_TOKENS:
+                parts.append(truncate_to_tokens(part, budget - used))
+                report["truncated"] = True
+            break
+        parts.append(part)
+        used += estimate_tokens(part)
+    report["messages_dropped"] = len(messages) - len(parts)
+    fitted = "\n\n".join(parts)
+    report["tokens_after"] = estimate_tokens(fitted)
+    return fitted, report
+
+def remaining_budget(call: str, *fixed_parts: str) -> int:
+    """
+    Tokens left for the trimmable text of `call` after the parts that are sent as is.
+    Raises PromptTooLarge when those alone leave less than MIN_MESSAGE_TOKENS.
+    """
+    budget = PROMPT_BUDGETS[call]
+    left = budget - sum(estimate_tokens(p) for p in fixed_parts)
+    if left < MIN_MESSAGE_TOKENS:
+        raise PromptTooLarge(f"The {call} prompt needs about {budget - left + MIN_MESSAGE_TOKENS:,} tokens; its budget is {budget:,}")
+    return left
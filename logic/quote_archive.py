@@ -0,0 +1,84 @@
+import os
+import calendar
+import datetime
+import streamlit as st
+from logic.database import TABLE_QUOTES, TABLE_QUOTES_ARCHIVE
+from logic.fetch import fetch_all
+
+# --- HOT / COLD QUOTES ---
+# `quotes` holds the recent history that buyers work with; the `archive_quotes`
+# SQL function moves quotes dated before a cutoff into `quotes_archive` (same
+# ids and columns), except those an award still points at. Reads default to the
+# last QUOTE_WINDOW_MONTHS of `quotes`, an indexed range on (product_id,
+# quote_date). With "include archived" they read all of `quotes` and
+# `quotes_archive` side by side and concatenate the rows.
+
+QUOTE_WINDOW_MONTHS = int(os.getenv("QUOTE_WINDOW_MONTHS", "18"))  # 0 = no window
+ARCHIVE_AFTER_MONTHS = int(os.getenv("ARCHIVE_AFTER_MONTHS", "24"))
+
+def get_quote_window():
+    """
+    Months of quote history read by default: Session > Env > 18.
+    """
+    return int(st.session_state.get("QUOTE_WINDOW_MONTHS", QUOTE_WINDOW_MONTHS))
+
+def get_include_archived():
+    return bool(st.session_state.get("INCLUDE_ARCHIVED_QUOTES", False))
+
+def months_ago(months: int, today: datetime.date = None) -> str:
+    """
+    ISO date `months` calendar months before `today` (day clamped to the month's length).
+    """
+    today = today or datetime.date.today()
+    index = today.year * 12 + today.month - 1 - months
+    year, month = divmod(index, 12)
+    month += 1
+    return datetime.date(year, month, min(today.day, calendar.monthrange(year, month)[1])).isoformat()
+
+def quote_scope():
+    """
+    (since, include_archived) for this session's quote reads. Pass both on to
+    cached loaders as arguments, so changing them in Settings misses the cache.
+    """
+    if get_include_archived():
+        return None, True
+    window = get_quote_window()
+    return (months_ago(window) if window else None), False
+
+def scope_label(since: str = None, include_archived: bool = False) -> str:
+    if include_archived:
+        return "All quotes, archived included"
+    return f"Quotes dated {since} or later" if since else "All current quotes (archived excluded)"
+
+def quote_tables(include_archived: bool = False):
+    return [TABLE_QUOTES, TABLE_QUOTES_ARCHIVE] if include_archived else [TABLE_QUOTES]
+
+def in_window(query, since: str = None):
+    return query.gte('quote_date', since) if since else query
+
+def fetch_quotes(supabase, select: str, where, since: str = None, include_archived: bool = False):
+    """
+    Quote rows matching `where(query)` within the scope, e.g.
+
+        fetch_quotes(supabase, '*, suppliers(name)', lambda q: q.eq('product_id', 7), *quote_scope())
+    """
+    results = fetch_all(supabase, {
+        table: lambda c, table=table: in_window(where(c.table(table).select(select)), since)
+        for table in quote_tables(include_archived)
+    })
+    return [row for rows in results.values() for row in rows]
+
+def archive_quotes(supabase, months: int = ARCHIVE_AFTER_MONTHS, batch: int = 5000, progress=None):
+    """
+    Moves quotes dated more than `months` ago into quotes_archive, `batch` per
+    call so each transaction stays short. Returns how many were moved.
+    """
+    before = months_ago(months)
+    moved = 0
+    while True:
+        count = supabase.rpc('archive_quotes', {'p_before': before, 'p_batch': batch}).execute().data or 0
+        moved += count
+        if progress:
+            progress(moved)
+        if count < batch:
+            return moved
@@ -0,0 +1,85 @@
+import pandas as pd
+
+# --- RFQ ITEM PATCHES ---
+# Saved RFQs are edited line by line: only changed fields, removed line indexes
+# and new lines are sent to the `patch_rfq_items` function, which applies them
+# to `parsed_json` only if the RFQ is still at the version the editor loaded.
+# A concurrent edit therefore fails with RfqConflict instead of being overwritten.
+# Awards are keyed by line position, so the same function deletes the awards of
+# removed lines and renumbers those of the lines after them (see remap_lines).
+
+class RfqConflict(Exception):
+    """
+    The RFQ was changed or deleted since the edited version was loaded.
+    """
+
+def rfq_version(rfq: dict) -> int:
+    return int(rfq.get('version') or 1)
+
+def _same(a, b):
+    if a is None or b is None:
+        return a is None and b is None
+    try:
+        return a == b or float(a) == float(b)
+    except (TypeError, ValueError):
+        return False
+
+def diff_items(old_items: list, edited: pd.DataFrame, old_title=None, new_title=None) -> dict:
+    """
+    Changes between the saved items and an st.data_editor result built from
+    `pd.DataFrame(old_items)`: rows keep their original index labels, deleted
+    rows are missing and added rows have labels past the end.
+    Returns {"set": {"<index>": {field: value}}, "remove": [...], "append": [...], "title": ...},
+    with empty parts left out.
+    """
+    edited = edited.astype(object).where(pd.notnull(edited), None)
+    rows = edited.to_dict(orient="index")
+    changes = {"set": {}, "remove": [], "append": []}
+    for idx, old in enumerate(old_items):
+        new = rows.get(idx)
+        if new is None:
+            changes["remove"].append(idx)
+            continue
+        fields = {k: v for k, v in new.items() if not _same(old.get(k), v)}
+        if fields:
+            changes["set"][str(idx)] = fields
+    changes["append"] = [row for label, row in rows.items() if not (isinstance(label, int) and label < len(old_items))]
+    if new_title is not None and new_title != (old_title or ""):
+        changes["title"] = new_title
+    return {k: v for k, v in changes.items() if v or k == "title"}
+
+def apply_item_changes(doc: dict, changes: dict) -> dict:
+    """
+    Python twin of `patch_rfq_items`: `doc` (parsed_json) with `changes` applied.
+    """
+    doc = dict(doc or {})
+    items = doc.get('items') or []
+    removed = set(changes.get("remove") or [])
+    patches = changes.get("set") or {}
+    doc['items'] = [
+        {**item, **patches.get(str(idx), {})} for idx, item in enumerate(items) if idx not in removed
+    ] + list(changes.get("append") or [])
+    if "title" in changes:
+        doc['title'] = changes["title"]
+    return doc
+
+def remap_lines(changes: dict, n_lines: int) -> dict:
+    """
+    {old line_no: new line_no} for the saved lines that survive `changes`; award
+    rows of lines missing from it are deleted by `patch_rfq_items`.
+    """
+    removed = set(changes.get("remove") or [])
+    kept = [idx for idx in range(n_lines) if idx not in removed]
+    return {idx + 1: pos + 1 for pos, idx in enumerate(kept)}
+
+def patch_rfq(supabase, rfq_id: int, version: int, changes: dict) -> int:
+    """
+    Applies item changes if the RFQ is still at `version`; returns the new version.
+    Raises RfqConflict otherwise.
+    """
+    new_version = supabase.rpc('patch_rfq_items', {
+        'p_rfq_id': int(rfq_id), 'p_version': int(version), 'p_changes': changes
+    }).execute().data
+    if new_version is None:
+        raise RfqConflict(f"RFQ #{rfq_id} was changed since version {version}")
+    return new_version
@@ -0,0 +1,101 @@
+import datetime
+import numpy as np
+import pandas as pd
+from logic.database import TABLE_SUPPLIERS
+
+# --- AWARDS & SUPPLIER SCORECARD ---
+# Finalization saves one `awards` row per RFQ line plus one `award_bids` row per
+# supplier that bid on it (with its price rank). Triggers fold those rows and new
+# quotes into `supplier_scorecard` counters, so reading the scorecard is a single
+# small table scan no matter how much history exists.
+
+TABLE_AWARDS = "awards"
+TABLE_AWARD_BIDS = "award_bids"
+TABLE_SCORECARD = "supplier_scorecard"
+AWARD_FIELDS = ["quote_id", "supplier_id", "qty", "unit_price", "line_total", "currency"]
+
+def rank_bids(line_totals: dict):
+    """
+    {supplier_id: cheapest line total} -> {supplier_id: rank}, 1 = cheapest (ties share a rank).
+    Suppliers without a comparable total are ranked after all others.
+    """
+    totals = pd.Series(line_totals, dtype=float)
+    ranks = totals.rank(method="min", na_option="bottom")
+    return {int(s): int(r) for s, r in ranks.items()}
+
+def load_awards(supabase, rfq_id):
+    """
+    Saved awards of an RFQ as {line_no: row}.
+    """
+    rows = supabase.table(TABLE_AWARDS).select('*').eq('rfq_id', rfq_id).execute().data
+    return {row['line_no']: row for row in rows}
+
+def _same_award(new, old):
+    if old is None:
+        return False
+    for field in AWARD_FIELDS:
+        a, b = new.get(field), old.get(field)
+        if isinstance(a, float) and b is not None:
+            if not np.isclose(a, float(b)):
+                return False
+        elif a != b:
+            return False
+    return True
+
+def save_awards(supabase, rfq_id, awards: dict, bids: dict, previous: dict = None):
+    """
+    Persists the awards of an RFQ, writing only lines that changed since `previous`.
+
+    `awards` maps line_no -> award fields (None when the line is not awarded);
+    `bids` maps line_no -> {supplier_id: rank}. Returns the number of lines written.
+    """
+    previous = previous or {}
+    changed = []
+    for line, award in awards.items():
+        old = previous.get(line)
+        if (award is None and old is None) or (award is not None and _same_award(award, old)):
+            continue
+        changed.append(line)
+    if not changed:
+        return 0
+
+    # Bid rows are replaced, not updated, so the scorecard triggers subtract the old ranks
+    supabase.table(TABLE_AWARD_BIDS).delete().eq('rfq_id', rfq_id).in_('line_no', changed).execute()
+
+    cleared = [line for line in changed if not awards[line]]
+    if cleared:
+        supabase.table(TABLE_AWARDS).delete().eq('rfq_id', rfq_id).in_('line_no', cleared).execute()
+
+    upserts = [{"rfq_id": rfq_id, "line_no": line, **awards[line]} for line in changed if awards[line]]
+    if upserts:
+        now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        supabase.table(TABLE_AWARDS).upsert([{**row, "awarded_at": now} for row in upserts], on_conflict='rfq_id,line_no').execute()
+        bid_rows = [
+            {"rfq_id": rfq_id, "line_no": row["line_no"], "supplier_id": supplier_id, "rank": rank,
+             "won": supplier_id == row["supplier_id"]}
+            for row in upserts for supplier_id, rank in bids.get(row["line_no"], {}).items()
+        ]
+        if bid_rows:
+            supabase.table(TABLE_AWARD_BIDS).insert(bid_rows).execute()
+    return len(changed)
+
+def fetch_scorecard(supabase, today: datetime.date = None):
+    """
+    Scorecard with derived KPIs: win_rate, avg_rank and days_since_quote (freshness).
+    """
+    rows = supabase.table(TABLE_SCORECARD).select(f'*, {TABLE_SUPPLIERS}(name)').execute().data
+    card = pd.DataFrame(rows, columns=["supplier_id", "quote_count", "last_quote_date", "lines_bid", "lines_won",
+                                       "rank_sum", "updated_at", TABLE_SUPPLIERS])
+    card["supplier"] = card.pop(TABLE_SUPPLIERS).str.get("name")
+    bid = card["lines_bid"].where(card["lines_bid"] > 0)
+    card["win_rate"] = card["lines_won"] / bid
+    card["avg_rank"] = card["rank_sum"] / bid
+    today = today or datetime.date.today()
+    card["days_since_quote"] = (pd.Timestamp(today) - pd.to_datetime(card["last_quote_date"])).dt.days
+    return card.sort_values(["lines_won", "quote_count"], ascending=False).reset_index(drop=True)
+
+def refresh_scorecard(supabase):
+    """
+    Rebuilds every counter from quotes and award_bids.
+    """
+    return supabase.rpc('refresh_supplier_scorecard', {}).execute().data
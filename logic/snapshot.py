@@ -0,0 +1,242 @@
+import io
+import os
+import csv
+import json
+import sqlite3
+import datetime
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from logic.database import TABLE_SUPPLIERS, TABLE_PRODUCTS, TABLE_QUOTES, TABLE_QUOTES_ARCHIVE, TABLE_RFQS
+from logic.embeddings import parse_vector
+
+# --- PARQUET SNAPSHOTS ---
+# Export pages through each table by id (keyset) and appends every page to a
+# Parquet file as a row group, so memory is bounded by one page whatever the
+# table size. Restore streams record batches back out of the files into a
+# target: Supabase (REST upserts), Postgres (COPY) or a SQLite file.
+#
+# Column kinds are declared here rather than inferred per page, so a page of
+# all-null values cannot change a file's schema halfway through.
+
+# Restore order respects foreign keys
+SNAPSHOT_TABLES = [TABLE_SUPPLIERS, TABLE_PRODUCTS, TABLE_RFQS, TABLE_QUOTES, TABLE_QUOTES_ARCHIVE]
+
+SNAPSHOT_COLUMNS = {
+    TABLE_SUPPLIERS: {"id": "int", "name": "text", "contact_info": "text", "created_at": "timestamp", "updated_at": "timestamp"},
+    TABLE_PRODUCTS: {
+        "id": "int", "name": "text", "description": "text", "specs": "text",
+        "embedding": "vector", "embedding_hash": "text", "embedding_model": "text",
+        "embedding_next": "vector", "embedding_next_hash": "text", "embedding_next_model": "text",
+        "created_at": "timestamp", "updated_at": "timestamp",
+    },
+    TABLE_RFQS: {"id": "int", "raw_text": "text", "parsed_json": "json", "version": "int", "created_at": "timestamp"},
+    TABLE_QUOTES: {
+        "id": "int", "product_id": "int", "supplier_id": "int", "price": "float", "currency": "text",
+        "uom": "text", "source_url": "text", "note": "text", "quote_date": "date", "base_uom": "text",
+        "uom_factor": "float", "unit_price_base": "float", "created_at": "timestamp", "updated_at": "timestamp",
+    },
+}
+SNAPSHOT_COLUMNS[TABLE_QUOTES_ARCHIVE] = {**SNAPSHOT_COLUMNS[TABLE_QUOTES], "archived_at": "timestamp"}
+
+ARROW_TYPES = {
+    "int": pa.int64(), "text": pa.string(), "float": pa.float64(), "date": pa.date32(),
+    "timestamp": pa.timestamp("us", tz="UTC"), "vector": pa.list_(pa.float32()), "json": pa.string(),
+}
+SQLITE_TYPES = {"int": "INTEGER", "text": "TEXT", "float": "REAL", "date": "TEXT", "timestamp": "TEXT", "vector": "BLOB", "json": "TEXT"}
+PAGE_SIZES = {TABLE_PRODUCTS: 500}  # Two 768-dim vectors per row
+
+def arrow_schema(table: str):
+    return pa.schema([(col, ARROW_TYPES[kind]) for col, kind in SNAPSHOT_COLUMNS[table].items()])
+
+def _to_arrow_value(value, kind):
+    if value is None:
+        return None
+    if kind == "vector":
+        return parse_vector(value)
+    if kind == "json":
+        return value if isinstance(value, str) else json.dumps(value)
+    if kind == "date":
+        return datetime.date.fromisoformat(str(value)[:10])
+    if kind == "timestamp":
+        ts = datetime.datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        return ts if ts.tzinfo else ts.replace(tzinfo=datetime.timezone.utc)
+    if kind == "float":
+        return float(value)
+    return value
+
+def rows_to_arrow(table: str, rows):
+    columns = SNAPSHOT_COLUMNS[table]
+    arrays = {col: [_to_arrow_value(r.get(col), kind) for r in rows] for col, kind in columns.items()}
+    return pa.Table.from_pydict(arrays, schema=arrow_schema(table))
+
+def iter_table_pages(supabase, table: str, page_size: int = 1000):
+    """
+    Pages of `table` rows in id order, resuming after the last id seen.
+    """
+    last_id = 0
+    while True:
+        rows = supabase.table(table).select('*').gt('id', last_id).order('id').limit(page_size).execute().data
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1]['id']
+        if len(rows) < page_size:
+            return
+
+def export_snapshot(supabase, out_dir: str, tables=SNAPSHOT_TABLES, page_size: int = 1000, progress=None):
+    """
+    Writes one <table>.parquet per table plus manifest.json. Returns the row counts.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    counts = {}
+    for table in tables:
+        path = os.path.join(out_dir, f"{table}.parquet")
+        counts[table] = 0
+        with pq.ParquetWriter(path + ".tmp", arrow_schema(table), compression="zstd") as writer:
+            for rows in iter_table_pages(supabase, table, PAGE_SIZES.get(table, page_size)):
+                writer.write_table(rows_to_arrow(table, rows))
+                counts[table] += len(rows)
+                if progress:
+                    progress(table, counts[table])
+        os.replace(path + ".tmp", path)
+
+    manifest = {
+        "exported_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "tables": counts,
+    }
+    with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return counts
+
+def iter_snapshot_batches(in_dir: str, table: str, batch_size: int = 1000):
+    """
+    Lists of row dicts from a snapshot file, one record batch at a time.
+    """
+    path = os.path.join(in_dir, f"{table}.parquet")
+    if not os.path.exists(path):
+        return
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+        yield batch.to_pylist()
+
+# --- RESTORE TARGETS ---
+# Each target takes batches of row dicts (Arrow-typed values) per table.
+# Snapshots taken before a column was added lack it; targets leave such
+# columns out so the database fills in its default.
+
+def restore_columns(table: str, rows) -> dict:
+    """
+    {column: kind} of SNAPSHOT_COLUMNS[table] present in the batch.
+    """
+    return {col: kind for col, kind in SNAPSHOT_COLUMNS[table].items() if not rows or col in rows[0]}
+
+def _json_value(value, kind):
+    if value is None:
+        return None
+    if kind == "vector":
+        return "[" + ",".join(f"{v:.8g}" for v in value) + "]"
+    if kind == "json":
+        return json.loads(value)
+    if kind in ("date", "timestamp"):
+        return value.isoformat()
+    return value
+
+class SupabaseTarget:
+    """
+    Upserts through the REST API; ids are kept, so re-running a restore is idempotent.
+    """
+    def __init__(self, supabase):
+        self.supabase = supabase
+
+    def write(self, table, rows):
+        kinds = restore_columns(table, rows)
+        payload = [{col: _json_value(r.get(col), kinds[col]) for col in kinds} for r in rows]
+        self.supabase.table(table).upsert(payload, on_conflict='id').execute()
+
+    def finish(self):
+        # Serial sequences are behind the restored ids until bumped
+        self.supabase.rpc('sync_id_sequences', {}).execute()
+
+class PostgresTarget:
+    """
+    Bulk loads with COPY ... FROM STDIN (CSV) through psycopg2, one COPY per batch.
+    Tables must exist (run schema.sql first) and should be empty.
+    """
+    def __init__(self, dsn: str):
+        import psycopg2
+        self.conn = psycopg2.connect(dsn)
+
+    def write(self, table, rows):
+        kinds = restore_columns(table, rows)
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        for r in rows:
+            values = []
+            for col, kind in kinds.items():
+                value = r.get(col)
+                if value is None:
+                    values.append(r"\N")
+                elif kind == "vector":
+                    values.append(_json_value(value, kind))
+                elif kind in ("date", "timestamp"):
+                    values.append(value.isoformat())
+                else:
+                    values.append(value)
+            writer.writerow(values)
+        buf.seek(0)
+        with self.conn.cursor() as cur:
+            cur.copy_expert(f"COPY {table} ({', '.join(kinds)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buf)
+
+    def finish(self):
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT sync_id_sequences()")
+        self.conn.commit()
+        self.conn.close()
+
+class SQLiteTarget:
+    """
+    Writes into a SQLite file, creating the tables when missing. Vectors are float32 blobs.
+    """
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path)
+        for table, kinds in SNAPSHOT_COLUMNS.items():
+            cols = ", ".join(f"{col} {SQLITE_TYPES[kind]}" + (" PRIMARY KEY" if col == "id" else "") for col, kind in kinds.items())
+            self.conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({cols})")
+            existing = {row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+            for col, kind in kinds.items():
+                if col not in existing:  # File from a restore before the column was snapshotted
+                    self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {col} {SQLITE_TYPES[kind]}")
+
+    def write(self, table, rows):
+        kinds = SNAPSHOT_COLUMNS[table]
+        def value(v, kind):
+            if v is None:
+                return None
+            if kind == "vector":
+                return np.asarray(v, dtype=np.float32).tobytes()
+            if kind in ("date", "timestamp"):
+                return v.isoformat()
+            return v
+        self.conn.executemany(
+            f"INSERT OR REPLACE INTO {table} ({', '.join(kinds)}) VALUES ({', '.join('?' * len(kinds))})",
+            [tuple(value(r.get(col), kind) for col, kind in kinds.items()) for r in rows]
+        )
+
+    def finish(self):
+        self.conn.commit()
+        self.conn.close()
+
+def restore_snapshot(in_dir: str, target, tables=SNAPSHOT_TABLES, batch_size: int = 1000, progress=None):
+    """
+    Streams every table of a snapshot into `target`. Returns the row counts.
+    """
+    counts = {}
+    for table in tables:
+        counts[table] = 0
+        for rows in iter_snapshot_batches(in_dir, table, PAGE_SIZES.get(table, batch_size)):
+            target.write(table, rows)
+            counts[table] += len(rows)
+            if progress:
+                progress(table, counts[table])
+    target.finish()
+    return counts
@@ -0,0 +1,396 @@
+import os
+import re
+import json
+import time
+import hashlib
+import sqlite3
+import datetime
+import tempfile
+import numpy as np
+from logic.database import TABLE_SUPPLIERS, TABLE_PRODUCTS, TABLE_QUOTES, TABLE_QUOTES_ARCHIVE, TABLE_RFQS
+from logic.embeddings import parse_vector
+from logic.rfqs import apply_item_changes, remap_lines
+from logic.mirror import EMBEDS, LocalMirror, MirrorQuery, _Result, _quote_ident, _split_select
+
+# --- LOCAL STAND-INS ---
+# An in-process replacement for the Supabase client and the Gemini calls, for
+# benchmarks and load tests that must not touch a real project or spend quota.
+# The Supabase stand-in stores tables in a SQLite file and answers selects with
+# the same PostgREST translation as the local mirror; writes are applied in
+# place. `latency` adds a fixed delay per request to imitate a network hop.
+
+STANDIN_TABLES = [
+    TABLE_SUPPLIERS, TABLE_PRODUCTS, TABLE_QUOTES, TABLE_QUOTES_ARCHIVE, TABLE_RFQS,
+    "awards", "award_bids", "fx_rates", "uom_conversions", "product_price_stats", "supplier_scorecard", "deleted_rows",
+]
+STANDIN_DIM = 768
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+class StandInQuery(MirrorQuery):
+    """
+    Same recorded builder as the mirror, executed entirely against the stand-in file.
+    """
+    def execute(self):
+        standin = self.client
+        if standin.latency:
+            time.sleep(standin.latency)
+        standin.requests += 1
+        if self.write:
+            result = getattr(self, f"_{self.write}")()
+            standin.mirror.connect().commit()
+            return result
+        # Columns can be added by another process sharing the file; re-read them so '*' sees every one
+        standin.mirror._columns.pop(self.table, None)
+        standin._ensure_columns(self.table, self._referenced_columns())
+        result = self._local()
+        return _Result(standin.decode(self.table, result.data), result.count)
+
+    def _referenced_columns(self):
+        """
+        Columns a read names, so a table that never received them answers with nulls instead of failing.
+        """
+        cols = []
+        for name, args, _ in self.calls:
+            if name == "select":
+                columns, embeds = _split_select(", ".join(args) if args else "*")
+                cols += [c for c in columns if c != "*"] + [EMBEDS[rel][0] for rel in embeds if rel in EMBEDS]
+            elif name == "or_":
+                cols += re.findall(r"(?:^|[,(])(?:not\.)?(\w+)\.(?:eq|neq|gt|gte|lt|lte|like|ilike|in|is)\.", args[0])
+            elif name not in ("limit", "not_") and args and isinstance(args[0], str):
+                cols.append(args[0])
+        return list(dict.fromkeys(cols))
+
+    def _write_args(self):
+        return next((args, kwargs) for name, args, kwargs in self.calls if name == self.write)
+
+    def _matching_ids(self):
+        self.client._ensure_columns(self.table, self._referenced_columns())
+        query = MirrorQuery(self.client, self.table)
+        query.calls = [c for c in self.calls if c[0] not in ("insert", "update", "upsert", "delete", "select")]
+        query.calls.append(("select", ("id",), {}))
+        return [r["id"] for r in query._local().data]
+
+    def _rows(self, ids):
+        if not ids:
+            return _Result([])
+        rows = self.client.mirror.connect().execute(
+            f"SELECT * FROM {_quote_ident(self.table)} WHERE id IN ({', '.join('?' * len(ids))}) ORDER BY id", ids
+        )
+        return _Result(self.client.decode(self.table, [dict(r) for r in rows]))
+
+    def _insert(self):
+        (rows, *_), _ = self._write_args()
+        return self._rows(self.client.insert_rows(self.table, rows if isinstance(rows, list) else [rows]))
+
+    def _upsert(self):
+        (rows, *_), kwargs = self._write_args()
+        keys = (kwargs.get("on_conflict") or "id").split(",")
+        ids = []
+        for row in rows if isinstance(rows, list) else [rows]:
+            existing = None
+            if all(row.get(k) is not None for k in keys):
+                where = " AND ".join(f"{_quote_ident(k)} = ?" for k in keys)
+                existing = self.client.mirror.connect().execute(
+                    f"SELECT id FROM {_quote_ident(self.table)} WHERE {where}", [self.client.encode(row[k]) for k in keys]
+                ).fetchone()
+            if existing:
+                self.client.update_ids(self.table, [existing[0]], row)
+                ids.append(existing[0])
+            else:
+                ids += self.client.insert_rows(self.table, [row])
+        return self._rows(ids)
+
+    def _update(self):
+        (values, *_), _ = self._write_args()
+        ids = self._matching_ids()
+        self.client.update_ids(self.table, ids, values)
+        return self._rows(ids)
+
+    def _delete(self):
+        ids = self._matching_ids()
+        result = self._rows(ids)
+        self.client.mirror.delete_ids(self.table, ids)
+        return result
+
+class _StandInRpc:
+    def __init__(self, client, name, params):
+        self.client, self.name, self.params = client, name, params
+
+    def execute(self):
+        if self.client.latency:
+            time.sleep(self.client.latency)
+        self.client.requests += 1
+        handler = self.client.rpcs.get(self.name)
+        return _Result(handler(self.client, self.params or {}) if handler else None)
+
+def _match_products(client, params):
+    """
+    Cosine search over products.embedding, like the `match_products` SQL function.
+    """
+    rows, matrix = client.product_vectors()
+    if not rows:
+        return []
+    query = np.asarray(parse_vector(params["query_embedding"]), dtype=np.float32)
+    sims = matrix @ query / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(query) + 1e-12)
+    order = np.argsort(-sims)[:int(params.get("match_count", 5))]
+    return [{**rows[i], "similarity": float(sims[i])} for i in order if sims[i] > float(params.get("match_threshold", 0.0))]
+
+def _patch_rfq_items(client, params):
+    """
+    Versioned item patch on rfqs.parsed_json, like the `patch_rfq_items` SQL function.
+    """
+    conn = client.mirror.connect()
+    client._ensure_columns(TABLE_RFQS, ["parsed_json", "version"])
+    row = conn.execute(f"SELECT parsed_json, COALESCE(version, 1) FROM {TABLE_RFQS} WHERE id = ?", (params["p_rfq_id"],)).fetchone()
+    if row is None or row[1] != params["p_version"]:
+        return None
+    old_doc = json.loads(row[0]) if row[0] else {}
+    doc = apply_item_changes(old_doc, params["p_changes"])
+    client.update_ids(TABLE_RFQS, [params["p_rfq_id"]], {"parsed_json": doc, "version": row[1] + 1})
+    if params["p_changes"].get("remove"):
+        mapping = remap_lines(params["p_changes"], len(old_doc.get('items') or []))
+        for table in ("awards", "award_bids"):
+            client._ensure_columns(table, ["rfq_id", "line_no"])
+            lines = [r[0] for r in conn.execute(f"SELECT DISTINCT line_no FROM {table} WHERE rfq_id = ?", (params["p_rfq_id"],))]
+            for line in sorted(lines):
+                if line in mapping:
+                    conn.execute(f"UPDATE {table} SET line_no = ? WHERE rfq_id = ? AND line_no = ?", (mapping[line], params["p_rfq_id"], line))
+                else:
+                    conn.execute(f"DELETE FROM {table} WHERE rfq_id = ? AND line_no = ?", (params["p_rfq_id"], line))
+    conn.commit()
+    return row[1] + 1
+
+def _archive_quotes(client, params):
+    """
+    Moves a batch of old, unawarded quotes to quotes_archive, like the `archive_quotes` SQL function.
+    """
+    conn = client.mirror.connect()
+    client._ensure_columns(TABLE_QUOTES, ["quote_date"])
+    client._ensure_columns("awards", ["quote_id"])
+    cur = conn.execute(
+        f"SELECT * FROM {TABLE_QUOTES} WHERE quote_date < ? AND id NOT IN (SELECT quote_id FROM awards WHERE quote_id IS NOT NULL) "
+        f"ORDER BY quote_date, id LIMIT ?", (params["p_before"], int(params.get("p_batch", 5000)))
+    )
+    cols = [d[0] for d in cur.description]
+    rows = [dict(zip(cols, r)) for r in cur.fetchall()]
+    client.insert_rows(TABLE_QUOTES_ARCHIVE, [{**r, "archived_at": _now()} for r in rows])
+    client.mirror.delete_ids(TABLE_QUOTES, [r["id"] for r in rows])
+    conn.commit()
+    return len(rows)
+
+class StandInSupabase:
+    """
+    Supabase client stand-in backed by a SQLite file (a temporary one by default).
+    Safe to share between threads; each thread gets its own connection.
+    """
+    def __init__(self, path: str = None, latency: float = 0.0):
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix="procuremind_standin_", suffix=".db")
+            os.close(fd)
+        self.mirror = LocalMirror(path, tables=STANDIN_TABLES)
+        self.latency = latency
+        self.requests = 0
+        self.rpcs = {"match_products": _match_products, "patch_rfq_items": _patch_rfq_items, "archive_quotes": _archive_quotes}
+        self.pool_key = ("standin", path)
+        self.supabase_url = f"standin://{path}"
+        self._vectors = None
+        # Which columns hold JSON is kept in the file, so other processes opening it decode the same way
+        conn = self.mirror.connect()
+        conn.execute("CREATE TABLE IF NOT EXISTS _standin_json (table_name TEXT, col TEXT, PRIMARY KEY (table_name, col))")
+        self.json_columns = {}
+        for table_name, col in conn.execute("SELECT table_name, col FROM _standin_json"):
+            self.json_columns.setdefault(table_name, set()).add(col)
+
+    def table(self, name: str):
+        if name not in self.mirror.tables:
+            self.mirror.tables.append(name)
+            self.mirror.connect().execute(f"CREATE TABLE IF NOT EXISTS {_quote_ident(name)} (id INTEGER PRIMARY KEY)")
+        return StandInQuery(self, name)
+
+    def rpc(self, name: str, params: dict = None):
+        return _StandInRpc(self, name, params)
+
+    def product_vectors(self):
+        """
+        (product rows, embedding matrix), re-read only when products change.
+        """
+        conn = self.mirror.connect()
+        version = tuple(conn.execute(f"SELECT COUNT(*), MAX(updated_at) FROM {TABLE_PRODUCTS}").fetchone())
+        if self._vectors is None or self._vectors[0] != version:
+            self._ensure_columns(TABLE_PRODUCTS, ["name", "description", "specs", "embedding"])
+            rows = [dict(r) for r in conn.execute(
+                f"SELECT id, name, description, specs, embedding FROM {TABLE_PRODUCTS} WHERE embedding IS NOT NULL"
+            )]
+            matrix = np.array([parse_vector(r.pop("embedding")) for r in rows], dtype=np.float32).reshape(len(rows), -1)
+            self._vectors = (version, rows, matrix)
+        return self._vectors[1], self._vectors[2]
+
+    def encode(self, value):
+        return json.dumps(value) if isinstance(value, (dict, list)) else value
+
+    def decode(self, table, rows):
+        cols = self.json_columns.get(table)
+        if cols:
+            for r in rows:
+                for c in cols & r.keys():
+                    if isinstance(r[c], str):
+                        r[c] = json.loads(r[c])
+        return rows
+
+    def _ensure_columns(self, table, cols):
+        known = set(self.mirror.columns(table))
+        missing = [c for c in cols if c not in known]
+        for col in missing:
+            try:
+                self.mirror.connect().execute(f"ALTER TABLE {_quote_ident(table)} ADD COLUMN {_quote_ident(col)}")
+            except sqlite3.OperationalError as e:
+                if "duplicate column" not in str(e):
+                    raise  # Otherwise another thread or process added it first
+        if missing:
+            self.mirror._columns.pop(table, None)
+
+    def _note_json(self, table, row):
+        for col, value in row.items():
+            if isinstance(value, (dict, list)) and not (table == TABLE_PRODUCTS and col.startswith("embedding")):
+                if col not in self.json_columns.get(table, ()):
+                    self.json_columns.setdefault(table, set()).add(col)
+                    self.mirror.connect().execute("INSERT OR IGNORE INTO _standin_json VALUES (?, ?)", (table, col))
+
+    def insert_rows(self, table: str, rows):
+        conn = self.mirror.connect()
+        ids = []
+        for row in rows:
+            row = {"created_at": _now(), **row, "updated_at": _now()}
+            self._note_json(table, row)
+            self._ensure_columns(table, row)
+            cols = list(row)
+            cur = conn.execute(
+                f"INSERT INTO {_quote_ident(table)} ({', '.join(map(_quote_ident, cols))}) VALUES ({', '.join('?' * len(cols))})",
+                [self.encode(row[c]) for c in cols]
+            )
+            ids.append(row.get("id") or cur.lastrowid)
+        return ids
+
+    def update_ids(self, table: str, ids, values: dict):
+        if not ids:
+            return
+        values = {**values, "updated_at": _now()}
+        self._note_json(table, values)
+        self._ensure_columns(table, values)
+        assignments = ", ".join(f"{_quote_ident(c)} = ?" for c in values)
+        self.mirror.connect().execute(
+            f"UPDATE {_quote_ident(table)} SET {assignments} WHERE id IN ({', '.join('?' * len(ids))})",
+            [self.encode(v) for v in values.values()] + list(ids)
+        )
+
+    def close(self):
+        try:
+            os.remove(self.mirror.path)
+        except OSError:
+            pass
+
+# --- GEMINI STAND-IN ---
+
+def standin_embedding(text: str, dim: int = STANDIN_DIM):
+    """
+    Deterministic unit vector from the text's words, so similar names land close together.
+    """
+    vector = np.zeros(dim, dtype=np.float32)
+    for word in str(text).lower().split():
+        seed = int.from_bytes(hashlib.sha256(word.encode("utf-8")).digest()[:4], "little")
+        vector += np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    norm = np.linalg.norm(vector)
+    return (vector / norm if norm else vector).tolist()
+
+def install_gemini_standin(latency: float = 0.0, dim: int = STANDIN_DIM):
+    """
+    Replaces the Gemini calls in logic.parser (and the embeddings cache's reference)
+    with local, deterministic versions. Each call sleeps `latency` seconds.
+    """
+    import logic.parser as parser
+    import logic.embeddings as embeddings
+
+    def parse_rfq_text(text: str):
+        time.sleep(latency)
+        items = []
+        for line in str(text).splitlines():
+            words = line.split()
+            if len(words) >= 3 and words[0].replace(".", "", 1).isdigit():
+                items.append({"item_code": None, "quantity": float(words[0]), "uom": words[1], "name": " ".join(words[2:]),
+                              "description": " ".join(words[2:]), "brand": None, "specs": None})
+        return {"title": "Stand-in RFQ", "items": items}
+
+    def generate_embedding(text: str):
+        time.sleep(latency)
+        return standin_embedding(text, dim)
+
+    def generate_embeddings(texts: list):
+        time.sleep(latency)
+        return [standin_embedding(t, dim) for t in texts]
+
+    def generate_email_response(original_text: str, quote_data: str, user_instructions: str = ""):
+        time.sleep(latency)
+        return f"Dear Customer,\n\nPlease find our offer below.\n\n{quote_data}\n\n{user_instructions}\n\nBest regards"
+
+    def refine_email_response(current_draft: str, feedback: str):
+        time.sleep(latency)
+        return f"{current_draft}\n\n({feedback})"
+
+    for module in (parser, embeddings):
+        for fn in (parse_rfq_text, generate_embedding, generate_embeddings, generate_email_response, refine_email_response):
+            if hasattr(module, fn.__name__):
+                setattr(module, fn.__name__, fn)
+
+def seed_standin(client: StandInSupabase, products: int = 500, suppliers: int = 25, quotes_per_product: int = 8,
+                 rfqs: int = 20, lines_per_rfq: int = 15, dim: int = STANDIN_DIM, seed: int = 0):
+    """
+    Fills the stand-in with a synthetic catalog: suppliers, embedded products,
+    quotes in a few currencies, and RFQs whose lines name existing products.
+    """
+    rng = np.random.default_rng(seed)
+    nouns = ["pump", "valve", "bearing", "gasket", "cable", "filter", "motor", "hose", "bolt", "sensor", "relay", "switch"]
+    adjectives = ["heavy duty", "stainless", "industrial", "compact", "high pressure", "flexible", "sealed", "galvanized"]
+    uoms = ["Each", "Box", "Set", "Meter", "Pail"]
+
+    client.table(TABLE_SUPPLIERS).insert([{"name": f"Supplier {i + 1:02d}", "contact_info": f"sales{i + 1}@example.com"} for i in range(suppliers)]).execute()
+    names = [f"{adjectives[i % len(adjectives)]} {nouns[(i // len(adjectives)) % len(nouns)]} {i + 1}" for i in range(products)]
+    for start in range(0, products, 200):
+        batch = names[start:start + 200]
+        client.table(TABLE_PRODUCTS).insert([
+            {"name": n, "description": f"{n} for general plant maintenance", "specs": f"Model {start + i + 1}",
+             "embedding": "[" + ",".join(f"{v:.6f}" for v in standin_embedding(n, dim)) + "]"}
+            for i, n in enumerate(batch)
+        ]).execute()
+
+    quotes = []
+    today = datetime.date.today()
+    for product_id in range(1, products + 1):
+        base = float(rng.lognormal(4, 1))
+        for _ in range(quotes_per_product):
+            currency = rng.choice(["USD", "USD", "USD", "EUR", "IDR"])
+            factor = {"USD": 1.0, "EUR": 0.92, "IDR": 15500.0}[currency]
+            quotes.append({
+                "product_id": product_id, "supplier_id": int(rng.integers(1, suppliers + 1)),
+                "price": round(base * factor * float(rng.uniform(0.8, 1.25)), 2), "currency": str(currency),
+                "uom": "Each", "quote_date": (today - datetime.timedelta(days=int(rng.integers(0, 720)))).isoformat(),
+            })
+    for start in range(0, len(quotes), 1000):
+        client.table(TABLE_QUOTES).insert(quotes[start:start + 1000]).execute()
+
+    client.table("fx_rates").insert([
+        {"currency": "USD", "rate_date": today.isoformat(), "rate_to_usd": 1.0},
+        {"currency": "EUR", "rate_date": today.isoformat(), "rate_to_usd": 1.087},
+        {"currency": "IDR", "rate_date": today.isoformat(), "rate_to_usd": 0.0000645},
+    ]).execute()
+
+    for r in range(rfqs):
+        picks = rng.choice(products, size=min(lines_per_rfq, products), replace=False)
+        items = [{"item_code": f"IC-{p + 1}", "name": names[p], "description": names[p], "quantity": int(rng.integers(1, 50)),
+                  "uom": str(rng.choice(uoms[:1])), "brand": None, "specs": None} for p in picks]
+        client.table(TABLE_RFQS).insert({
+            "raw_text": "\n".join(f"{i['quantity']} {i['uom']} {i['name']}" for i in items),
+            "parsed_json": {"title": f"Stand-in RFQ {r + 1}", "items": items}, "version": 1,
+        }).execute()
+    return client
@@ -0,0 +1,177 @@
+import re
+import numpy as np
+import pandas as pd
+import streamlit as st
+from logic.database import CLIENT_HASH_FUNCS
+
+# --- UNIT OF MEASURE NORMALIZATION ---
+# Free-text UOMs ("Pcs", "Piece", "Each") are mapped to a canonical code, and
+# every canonical code converts to a base unit with a factor. Pack units (BOX,
+# PAIL, ...) have no universal size, so their factor comes from `uom_conversions`
+# rows scoped to a product and/or supplier. Quotes store the resolved factor at
+# insert time; comparisons then divide by it instead of re-parsing text.
+
+TABLE_UOM_CONVERSIONS = "uom_conversions"
+
+UOM_ALIASES = {
+    "EA": ["ea", "each", "pc", "pcs", "psc", "piece", "pieces", "unit", "units", "nos", "no", "buah"],
+    "DOZEN": ["dozen", "dz", "doz", "lusin"],
+    "PAIR": ["pair", "pairs", "pr"],
+    "SET": ["set", "sets"],
+    "BOX": ["box", "boxes", "bx", "ctn", "carton", "cartons", "dus"],
+    "PACK": ["pack", "packs", "pk", "pkt", "packet"],
+    "PAIL": ["pail", "pails"],
+    "DRUM": ["drum", "drums"],
+    "ROLL": ["roll", "rolls", "rl"],
+    "KG": ["kg", "kgs", "kilogram", "kilograms"],
+    "G": ["g", "gr", "gram", "grams"],
+    "L": ["l", "lt", "ltr", "liter", "litre", "liters", "litres"],
+    "ML": ["ml", "milliliter", "millilitre"],
+    "M": ["m", "mtr", "meter", "metre", "meters", "metres"],
+    "CM": ["cm"],
+    "MM": ["mm"],
+}
+
+# Canonical code -> (base unit, factor). Pack units are absent on purpose.
+STANDARD_CONVERSIONS = {
+    "EA": ("EA", 1.0),
+    "DOZEN": ("EA", 12.0),
+    "PAIR": ("EA", 2.0),
+    "KG": ("KG", 1.0),
+    "G": ("KG", 0.001),
+    "L": ("L", 1.0),
+    "ML": ("L", 0.001),
+    "M": ("M", 1.0),
+    "CM": ("M", 0.01),
+    "MM": ("M", 0.001),
+}
+
+_ALIAS_LOOKUP = {alias: code for code, aliases in UOM_ALIASES.items() for alias in aliases + [code.lower()]}
+
+def canonical_uom(uom):
+    """
+    "Pcs." -> "EA", "Pail" -> "PAIL"; unknown text is upper-cased as-is, empty -> None.
+    """
+    if uom is None or (isinstance(uom, float) and np.isnan(uom)):
+        return None
+    key = re.sub(r"[^a-z]", "", str(uom).lower())
+    if not key:
+        return None
+    return _ALIAS_LOOKUP.get(key, key.upper())
+
+@st.cache_data(ttl=300, show_spinner=False, hash_funcs=CLIENT_HASH_FUNCS)
+def load_uom_conversions(supabase):
+    """
+    Pack-size rows: product_id / supplier_id (either may be null), uom, base_uom, factor.
+    """
+    columns = ["product_id", "supplier_id", "uom", "base_uom", "factor"]
+    if supabase is None:
+        return pd.DataFrame(columns=columns)
+    try:
+        rows = supabase.table(TABLE_UOM_CONVERSIONS).select(", ".join(columns)).execute().data
+    except Exception:
+        rows = []  # Table not created yet; standard conversions still apply
+    return pd.DataFrame(rows, columns=columns)
+
+def _conversion_index(conversions: pd.DataFrame):
+    index = {}
+    for row in conversions.itertuples(index=False):
+        product_id = None if pd.isna(row.product_id) else int(row.product_id)
+        supplier_id = None if pd.isna(row.supplier_id) else int(row.supplier_id)
+        index[(canonical_uom(row.uom), product_id, supplier_id)] = (canonical_uom(row.base_uom), float(row.factor))
+    return index
+
+def resolve_uom(uom, product_id=None, supplier_id=None, conversions: pd.DataFrame = None, index=None):
+    """
+    Returns (base_uom, factor) meaning 1 `uom` = factor x base_uom.
+    Most specific wins: product+supplier, product, supplier, global, then the
+    standard table. Unknown units convert to themselves with factor 1.
+    """
+    code = canonical_uom(uom)
+    if code is None:
+        return None, 1.0
+    if index is None:
+        index = _conversion_index(conversions) if conversions is not None else {}
+    for key in ((code, product_id, supplier_id), (code, product_id, None), (code, None, supplier_id), (code, None, None)):
+        if key in index:
+            base, factor = index[key]
+            # Allow chaining e.g. BOX -> 12 DOZEN -> 144 EA
+            if base in STANDARD_CONVERSIONS and base != STANDARD_CONVERSIONS[base][0]:
+                std_base, std_factor = STANDARD_CONVERSIONS[base]
+                return std_base, factor * std_factor
+            return base, factor
+    return STANDARD_CONVERSIONS.get(code, (code, 1.0))
+
+def apply_uom(rows: pd.DataFrame, conversions: pd.DataFrame):
+    """
+    Re-expresses line x quote rows per base unit so prices compare fairly.
+
+    Expects 'price', 'qty', 'uom' (quote), 'line_uom' (RFQ line), 'product_id'
+    and 'supplier_id'; uses stored 'uom_factor'/'base_uom' when present.
+    Afterwards 'price' is per base unit and 'qty' is in base units, with the
+    original values kept in 'quoted_price'/'quoted_qty'. Rows whose quote and
+    line units cannot be reconciled get price NaN and uom_mismatch=True.
+    """
+    if rows.empty:
+        return rows.assign(quoted_price=[], quoted_qty=[], base_uom=[], uom_mismatch=[])
+    out = rows.copy()
+    index = _conversion_index(conversions) if conversions is not None else {}
+    product = out['product_id'] if 'product_id' in out else pd.Series(None, index=out.index)
+    supplier = out['supplier_id'] if 'supplier_id' in out else pd.Series(None, index=out.index)
+
+    def resolve_column(uoms):
+        keys = list(zip(uoms.map(canonical_uom), product.map(lambda v: None if pd.isna(v) else int(v)),
+                        supplier.map(lambda v: None if pd.isna(v) else int(v))))
+        resolved = {k: resolve_uom(k[0], k[1], k[2], index=index) for k in set(keys)}
+        return [resolved[k][0] for k in keys], np.array([resolved[k][1] for k in keys], dtype=float)
+
+    quote_uom = out['uom'] if 'uom' in out else pd.Series(None, index=out.index)
+    line_uom = out['line_uom'] if 'line_uom' in out else pd.Series(None, index=out.index)
+    # A missing unit on either side is assumed to match the other side
+    quote_uom = quote_uom.where(quote_uom.map(canonical_uom).notna(), line_uom)
+    line_uom = line_uom.where(line_uom.map(canonical_uom).notna(), quote_uom)
+
+    quote_base, quote_factor = resolve_column(quote_uom)
+    if 'uom_factor' in out:
+        stored = pd.to_numeric(out['uom_factor'], errors='coerce').to_numpy(dtype=float)
+        has_stored = ~np.isnan(stored) & out['base_uom'].notna().to_numpy()
+        quote_factor = np.where(has_stored, stored, quote_factor)
+        quote_base = [b if ok else q for b, q, ok in zip(out['base_uom'], quote_base, has_stored)]
+    line_base, line_factor = resolve_column(line_uom)
+
+    mismatch = np.array([q != l for q, l in zip(quote_base, line_base)])
+    out['quoted_price'] = out['price']
+    out['quoted_qty'] = out['qty']
+    out['base_uom'] = quote_base
+    out['price'] = np.where(mismatch, np.nan, out['price'].to_numpy(dtype=float) / quote_factor)
+    out['qty'] = out['qty'].to_numpy(dtype=float) * line_factor
+    out['uom_mismatch'] = mismatch
+    return out
+
+def quote_uom_fields(price, uom, product_id, supplier_id, conversions: pd.DataFrame):
+    """
+    Columns stored with a quote at insert/update time.
+    """
+    base_uom, factor = resolve_uom(uom, product_id, supplier_id, conversions)
+    return {
+        "base_uom": base_uom,
+        "uom_factor": factor,
+        "unit_price_base": round(float(price) / factor, 6) if factor else None
+    }
+
+def save_pack_size(supabase, product_id, supplier_id, uom, base_uom, factor):
+    """
+    Records "1 uom = factor base_uom" for a product/supplier, replacing any previous size.
+    """
+    uom, base_uom = canonical_uom(uom), canonical_uom(base_uom)
+    query = supabase.table(TABLE_UOM_CONVERSIONS).select('id').eq('uom', uom)
+    query = query.eq('product_id', product_id) if product_id else query.is_('product_id', 'null')
+    query = query.eq('supplier_id', supplier_id) if supplier_id else query.is_('supplier_id', 'null')
+    existing = query.limit(1).execute().data
+
+    payload = {"product_id": product_id, "supplier_id": supplier_id, "uom": uom, "base_uom": base_uom, "factor": factor}
+    if existing:
+        supabase.table(TABLE_UOM_CONVERSIONS).update(payload).eq('id', existing[0]['id']).execute()
+    else:
+        supabase.table(TABLE_UOM_CONVERSIONS).insert(payload).execute()
+    load_uom_conversions.clear()
@@ -1,5 +1,10 @@
 import streamlit as st
 import os
+from logic.database import get_supabase, get_client_pool
+from logic.embeddings import get_query_cache
+from logic.mirror import MirroredClient, MIRROR_SYNC_INTERVAL, upstream_counts
+from logic.fx import SUPPORTED_CURRENCIES, FX_RATES_PATH, TABLE_FX_RATES, get_base_currency, load_fx_rates
+from logic.quote_archive import get_quote_window, get_include_archived, quote_scope, scope_label
 
 st.set_page_config(page_title="Settings", page_icon="⚙️", layout="wide")
 
@@ -73,8 +78,8 @@ with col_db1:
         if supa_url_input.startswith("https://") and len(supa_key_input) > 20:
             st.session_state["SUPABASE_URL"] = supa_url_input
             st.session_state["SUPABASE_ANON_KEY"] = supa_key_input
-            # Clear cached client to force reconnection
-            st.cache_resource.clear()
+            # The pool creates a client for the new credentials on the next rerun;
+            # other users' clients are untouched
             st.success("Supabase credentials saved!")
             st.rerun()
         else:
@@ -82,22 +87,101 @@ with col_db1:
 
 with col_db2:
     if st.button("Reset Connection"):
+        if "SUPABASE_URL" in st.session_state and "SUPABASE_ANON_KEY" in st.session_state:
+            get_client_pool().discard(st.session_state["SUPABASE_URL"], st.session_state["SUPABASE_ANON_KEY"])
         if "SUPABASE_URL" in st.session_state:
             del st.session_state["SUPABASE_URL"]
         if "SUPABASE_ANON_KEY" in st.session_state:
             del st.session_state["SUPABASE_ANON_KEY"]
-        st.cache_resource.clear()
         st.rerun()
 
+pool_stats = get_client_pool().stats()
+st.caption(f"Connection pool: {pool_stats['clients']} of {pool_stats['max_size']} clients open on this server "
+           f"({pool_stats['created']} created, {pool_stats['evicted']} closed).")
+
+st.divider()
+
+# --- CURRENCY & FX RATES ---
+st.subheader("💱 Currency & FX Rates")
+st.write("Rankings, totals and charts are converted into the base currency using the latest dated rate.")
+
+current_base = get_base_currency()
+base_currency = st.selectbox(
+    "Base Currency",
+    SUPPORTED_CURRENCIES,
+    index=SUPPORTED_CURRENCIES.index(current_base) if current_base in SUPPORTED_CURRENCIES else 0
+)
+if base_currency != current_base:
+    st.session_state["BASE_CURRENCY"] = base_currency
+    st.rerun()
+
+fx_client = get_supabase()
+fx_table = load_fx_rates(fx_client)
+if fx_table.empty:
+    st.warning(f"No FX rates loaded. Add rates below or place a `{FX_RATES_PATH}` file next to the app (see `fx_rates.example.csv`).")
+else:
+    st.dataframe(fx_table, hide_index=True, use_container_width=True)
+
+with st.form("fx_rate_form", clear_on_submit=True):
+    col_fx1, col_fx2, col_fx3 = st.columns(3)
+    with col_fx1:
+        fx_currency = st.selectbox("Currency", SUPPORTED_CURRENCIES)
+    with col_fx2:
+        fx_date = st.date_input("Rate Date")
+    with col_fx3:
+        fx_rate = st.number_input("1 unit = ? USD", min_value=0.0, format="%.10f")
+    if st.form_submit_button("Save Rate"):
+        if not fx_client:
+            st.error("Connect Supabase to store rates, or edit the local rates file.")
+        elif fx_rate <= 0:
+            st.error("Rate must be greater than zero.")
+        else:
+            try:
+                fx_client.table(TABLE_FX_RATES).upsert({
+                    "currency": fx_currency,
+                    "rate_date": fx_date.isoformat(),
+                    "rate_to_usd": fx_rate
+                }, on_conflict='currency,rate_date').execute()
+                load_fx_rates.clear()
+                st.success(f"Saved {fx_currency} rate for {fx_date}.")
+                st.rerun()
+            except Exception as e:
+                st.error(f"Error saving rate: {e}")
+
+st.divider()
+
+# --- QUOTE HISTORY WINDOW ---
+st.subheader("📅 Quote History")
+st.write("Search and analysis read recent quotes only. Quotes older than the archive cutoff are moved to an archive "
+         "(`archive_quotes.py`) and are only read when included here.")
+
+col_qw1, col_qw2 = st.columns(2)
+with col_qw1:
+    window = st.number_input("Recency window (months, 0 = all current quotes)", min_value=0, max_value=240, step=1,
+                             value=get_quote_window())
+with col_qw2:
+    include_archived = st.toggle("Include archived quotes", value=get_include_archived(),
+                                 help="Reads every quote, archived ones too. Slower on a long history.")
+if window != get_quote_window() or include_archived != get_include_archived():
+    st.session_state["QUOTE_WINDOW_MONTHS"] = int(window)
+    st.session_state["INCLUDE_ARCHIVED_QUOTES"] = include_archived
+    st.rerun()
+st.caption(f"{scope_label(*quote_scope())}.")
+
 st.divider()
 
 # --- STATUS INDICATOR ---
 col_stat1, col_stat2 = st.columns(2)
 
+try:
+    secret_keys = set(st.secrets.keys())
+except Exception:
+    secret_keys = set()  # No secrets.toml
+
 with col_stat1:
     if "GOOGLE_API_KEY" in st.session_state:
         st.success("✅ AI Service: Ready (Session)")
-    elif os.getenv("GOOGLE_API_KEY") or (st.secrets.get("GOOGLE_API_KEY")):
+    elif os.getenv("GOOGLE_API_KEY") or "GOOGLE_API_KEY" in secret_keys:
         st.info("✅ AI Service: Ready (System)")
     else:
         st.warning("⚠️ AI Service: Not Configured")
@@ -107,11 +191,66 @@ with col_stat2:
         st.success("✅ Supabase: Ready (Session)")
     elif os.getenv("SUPABASE_URL") and os.getenv("SUPABASE_ANON_KEY"):
         st.info("✅ Supabase: Ready (Environment)")
-    elif "SUPABASE_URL" in st.secrets and "SUPABASE_ANON_KEY" in st.secrets:
+    elif "SUPABASE_URL" in secret_keys and "SUPABASE_ANON_KEY" in secret_keys:
         st.info("✅ Supabase: Ready (Secrets)")
     else:
         st.warning("⚠️ Supabase: Not Configured")
 
+st.divider()
+
+# --- CACHE METRICS ---
+st.subheader("⚡ Search Cache")
+q_stats = get_query_cache().stats()
+col_c1, col_c2, col_c3, col_c4 = st.columns(4)
+col_c1.metric("Query Lookups", q_stats["lookups"])
+col_c2.metric("Hit Rate", f"{q_stats['hit_rate']:.0%}")
+col_c3.metric("Memory / Disk Hits", f"{q_stats['memory_hits']} / {q_stats['disk_hits']}")
+col_c4.metric("Gemini Calls", q_stats["misses"])
+st.caption("Query embeddings are shared by all sessions on this server and persisted to disk.")
+
+st.divider()
+
+# --- LOCAL MIRROR ---
+st.subheader("🗄️ Local Mirror")
+mirror_client = get_supabase()
+if isinstance(mirror_client, MirroredClient):
+    st.dataframe(
+        mirror_client.mirror.status(),
+        column_config={
+            "table": "Table",
+            "local_rows": "Local Rows",
+            "watermark": "Synced Up To",
+            "last_sync": "Last Sync",
+            "lag_seconds": st.column_config.NumberColumn("Lag (s)", format="%.0f"),
+            "last_pulled": "Rows Pulled"
+        },
+        hide_index=True,
+        use_container_width=True
+    )
+    col_m1, col_m2 = st.columns([1, 4])
+    with col_m1:
+        if st.button("Sync Now"):
+            with st.spinner("Syncing..."):
+                try:
+                    pulled = mirror_client.mirror.sync(mirror_client.upstream)
+                    st.success("Pulled " + ", ".join(f"{n} {t}" for t, n in pulled.items()))
+                except Exception as e:
+                    st.error(f"Sync failed: {e}")
+    with col_m2:
+        if st.button("Compare with Server"):
+            try:
+                remote = upstream_counts(mirror_client)
+                local = mirror_client.mirror.status().set_index("table")["local_rows"]
+                st.dataframe(
+                    [{"Table": t, "Server Rows": n, "Local Rows": int(local.get(t, 0)), "Missing": n - int(local.get(t, 0))} for t, n in remote.items()],
+                    hide_index=True
+                )
+            except Exception as e:
+                st.error(f"Error counting server rows: {e}")
+    st.caption(f"Catalog reads are served from `{mirror_client.mirror.path}` and refreshed in the background every {MIRROR_SYNC_INTERVAL:.0f}s.")
+else:
+    st.caption("Disabled. Set `PROCUREMIND_MIRROR=1` to serve supplier, product and quote reads from a local SQLite copy (needs the `updated_at` columns and `deleted_rows` table from `schema.sql`).")
+
 st.info("""
 **Note:** Start fresh by clearing these settings. Your secrets are stored temporarily in your browser session.
 """)
@@ -1,12 +1,15 @@
+import functools
 import streamlit as st
 import pandas as pd
 from logic.parser import parse_rfq_text
 from logic.database import get_supabase
+from logic.rfqs import RfqConflict, diff_items, patch_rfq, rfq_version
+from logic.attachments import ATTACHMENT_TYPES, ITEM_FIELDS, parse_attachment, attachment_text
 
 st.set_page_config(page_title="RFQ Parser", page_icon="📝", layout="wide")
 
 st.title("📝 RFQ Manager")
-st.write("Import RFQs via AI parsing or define them manually.")
+st.write("Import RFQs via AI parsing, from spreadsheet/PDF attachments, or define them manually.")
 
 # Initialize client
 supabase = get_supabase()
@@ -15,7 +18,22 @@ if not supabase:
     st.warning("⚠️ Supabase is not configured. Please go to Settings.")
     st.stop()
 
-tab1, tab2, tab3 = st.tabs(["🤖 AI Parser", "✍️ Manual Input", "✏️ Edit Saved"])
+@functools.cache  # Per script run: the editor and "Recent RFQs" share one request
+def load_rfq_list():
+    return supabase.table('rfqs').select('*').order('created_at', desc=True).limit(100).execute().data
+
+def read_upload(upload, header_row=None, mapping=None):
+    """
+    parse_attachment() result for the current upload and mapping, kept across reruns.
+    """
+    key = (upload.file_id, header_row, tuple(sorted(mapping.items())) if mapping else None)
+    reads = st.session_state.setdefault("attachment_reads", {})
+    if key not in reads:
+        reads.clear()
+        reads[key] = parse_attachment(upload, upload.name, header_row, mapping)
+    return reads[key]
+
+tab1, tab_file, tab2, tab3 = st.tabs(["🤖 AI Parser", "📎 Attachment", "✍️ Manual Input", "✏️ Edit Saved"])
 
 # --- TAB 1: AI PARSER ---
 with tab1:
@@ -28,6 +46,8 @@ with tab1:
                 parsed_data = parse_rfq_text(rfq_text)
                 
                 if "items" in parsed_data and parsed_data["items"]:
+                    for warning in parsed_data.pop("warnings", []):
+                        st.warning(warning)
                     st.session_state['parsed_rfq'] = parsed_data
                     st.session_state['rfq_text'] = rfq_text
                     st.success(f"Successfully extracted {len(parsed_data['items'])} items!")
@@ -63,6 +83,70 @@ with tab1:
             except Exception as e:
                 st.error(f"Error saving RFQ: {e}")
 
+# --- TAB: ATTACHMENT ---
+with tab_file:
+    st.write("Upload an RFQ spreadsheet or PDF. Item tables are read directly, without Gemini; files without a recognizable item table can still be sent to the AI parser.")
+    upload = st.file_uploader("RFQ Attachment", type=ATTACHMENT_TYPES, key="rfq_attachment")
+
+    if upload is not None:
+        file_parsed, header = None, None
+        try:
+            with st.spinner(f"Reading {upload.name}..."):
+                file_parsed, header = read_upload(upload)
+        except ImportError as e:
+            st.error(f"Reading this file type needs an extra package: {e.name}. Install the requirements and restart.")
+        except Exception as e:
+            st.error(f"Could not read {upload.name}: {e}")
+
+        if header is not None:
+            header_row, columns, detected = header
+            with st.expander(f"🧭 Column Mapping (header found in row {header_row + 1})", expanded=file_parsed is None):
+                choices = [None] + list(range(len(columns)))
+                map_cols = st.columns(len(ITEM_FIELDS))
+                mapping = {}
+                for field, col in zip(ITEM_FIELDS, map_cols):
+                    with col:
+                        picked = st.selectbox(
+                            field, choices, index=choices.index(detected.get(field)),
+                            format_func=lambda c: "—" if c is None else columns[c], key=f"map_{upload.file_id}_{field}"
+                        )
+                    if picked is not None:
+                        mapping[field] = picked
+            if mapping != detected:
+                file_parsed, _ = read_upload(upload, header_row, mapping)
+
+        if file_parsed is None and st.session_state.get("file_ai_rfq", {}).get("file_id") == upload.file_id:
+            file_parsed = st.session_state["file_ai_rfq"]["parsed"]
+
+        if file_parsed is None:
+            st.warning("No item table (quantity plus name or description columns) was found in this file.")
+            if st.button("🤖 Parse with Gemini instead", key="file_ai_btn"):
+                with st.spinner("Gemini is analyzing the attachment..."):
+                    ai_parsed = parse_rfq_text(attachment_text(upload, upload.name))
+                if ai_parsed.get("items"):
+                    for warning in ai_parsed.pop("warnings", []):
+                        st.toast(warning)  # The page reruns right away, so a plain warning would not be seen
+                    st.session_state["file_ai_rfq"] = {"file_id": upload.file_id, "parsed": ai_parsed}
+                    st.rerun()
+                else:
+                    st.error("Failed to parse RFQ. Please try again or check your API key.")
+        else:
+            st.success(f"Read {len(file_parsed['items'])} items from {upload.name}.")
+            file_title = st.text_input("RFQ Title", value=file_parsed.get("title", upload.name), key=f"file_title_{upload.file_id}")
+            st.dataframe(pd.DataFrame(file_parsed["items"]), use_container_width=True)
+
+            if st.button("Save to History", key="save_file_rfq"):
+                try:
+                    supabase.table('rfqs').insert({
+                        "raw_text": attachment_text(upload, upload.name),
+                        "parsed_json": {**file_parsed, "title": file_title}
+                    }).execute()
+                    st.success("RFQ saved to history successfully!")
+                    st.session_state.pop("attachment_reads", None)
+                    st.session_state.pop("file_ai_rfq", None)
+                except Exception as e:
+                    st.error(f"Error saving RFQ: {e}")
+
 # --- TAB 2: MANUAL INPUT ---
 with tab2:
     st.write("Define your RFQ items manually.")
@@ -134,7 +218,7 @@ with tab3:
     st.write("Edit an existing RFQ from your database.")
     
     try:
-        all_rfqs = supabase.table('rfqs').select('*').order('created_at', desc=True).limit(100).execute().data
+        all_rfqs = load_rfq_list()
         
         if not all_rfqs:
             st.info("No saved RFQs found.")
@@ -147,36 +231,44 @@ with tab3:
             
             if rfq_to_edit and rfq_to_edit.get('parsed_json') and "items" in rfq_to_edit['parsed_json']:
                 current_items = rfq_to_edit['parsed_json']["items"]
-                new_title = st.text_input("Edit RFQ Title", value=rfq_to_edit['parsed_json'].get('title', ''), key=f"edit_title_{rfq_to_edit['id']}")
+                version = rfq_version(rfq_to_edit)
+                # Widgets are keyed by version, so a save or a reload after a conflict starts from the stored items
+                widget_key = f"{rfq_to_edit['id']}_v{version}"
+                new_title = st.text_input("Edit RFQ Title", value=rfq_to_edit['parsed_json'].get('title', ''), key=f"edit_title_{widget_key}")
                 
                 edit_df = pd.DataFrame(current_items)
                 edited_saved_df = st.data_editor(
                     edit_df,
                     num_rows="dynamic",
                     use_container_width=True,
-                    key=f"editor_saved_{rfq_to_edit['id']}"
+                    key=f"editor_saved_{widget_key}"
                 )
                 
                 col_up1, col_up2 = st.columns([1, 4])
                 with col_up1:
-                    if st.button("💾 Update", type="primary", key=f"upd_btn_{rfq_to_edit['id']}"):
+                    if st.button("💾 Update", type="primary", key=f"upd_btn_{widget_key}"):
                         try:
-                            updated_items = edited_saved_df.where(pd.notnull(edited_saved_df), None).to_dict(orient="records")
-                            new_json = rfq_to_edit['parsed_json']
-                            new_json["items"] = updated_items
-                            new_json["title"] = new_title
-                            
-                            supabase.table('rfqs').update({"parsed_json": new_json}).eq('id', rfq_to_edit['id']).execute()
-                            st.success("RFQ updated successfully!")
-                            st.rerun()
+                            # Only changed fields, removed lines and new lines are sent
+                            changes = diff_items(current_items, edited_saved_df, rfq_to_edit['parsed_json'].get('title'), new_title)
+                            if not changes:
+                                st.info("No changes to save.")
+                            else:
+                                patch_rfq(supabase, rfq_to_edit['id'], version, changes)
+                                st.success("RFQ updated successfully!")
+                                st.rerun()
+                        except RfqConflict:
+                            st.error("Someone else changed this RFQ since you opened it, so your edits were not saved. Their version loads on the next refresh.")
                         except Exception as e:
                             st.error(f"Error updating RFQ: {e}")
                 with col_up2:
-                    if st.button("🗑️ Delete RFQ", key=f"del_btn_{rfq_to_edit['id']}"):
+                    if st.button("🗑️ Delete RFQ", key=f"del_btn_{widget_key}"):
                         try:
-                            supabase.table('rfqs').delete().eq('id', rfq_to_edit['id']).execute()
-                            st.warning("RFQ deleted.")
-                            st.rerun()
+                            deleted = supabase.table('rfqs').delete().eq('id', rfq_to_edit['id']).eq('version', version).execute().data
+                            if deleted:
+                                st.warning("RFQ deleted.")
+                                st.rerun()
+                            else:
+                                st.error("Someone else changed this RFQ since you opened it; it was not deleted.")
                         except Exception as e:
                             st.error(f"Error deleting RFQ: {e}")
     except Exception as e:
@@ -186,7 +278,7 @@ with tab3:
 st.divider()
 st.subheader("📜 Recent RFQs")
 try:
-    recent_rfqs = supabase.table('rfqs').select('*').order('created_at', desc=True).limit(5).execute().data
+    recent_rfqs = load_rfq_list()[:5]
     for r in recent_rfqs:
         title = r['parsed_json'].get('title', 'Untitled RFQ') if r.get('parsed_json') else 'Untitled RFQ'
         with st.expander(f"{title} - {r['created_at'][:16]}"):
@@ -1,7 +1,14 @@
 import streamlit as st
 import pandas as pd
-from logic.database import get_supabase
-from logic.parser import generate_embedding
+from logic.database import get_supabase, TABLE_SUPPLIERS, TABLE_PRODUCTS, TABLE_RFQS
+from logic.fetch import fetch_all
+from logic.parser import EMBEDDING_MODEL
+from logic.embeddings import product_embedding_text, embedding_hash, find_product_by_hash, get_product_embedding, embed_query
+from logic.embedding_store import search_products
+from logic.fx import get_base_currency, load_fx_rates, latest_rates, format_money
+from logic.price_stats import fetch_price_stats, stats_in_base_currency
+from logic.uom import STANDARD_CONVERSIONS, canonical_uom, load_uom_conversions, quote_uom_fields, save_pack_size
+from logic.quote_archive import quote_scope, scope_label, fetch_quotes, in_window
 
 st.set_page_config(page_title="Log Quote", page_icon="📝", layout="wide")
 
@@ -23,65 +30,78 @@ with tab1:
     query = st.text_input("Search for historical products (e.g., 'heavy duty pump')")
 
     if query:
+        base_currency = get_base_currency()
+        fx_rates = latest_rates(load_fx_rates(supabase))
         with st.spinner("Searching..."):
-            embedding = generate_embedding(query)
+            embedding = embed_query(query)
             
             # Perform vector similarity search using Supabase RPC
             # Note: match_products must be created in Supabase SQL editor
             try:
-                rpc_response = supabase.rpc('match_products', {
-                    'query_embedding': embedding,
-                    'match_threshold': 0.5,
-                    'match_count': 5
-                }).execute()
-                
-                results = rpc_response.data
+                # Prefers the local quantized store when one has been built for this model
+                results = search_products(supabase, embedding, 0.5, 5)
                 
                 if results:
+                    # One aggregate read for every match instead of all raw quotes per product
+                    product_ids = [r['id'] for r in results]
+                    try:
+                        overall = stats_in_base_currency(fetch_price_stats(supabase, product_ids), base_currency, fx_rates)
+                        per_supplier = stats_in_base_currency(
+                            fetch_price_stats(supabase, product_ids, by_supplier=True), base_currency, fx_rates
+                        )
+                    except Exception:
+                        overall = per_supplier = pd.DataFrame(columns=['product_id'])  # Stats table not created yet
+
                     st.write("### Top Matches")
                     for r in results:
                         sim = r.get('similarity', 0)
                         with st.expander(f"{r['name']} (Similarity: {sim:.2%})"):
                             st.write(f"**Description:** {r.get('description', '-')}")
                             st.write(f"**Specs:** {r.get('specs', '-')}")
-                            
-                            # Find quotes for this product
-                            q_res = supabase.table('quotes').select('*, suppliers(name)').eq('product_id', r['id']).execute()
-                            quotes = q_res.data
-                            
-                            if quotes:
+
+                            p_stats = overall[overall['product_id'] == r['id']]
+                            s_stats = per_supplier[per_supplier['product_id'] == r['id']]
+
+                            if not p_stats.empty:
                                 st.write("#### 💰 Price Comparison")
-                                
-                                # Prepare data for chart
-                                chart_data = pd.DataFrame([
-                                    {"Supplier": q['suppliers']['name'], "Price": float(q['price'])} 
-                                    for q in quotes
-                                ])
-                                
-                                if not chart_data.empty:
-                                    st.bar_chart(chart_data, x="Supplier", y="Price", color="#4CAF50")
+                                row = p_stats.iloc[0]
+                                c1, c2, c3, c4 = st.columns(4)
+                                c1.metric("Lowest", format_money(row['min_price'], base_currency))
+                                c2.metric("Median", format_money(row['median_price'], base_currency))
+                                c3.metric("Latest", format_money(row['latest_price'], base_currency))
+                                c4.metric("Quotes", int(row['quote_count']))
 
-                                # Detailed Table
-                                st.write("#### 📋 Quote Details")
-                                t_data = []
-                                for q in quotes:
-                                    t_data.append({
-                                        "Supplier": q['suppliers']['name'],
-                                        "Price": f"{q['currency']} {float(q['price']):,.2f}",
-                                        "UOM": q['uom'] if q['uom'] else "-",
-                                        "Date": q['quote_date'],
-                                        "Link": q['source_url'] if q['source_url'] else None
+                                if not s_stats.empty:
+                                    chart_data = s_stats.rename(columns={
+                                        'supplier': "Supplier", 'min_price': f"Lowest ({base_currency})"
                                     })
-                                
-                                st.dataframe(
-                                    pd.DataFrame(t_data),
-                                    column_config={
-                                        "Link": st.column_config.LinkColumn("Source URL", display_text="Open Link")
-                                    },
-                                    use_container_width=True
-                                )
-                            else:
-                                st.info("No quotes found for this product.")
+                                    st.bar_chart(chart_data, x="Supplier", y=f"Lowest ({base_currency})", color="#4CAF50")
+
+                            # Raw quotes are only fetched on request
+                            if p_stats.empty or st.checkbox("Show individual quotes", key=f"raw_quotes_{r['id']}"):
+                                quotes = fetch_quotes(supabase, '*, suppliers(name)', lambda q: q.eq('product_id', r['id']), *quote_scope())
+
+                                if quotes:
+                                    st.write("#### 📋 Quote Details")
+                                    t_data = []
+                                    for q in quotes:
+                                        t_data.append({
+                                            "Supplier": q['suppliers']['name'],
+                                            "Price": f"{q['currency']} {float(q['price']):,.2f}",
+                                            "UOM": q['uom'] if q['uom'] else "-",
+                                            "Date": q['quote_date'],
+                                            "Link": q['source_url'] if q['source_url'] else None
+                                        })
+
+                                    st.dataframe(
+                                        pd.DataFrame(t_data),
+                                        column_config={
+                                            "Link": st.column_config.LinkColumn("Source URL", display_text="Open Link")
+                                        },
+                                        use_container_width=True
+                                    )
+                                else:
+                                    st.info("No quotes found for this product.")
                 else:
                     st.info("No matching products found. Try a different query or adjust the threshold.")
             except Exception as e:
@@ -93,10 +113,14 @@ with tab1:
     # --- MANUAL QUOTE ENTRY ---
     st.header("➕ Log a New Quote")
     
-    # Fetch lists for selects
+    # Fetch lists for selects, all at once
     with st.spinner("Loading master data..."):
-        all_suppliers = supabase.table('suppliers').select('id, name').order('name').execute().data
-        all_products = supabase.table('products').select('id, name').order('name').execute().data
+        master = fetch_all(supabase, {
+            "suppliers": lambda c: c.table(TABLE_SUPPLIERS).select('id, name').order('name'),
+            "products": lambda c: c.table(TABLE_PRODUCTS).select('id, name').order('name'),
+            "rfqs": lambda c: c.table(TABLE_RFQS).select('*').order('created_at', desc=True).limit(50),
+        })
+        all_suppliers, all_products = master["suppliers"], master["products"]
 
     st.subheader("1. Product Details")
     product_mode = st.radio("Product Source", ["Existing Product", "New Product", "From RFQ History"], horizontal=True)
@@ -114,8 +138,7 @@ with tab1:
             st.warning("No existing products found. Please switch to 'New Product'.")
             
     elif product_mode == "From RFQ History":
-        rfq_res = supabase.table('rfqs').select('*').order('created_at', desc=True).limit(50).execute()
-        rfqs = rfq_res.data
+        rfqs = master["rfqs"]
         if rfqs:
             rfq_choice = st.selectbox(
                 "Select RFQ", 
@@ -183,6 +206,16 @@ with tab1:
         currency = st.selectbox("Currency", ["IDR", "USD", "EUR", "GBP"])
     with col3:
         uom = st.text_input("Unit of Measure", value=default_uom, placeholder="e.g. Psc, Pail, Box")
+    
+    # Pack units (Box, Pail, ...) need a size to be comparable per base unit
+    pack_size = 0.0
+    pack_base = "Each"
+    if canonical_uom(uom) and canonical_uom(uom) not in STANDARD_CONVERSIONS:
+        col_pk1, col_pk2 = st.columns(2)
+        with col_pk1:
+            pack_size = st.number_input(f"Base units per {uom} (optional)", min_value=0.0, step=1.0, help="e.g. 12 if one box holds 12 pieces")
+        with col_pk2:
+            pack_base = st.text_input("Base Unit", value="Each", placeholder="e.g. Each, Kg, Liter")
         
     source_url = st.text_input("Source Link (optional)", placeholder="https://...")
     note = st.text_area("Note (e.g. specs reference, delivery time)")
@@ -194,15 +227,25 @@ with tab1:
             # 1. Handle Product Creation
             if (product_mode == "New Product" or product_mode == "From RFQ History") and not selected_product_id:
                 if new_p_name:
-                    with st.spinner("Generating product embedding..."):
-                         embedding = generate_embedding(f"{new_p_name} {new_p_desc} {new_p_specs}")
-                         p_ins = supabase.table('products').insert({
-                             "name": new_p_name, 
-                             "description": new_p_desc, 
-                             "specs": new_p_specs, 
-                             "embedding": embedding
-                         }).execute()
-                         selected_product_id = p_ins.data[0]['id']
+                    p_text = product_embedding_text(new_p_name, new_p_desc, new_p_specs)
+                    duplicate = find_product_by_hash(supabase, embedding_hash(p_text))
+                    
+                    if duplicate:
+                        # Identical name/description/specs already exist: reuse instead of inserting a copy
+                        selected_product_id = duplicate['id']
+                        st.info(f"Product already exists as '{duplicate['name']}' (#{duplicate['id']}), logging the quote against it.")
+                    else:
+                        with st.spinner("Generating product embedding..."):
+                             embedding, p_hash = get_product_embedding(supabase, p_text)
+                             p_ins = supabase.table('products').insert({
+                                 "name": new_p_name, 
+                                 "description": new_p_desc, 
+                                 "specs": new_p_specs, 
+                                 "embedding": embedding,
+                                 "embedding_hash": p_hash,
+                                 "embedding_model": EMBEDDING_MODEL
+                             }).execute()
+                             selected_product_id = p_ins.data[0]['id']
                 else:
                     st.error("Please enter a product name.")
                     st.stop()
@@ -221,6 +264,9 @@ with tab1:
             
             # 3. Handle Quote Creation
             if selected_supplier_id and selected_product_id:
+                if pack_size > 0:
+                    save_pack_size(supabase, selected_product_id, selected_supplier_id, uom, pack_base, pack_size)
+                
                 supabase.table('quotes').insert({
                     "product_id": selected_product_id, 
                     "supplier_id": selected_supplier_id, 
@@ -228,7 +274,8 @@ with tab1:
                     "currency": currency, 
                     "uom": uom,
                     "source_url": source_url,
-                    "note": note
+                    "note": note,
+                    **quote_uom_fields(price, uom, selected_product_id, selected_supplier_id, load_uom_conversions(supabase))
                 }).execute()
                 st.success("Quote logged successfully!")
                 st.balloons()
@@ -241,9 +288,11 @@ with tab1:
 with tab2:
     st.header("✏️ Edit Quote History")
     
-    # Query all quotes joined with Product and Supplier Names
+    # Query quotes in the window joined with Product and Supplier Names; archived quotes are read-only
+    since, _ = quote_scope()
+    st.caption(f"{scope_label(since)}. Archived quotes are not editable.")
     try:
-        q_res = supabase.table('quotes').select('*, products(name), suppliers(name)').order('created_at', desc=True).execute()
+        q_res = in_window(supabase.table('quotes').select('*, products(name), suppliers(name)'), since).order('created_at', desc=True).execute()
         quotes = q_res.data
         
         if quotes:
@@ -285,15 +334,19 @@ with tab2:
                 # For efficiency, we only update if user clicked save.
                 # In a real app, we might compare with original to minimize API calls.
                 updated_count = 0
+                conversions = load_uom_conversions(supabase)
+                quote_refs = {q['id']: (q['product_id'], q['supplier_id']) for q in quotes}
                 with st.spinner("Saving changes..."):
                     for index, row in edited_quotes_df.iterrows():
                         q_id = row['id']
+                        product_id, supplier_id = quote_refs[q_id]
                         supabase.table('quotes').update({
                             "price": row['Price'],
                             "currency": row['Currency'],
                             "uom": row['UOM'],
                             "source_url": row['Source URL'],
-                            "note": row['Note']
+                            "note": row['Note'],
+                            **quote_uom_fields(row['Price'], row['UOM'], product_id, supplier_id, conversions)
                         }).eq('id', q_id).execute()
                         updated_count += 1
                 
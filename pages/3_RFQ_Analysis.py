@@ -1,8 +1,14 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
 import altair as alt
-from logic.database import get_supabase
-from logic.parser import generate_embedding
+from logic.database import get_supabase, CLIENT_HASH_FUNCS
+from logic.analysis import fetch_candidate_quotes, build_bid_tab
+from logic.fx import get_base_currency, load_fx_rates, latest_rates, convert, normalize_quotes, format_money
+from logic.uom import apply_uom, load_uom_conversions
+from logic.price_stats import fetch_price_stats, stats_in_base_currency
+from logic.price_history import load_history, compute_price_flags, flag_label
+from logic.quote_archive import quote_scope, scope_label, fetch_quotes
 
 st.set_page_config(page_title="RFQ Analysis", page_icon="📈", layout="wide")
 
@@ -16,6 +22,77 @@ if not supabase:
     st.warning("⚠️ Supabase is not configured. Please go to Settings.")
     st.stop()
 
+@st.cache_data(ttl=60, show_spinner=False, hash_funcs=CLIENT_HASH_FUNCS)
+def load_candidate_quotes(client, names: tuple, since: str, include_archived: bool):
+    return fetch_candidate_quotes(client, names, since=since, include_archived=include_archived)
+
+def render_bid_tab(df_items):
+    """
+    Full-RFQ bid tabulation: all lines x all suppliers from a single data load.
+    """
+    st.caption(f"All lines against all quoting suppliers, in {base_currency} per base unit. Cheapest bid per line is highlighted.")
+    
+    with st.spinner("Loading quotes for all lines..."):
+        try:
+            products_df, quotes_df = load_candidate_quotes(supabase, tuple(df_items.get('name', pd.Series(dtype=str)).dropna().astype(str)), *scope)
+        except Exception as e:
+            st.error(f"Error loading quotes: {e}")
+            return
+    
+    quotes_df = normalize_quotes(quotes_df, base_currency, fx_rates)
+    if not quotes_df.empty and quotes_df['price'].isna().any():
+        missing = sorted(quotes_df.loc[quotes_df['price'].isna(), 'original_currency'].unique())
+        st.warning(f"No FX rate for {', '.join(missing)}; those quotes are excluded. Add rates in Settings.")
+        quotes_df = quotes_df.dropna(subset=['price'])
+    
+    tab = build_bid_tab(df_items, products_df, quotes_df, load_uom_conversions(supabase))
+    if tab["bids"].empty:
+        st.warning("No quotes found for any line in this RFQ.")
+        return
+    
+    lines = tab["lines"]
+    col_m1, col_m2, col_m3 = st.columns(3)
+    col_m1.metric("Lines with Bids", f"{(lines['bids'] > 0).sum()} / {len(lines)}")
+    col_m2.metric("Best-Bid Total", format_money(lines['best_total'].sum(), base_currency))
+    col_m3.metric("Savings vs 2nd Best", format_money(lines['savings'].sum(), base_currency))
+    
+    st.subheader("📊 Unit Price Matrix")
+    unit = tab["unit"]
+    line_names = lines.set_index('line')['name'].astype(str).str[:40]
+    unit.index = [f"{i}. {line_names[i]}" for i in unit.index]
+    st.dataframe(
+        unit.style.highlight_min(axis=1, color="#c8e6c9").format("{:,.0f}", na_rep="-"),
+        use_container_width=True
+    )
+    
+    st.subheader("🏆 Line Summary")
+    st.dataframe(
+        lines[['line', 'name', 'qty', 'bids', 'best_supplier', 'currency', 'best_price', 'best_total', 'second_price', 'savings']],
+        column_config={
+            "best_price": st.column_config.NumberColumn("Best Price", format="%.0f"),
+            "best_total": st.column_config.NumberColumn("Extended Total", format="%.0f"),
+            "second_price": st.column_config.NumberColumn("2nd Best Price", format="%.0f"),
+            "savings": st.column_config.NumberColumn("Savings vs 2nd", format="%.0f")
+        },
+        hide_index=True,
+        use_container_width=True
+    )
+    
+    st.subheader("🏭 Supplier Totals")
+    suppliers = tab["suppliers"]
+    chart = alt.Chart(suppliers).mark_bar().encode(
+        x=alt.X('supplier', sort='-y', axis=alt.Axis(labelAngle=0, title="Supplier")),
+        y=alt.Y('lines_won', title='Lines Won'),
+        tooltip=['supplier', 'lines_quoted', 'lines_won', 'won_total']
+    )
+    st.altair_chart(chart, use_container_width=True)
+    st.dataframe(suppliers, hide_index=True, use_container_width=True)
+
+base_currency = get_base_currency()
+fx_rates = latest_rates(load_fx_rates(supabase))
+scope = quote_scope()
+st.sidebar.caption(f"{scope_label(*scope)}. Change the window in Settings.")
+
 # 1. SELECT RFQ
 st.sidebar.header("1. Select RFQ")
 try:
@@ -58,124 +135,191 @@ if rfq_choice and rfq_choice.get('parsed_json') and "items" in rfq_choice['parse
     
     st.sidebar.info(f"Showing {len(df_items)} items.")
 
-    # --- Interactive Table ---
-    st.caption("👈 **Select a row** in the table below to analyze prices.")
+    analysis_mode = st.sidebar.radio("Analysis Mode", ["Single Item", "Full RFQ Bid Tab"])
+
+    if analysis_mode == "Full RFQ Bid Tab":
+        render_bid_tab(df_items)
+    else:
+        # --- Interactive Table ---
+        st.caption("👈 **Select a row** in the table below to analyze prices.")
     
-    selection = st.dataframe(
-        df_items, 
-        use_container_width=True, 
-        on_select="rerun", 
-        selection_mode="single-row"
-    )
+        selection = st.dataframe(
+            df_items, 
+            use_container_width=True, 
+            on_select="rerun", 
+            selection_mode="single-row"
+        )
     
-    selected_row_index = selection.selection["rows"]
+        selected_row_index = selection.selection["rows"]
     
-    if not selected_row_index and not df_items.empty:
-        selected_row_index = [0]
-        st.caption("ℹ️ *Auto-analyzing first item. Click another row to switch.*")
+        if not selected_row_index and not df_items.empty:
+            selected_row_index = [0]
+            st.caption("ℹ️ *Auto-analyzing first item. Click another row to switch.*")
     
-    if selected_row_index:
-        item_data = df_items.iloc[selected_row_index[0]].to_dict()
-        st.divider()
-        st.header(f"🔍 Analysis: {item_data.get('name', 'Unknown')}")
-        st.caption(f"Specs: {item_data.get('description', '')} {item_data.get('specs', '')}")
+        if selected_row_index:
+            item_data = df_items.iloc[selected_row_index[0]].to_dict()
+            st.divider()
+            st.header(f"🔍 Analysis: {item_data.get('name', 'Unknown')}")
+            st.caption(f"Specs: {item_data.get('description', '')} {item_data.get('specs', '')}")
         
-        # 3. EXACT MATCH FOR COMPATIBLE PRODUCTS
-        with st.spinner("Finding exact product matches..."):
-            target_name = item_data.get('name', '').strip()
+            # 3. EXACT MATCH FOR COMPATIBLE PRODUCTS
+            with st.spinner("Finding exact product matches..."):
+                target_name = item_data.get('name', '').strip()
             
-            try:
-                # Search for products with matching names (case-insensitive)
-                # Note: Supabase REST uses .ilike for case-insensitive
-                # However, exact match is .eq
-                p_res = supabase.table('products').select('id, name, description').ilike('name', target_name).execute()
-                matched_products = p_res.data
+                try:
+                    # Search for products with matching names (case-insensitive)
+                    # Note: Supabase REST uses .ilike for case-insensitive
+                    # However, exact match is .eq
+                    p_res = supabase.table('products').select('id, name, description').ilike('name', target_name).execute()
+                    matched_products = p_res.data
                 
-                if matched_products:
-                    p_ids = [p['id'] for p in matched_products]
+                    if matched_products:
+                        p_ids = [p['id'] for p in matched_products]
                     
-                    # Fetch quotes for these products with joined supplier and product info
-                    q_res = supabase.table('quotes').select('*, products(name, description), suppliers(name)').in_('product_id', p_ids).execute()
-                    quotes = q_res.data
+                        # Fetch quotes for these products with joined supplier and product info
+                        quotes = fetch_quotes(supabase, '*, products(name, description), suppliers(name)', lambda q: q.in_('product_id', p_ids), *scope)
                     
-                    if quotes:
-                        comp_data = {}
-                        list_data = []
-                        rfq_qty = float(item_data.get('quantity', 1) or 1)
+                        if quotes:
+                            comp_data = {}
+                            list_data = []
+                            rfq_qty = float(item_data.get('quantity', 1) or 1)
                         
-                        # Sort quotes by price ascending
-                        sorted_quotes = sorted(quotes, key=lambda x: float(x['price']))
+                            # Convert every quote into the base currency and per base unit in one pass, then rank
+                            q_df = apply_uom(pd.DataFrame({
+                                "price": convert([q['price'] for q in quotes], [q['currency'] for q in quotes], base_currency, fx_rates),
+                                "qty": rfq_qty,
+                                "uom": [q['uom'] for q in quotes],
+                                "line_uom": item_data.get('uom'),
+                                "product_id": [q['product_id'] for q in quotes],
+                                "supplier_id": [q['supplier_id'] for q in quotes],
+                                "uom_factor": [q.get('uom_factor') for q in quotes],
+                                "base_uom": [q.get('base_uom') for q in quotes]
+                            }), load_uom_conversions(supabase))
+                            ranked = sorted(zip(quotes, q_df['price'], q_df['qty'], q_df['base_uom']), key=lambda x: (np.isnan(x[1]), x[1]))
+                            if q_df['uom_mismatch'].any():
+                                st.warning("Some quotes use a unit that cannot be converted to the RFQ unit; add a pack size when logging them. They are listed last.")
+                            elif q_df['price'].isna().any():
+                                unconvertible = sorted({q['currency'] for q, p, _, _ in ranked if np.isnan(p)})
+                                st.warning(f"No FX rate for {', '.join(unconvertible)}; those quotes are listed last. Add rates in Settings.")
                         
-                        for q in sorted_quotes:
-                            price = float(q['price'])
-                            total = price * rfq_qty
-                            s_name = q['suppliers']['name']
-                            p_name = q['products']['name']
+                            # Outlier flags against each product's quote history in scope
+                            history = compute_price_flags(load_history(supabase, p_ids, *scope), base_currency, fx_rates)
+                            price_flags = {int(h['id']): flag_label(h) for h in history[history['is_outlier']].to_dict('records')}
+
+                            for q, price, base_qty, base_uom in ranked:
+                                total = price * base_qty
+                                quoted = float(q['price'])
+                                s_name = q['suppliers']['name']
+                                p_name = q['products']['name']
                             
-                            comp_data[s_name] = {
-                                "Product Match": p_name,
-                                "Unit Price": f"{q['currency']} {price:,.0f}",
-                                "Total Cost": f"{q['currency']} {total:,.0f}",
-                                "Calculation": f"({q['currency']} {price:,.0f} x {rfq_qty:,.0f})",
-                                "Description": (q['products']['description'] or "")[:50] + "...",
-                                "Date": q['quote_date']
-                            }
+                                comp_data[s_name] = {
+                                    "Product Match": p_name,
+                                    "Unit Price": f"{format_money(price, base_currency)} / {base_uom or 'unit'}",
+                                    "Quoted Price": f"{q['currency']} {quoted:,.0f} / {q['uom'] or 'unit'}",
+                                    "Total Cost": format_money(total, base_currency),
+                                    "Calculation": f"({format_money(price, base_currency)} x {base_qty:,.0f} {base_uom or ''})",
+                                    "Description": (q['products']['description'] or "")[:50] + "...",
+                                    "Date": q['quote_date'],
+                                    "Price Check": price_flags.get(q['id']) or "✅ Normal"
+                                }
                             
-                            list_data.append({
-                                "Supplier": s_name,
-                                "Product": p_name,
-                                "Price": price,
-                                "Total Est. Cost": total,
-                                "Calculation": f"{q['currency']} {price:,.0f} x {rfq_qty:,.0f}",
-                                "Currency": q['currency'],
-                                "UOM": q['uom'],
-                                "Link": q['source_url'],
-                                "Date": q['quote_date']
-                            })
+                                list_data.append({
+                                    "Supplier": s_name,
+                                    "Product": p_name,
+                                    "Price": price,
+                                    "Total Est. Cost": total,
+                                    "Calculation": f"{format_money(price, base_currency)} x {base_qty:,.0f} {base_uom or ''}",
+                                    "Currency": base_currency,
+                                    "Quoted Price": f"{q['currency']} {quoted:,.0f} / {q['uom'] or 'unit'}",
+                                    "UOM": q['uom'],
+                                    "Link": q['source_url'],
+                                    "Date": q['quote_date'],
+                                    "Price Check": price_flags.get(q['id'], "")
+                                })
                         
-                        # 4. VISUALIZATION
-                        st.subheader("💰 Supplier Price Comparison")
-                        chart_df = pd.DataFrame(list_data)
-                        chart = alt.Chart(chart_df).mark_bar().encode(
-                            x=alt.X('Supplier', sort=None, axis=alt.Axis(labelAngle=0, title="Supplier")),
-                            y=alt.Y('Price', title='Unit Price'),
-                            color=alt.Color('Supplier', legend=None),
-                            tooltip=['Supplier', 'Price', 'Total Est. Cost', 'Product']
-                        ).interactive()
-                        st.altair_chart(chart, use_container_width=True)
+                            # 4. VISUALIZATION
+                            st.subheader("💰 Supplier Price Comparison")
+                            chart_df = pd.DataFrame(list_data)
+                            chart = alt.Chart(chart_df).mark_bar().encode(
+                                x=alt.X('Supplier', sort=None, axis=alt.Axis(labelAngle=0, title="Supplier")),
+                                y=alt.Y('Price', title=f'Unit Price ({base_currency})'),
+                                color=alt.Color('Supplier', legend=None),
+                                tooltip=['Supplier', 'Price', 'Total Est. Cost', 'Product']
+                            ).interactive()
+                            st.altair_chart(chart, use_container_width=True)
                         
-                        # 5. INSIGHTS
-                        st.info(f"💡 **Insight Report for {item_data.get('name')} (Qty: {rfq_qty:,.0f})**")
-                        best = list_data[0]
-                        st.markdown(f"""
-                        **Best Offer:** {best['Supplier']} - {best['Currency']} {best['Price']:,.0f} / unit
-                        **Total Estimasi Modal (Kasar):** {best['Calculation']} = **{best['Currency']} {best['Total Est. Cost']:,.0f}**
-                        """)
-                        
-                        # 6. COMPARISON MATRIX
-                        st.subheader("📊 Side-by-Side Comparison")
-                        df_pivot = pd.DataFrame(comp_data)
-                        row_order = ["Unit Price", "Total Cost", "Product Match", "Description", "Date"]
-                        df_pivot = df_pivot.reindex(row_order)
-                        st.table(df_pivot)
-    
-                        # 7. DETAILED SOURCE LINKS
-                        st.subheader("🔗 Source Links & Details")
-                        st.dataframe(
-                            pd.DataFrame(list_data)[["Supplier", "Price", "Total Est. Cost", "Link", "UOM"]],
-                            column_config={
-                                "Link": st.column_config.LinkColumn("Source URL", display_text="Open Link"),
-                                "Price": st.column_config.NumberColumn(format="%.0f"),
-                                "Total Est. Cost": st.column_config.NumberColumn(format="%.0f")
-                            },
-                            use_container_width=True
-                        )
+                            # 5. INSIGHTS
+                            st.info(f"💡 **Insight Report for {item_data.get('name')} (Qty: {rfq_qty:,.0f})**")
+                            best = list_data[0]
+                            st.markdown(f"""
+                            **Best Offer:** {best['Supplier']} - {best['Currency']} {best['Price']:,.0f} / base unit
+                            **Total Estimasi Modal (Kasar):** {best['Calculation']} = **{best['Currency']} {best['Total Est. Cost']:,.0f}**
+                            """)
+
+                            # Historical context from the pre-aggregated stats table
+                            try:
+                                hist = stats_in_base_currency(
+                                    fetch_price_stats(supabase, p_ids, by_supplier=True), base_currency, fx_rates
+                                )
+                            except Exception:
+                                hist = pd.DataFrame()
+                            if not hist.empty:
+                                st.subheader("📉 Historical Prices by Supplier")
+                                st.dataframe(
+                                    hist[['supplier', 'quote_count', 'min_price', 'median_price', 'latest_price', 'latest_date']],
+                                    column_config={
+                                        "supplier": "Supplier",
+                                        "quote_count": "Quotes",
+                                        "min_price": st.column_config.NumberColumn(f"Lowest ({base_currency})", format="%.0f"),
+                                        "median_price": st.column_config.NumberColumn(f"Median ({base_currency})", format="%.0f"),
+                                        "latest_price": st.column_config.NumberColumn(f"Latest ({base_currency})", format="%.0f"),
+                                        "latest_date": "Last Quoted"
+                                    },
+                                    hide_index=True,
+                                    use_container_width=True
+                                )
+
+                            if len(history) > 1:
+                                st.subheader("📈 Price History")
+                                history['supplier'] = history['supplier'].fillna("Unknown")
+                                history['Flag'] = np.where(history['is_outlier'], "Outlier", "Normal")
+                                base = alt.Chart(history.dropna(subset=['cmp_price'])).encode(
+                                    x=alt.X('quote_date:T', title="Quote Date"),
+                                    y=alt.Y('cmp_price:Q', title=f'Unit Price ({base_currency})'),
+                                    color=alt.Color('supplier:N', title="Supplier")
+                                )
+                                points = base.mark_point(filled=True, size=70).encode(
+                                    shape=alt.Shape('Flag:N', scale=alt.Scale(domain=["Normal", "Outlier"], range=["circle", "triangle"])),
+                                    tooltip=['supplier', 'quote_date:T', 'cmp_price', 'rolling_median', 'z_score', 'Flag']
+                                )
+                                trend = base.mark_line(strokeDash=[4, 3]).encode(y='rolling_median:Q')
+                                st.altair_chart((points + trend).interactive(), use_container_width=True)
+                                st.caption("Dashed lines: each supplier's rolling median over its last 5 quotes. Triangles: outliers by z-score or IQR.")
+
+                            # 6. COMPARISON MATRIX
+                            st.subheader("📊 Side-by-Side Comparison")
+                            df_pivot = pd.DataFrame(comp_data)
+                            row_order = ["Unit Price", "Quoted Price", "Price Check", "Total Cost", "Product Match", "Description", "Date"]
+                            df_pivot = df_pivot.reindex(row_order)
+                            st.table(df_pivot)
+    
+                            # 7. DETAILED SOURCE LINKS
+                            st.subheader("🔗 Source Links & Details")
+                            st.dataframe(
+                                pd.DataFrame(list_data)[["Supplier", "Price", "Total Est. Cost", "Quoted Price", "Price Check", "Link", "UOM"]],
+                                column_config={
+                                    "Link": st.column_config.LinkColumn("Source URL", display_text="Open Link"),
+                                    "Price": st.column_config.NumberColumn(format="%.0f"),
+                                    "Total Est. Cost": st.column_config.NumberColumn(format="%.0f")
+                                },
+                                use_container_width=True
+                            )
+                        else:
+                            st.warning("No quotes found for matching products.")
                     else:
-                        st.warning("No quotes found for matching products.")
-                else:
-                    st.warning("No similar products found in catalog.")
-            except Exception as e:
-                st.error(f"Error during analysis: {e}")
+                        st.warning("No similar products found in catalog.")
+                except Exception as e:
+                    st.error(f"Error during analysis: {e}")
 
 else:
     st.info("This RFQ has no parsed items.")
@@ -1,11 +1,23 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
-from logic.database import get_supabase
+from logic.database import get_supabase, CLIENT_HASH_FUNCS
+from logic.analysis import fetch_candidate_quotes
+from logic.award import candidate_bids, solve_award
+from logic.finalize import RECAP_COLUMNS, unit_of, line_candidates, line_result
+from logic.fx import get_base_currency, load_fx_rates, latest_rates, format_money
+from logic.uom import canonical_uom, load_uom_conversions
+from logic.scorecard import load_awards, save_awards
+from logic.rfqs import rfq_version
+from logic.quote_archive import quote_scope, scope_label
 
 st.set_page_config(page_title="Finalization", page_icon="🏁", layout="wide")
 
 st.title("🏁 Finalization & Proposal Generator")
 st.write("Select winning bids to generate a final proposal/PO.")
+# Awards reference `quotes`, so archived quotes are never award candidates
+since, _ = quote_scope()
+st.caption(f"{scope_label(since)}, plus any quote already awarded. Archived quotes only show in analysis. Change the window in Settings.")
 
 # Initialize client
 supabase = get_supabase()
@@ -14,6 +26,158 @@ if not supabase:
     st.warning("⚠️ Supabase is not configured. Please go to Settings.")
     st.stop()
 
+@st.cache_data(ttl=60, show_spinner=False, hash_funcs=CLIENT_HASH_FUNCS)
+def load_candidate_quotes(client, names: tuple, since: str, include_archived: bool, keep_ids: tuple):
+    return fetch_candidate_quotes(client, names, since=since, include_archived=include_archived, keep_ids=keep_ids)
+
+def quote_label(q, line_uom):
+    label = f"{q['supplier']} - {q['original_currency']} {float(q['original_price']):,.0f} / {unit_of(q) or 'unit'}"
+    if q['original_currency'] != base_currency or canonical_uom(unit_of(q)) != canonical_uom(line_uom):
+        label += f" (≈ {format_money(q['rfq_unit_price'], base_currency)} / {line_uom or 'unit'})"
+    return label
+
+def persist_line(rfq_id, line, item, quote_map, ranks):
+    """
+    Selectbox callback: saves just this line's award.
+    """
+    selected = st.session_state[f"q_sel_{line - 1}"]
+    award, _ = line_result(item, quote_map.get(selected), base_currency)
+    saved = st.session_state['final_saved']
+    try:
+        save_awards(supabase, rfq_id, {line: award}, {line: ranks}, previous={line: saved[line]} if line in saved else {})
+        if award:
+            saved[line] = award
+        else:
+            saved.pop(line, None)
+        st.session_state[f"q_saved_{line}"] = None
+    except Exception as e:
+        # Shown by the line's fragment; callbacks should not draw elements themselves
+        st.session_state[f"q_saved_{line}"] = f"Could not save this line: {e}"
+
+def render_summary(placeholder, items):
+    """
+    Recap table and grand total from the per-line results in session state.
+    """
+    results = st.session_state['final_lines']
+    df_final = pd.DataFrame([results[i + 1] for i in range(len(items)) if i + 1 in results], columns=RECAP_COLUMNS + ["_raw_total"])
+    with placeholder.container():
+        st.subheader("📑 Final Recapitulation")
+        st.dataframe(df_final[RECAP_COLUMNS], use_container_width=True, hide_index=True)
+        awarded = (df_final['Winner'] != "PENDING") & (df_final['Winner'] != "NO QUOTES")
+        st.markdown(f"### 💰 Grand Total Projection: {format_money(df_final['_raw_total'].sum(), base_currency)}")
+        st.caption(f"{int(awarded.sum())} of {len(items)} lines awarded. Selections are saved as you make them.")
+    return df_final[RECAP_COLUMNS]
+
+@st.fragment
+def render_line(rfq_id, idx, item, options, ranks, summary, items):
+    """
+    One line's winner selector. Changing it reruns only this fragment and the summary.
+    """
+    line = idx + 1
+    col1, col2 = st.columns([1, 2])
+    qty = float(item.get('quantity', 1) or 1)
+    desc = f"{item.get('description', '')}"
+    name = item.get('name', 'Unknown')
+
+    with col1:
+        st.markdown(f"**Item {line}: {name}**")
+        st.caption(f"Qty: {qty} | {desc[:100]}...")
+
+    with col2:
+        if not options:
+            st.warning(f"No matching quotes found for '{name}'.")
+            _, recap = line_result(item, None, base_currency)
+            recap["Winner"] = "NO QUOTES"
+            st.session_state['final_lines'][line] = recap
+        else:
+            quote_map = {str(int(q['quote_id'])): q for q in options}
+            option_ids = ["None"] + list(quote_map.keys())
+            if st.session_state.get(f"q_sel_{idx}") not in option_ids:
+                st.session_state[f"q_sel_{idx}"] = "None"  # Saved quote no longer exists
+
+            selected_id = st.selectbox(
+                f"Choose Supplier for #{line}", options=option_ids,
+                format_func=lambda opt: "Select a Quote..." if opt == "None" else quote_label(quote_map[opt], item.get('uom')),
+                key=f"q_sel_{idx}", on_change=persist_line, args=(rfq_id, line, item, quote_map, ranks)
+            )
+            if st.session_state.get(f"q_saved_{line}"):
+                st.error(st.session_state[f"q_saved_{line}"])
+            selected = quote_map.get(selected_id)
+            if selected is not None and np.isnan(selected['line_total']):
+                st.warning(f"Cannot convert this quote ({selected['original_currency']}, {unit_of(selected) or 'no unit'}) to {base_currency} per {item.get('uom') or 'unit'}; line excluded from the grand total.")
+            _, recap = line_result(item, selected, base_currency)
+            st.session_state['final_lines'][line] = recap
+
+    if st.session_state.get('final_rendered'):
+        # Fragment rerun: the rest of the page is not redrawn, so refresh the totals here
+        render_summary(summary, items)
+
+@st.fragment
+def render_export(rfq_choice, items):
+    """
+    CSV export and email drafting, built from the current selections when used.
+    """
+    st.subheader("📤 Export & Communicate")
+    col_exp1, col_exp2 = st.columns(2)
+
+    results = st.session_state['final_lines']
+    df_final = pd.DataFrame([results[i + 1] for i in range(len(items)) if i + 1 in results], columns=RECAP_COLUMNS)
+
+    with col_exp1:
+        if st.button("📄 Prepare CSV"):
+            st.download_button(
+                label="💾 Download as CSV",
+                data=df_final.to_csv(index=False).encode('utf-8'),
+                file_name=f"Final_Quote_{rfq_choice['id']}.csv",
+                mime='text/csv',
+                on_click="ignore"
+            )
+
+    with col_exp2:
+        st.write("✉️ **Email Generator**")
+        pre_instruction = st.text_area("Initial Context (Optional)", placeholder="e.g. Offer 5% discount if paid in 7 days", height=100)
+
+        if st.button("✨ Draft Email Response", type="primary"):
+            from logic.parser import generate_email_response
+            from logic.prompts import PromptTooLarge
+
+            with st.spinner("Drafting email..."):
+                table_md = df_final.to_markdown(index=False)
+                original_text = rfq_choice['raw_text']
+                try:
+                    email_draft = generate_email_response(original_text, table_md, pre_instruction)
+                    st.session_state['email_draft'] = email_draft
+                except PromptTooLarge as e:
+                    st.error(f"{e}. Shorten the quote or raise EMAIL_TOKEN_BUDGET.")
+
+    if 'email_draft' in st.session_state:
+        st.success("Draft generated!")
+        st.caption("📧 Copy & Paste this into your email client:")
+        st.code(st.session_state['email_draft'], language=None)
+
+        st.divider()
+        st.write("✍️ **Start AI Refinement**")
+        feedback = st.text_input("Enter instructions to refine the email")
+
+        if st.button("🔄 Refine Draft"):
+            if feedback:
+                from logic.parser import refine_email_response
+                from logic.prompts import PromptTooLarge
+                with st.spinner("Refining email..."):
+                    try:
+                        new_draft = refine_email_response(st.session_state['email_draft'], feedback)
+                    except PromptTooLarge as e:
+                        st.error(f"{e}. Shorten the draft or raise REFINE_TOKEN_BUDGET.")
+                    else:
+                        st.session_state['email_draft'] = new_draft
+                        st.rerun(scope="fragment")
+            else:
+                st.warning("Please enter mapping feedback.")
+
+base_currency = get_base_currency()
+fx_rates = latest_rates(load_fx_rates(supabase))
+conversions = load_uom_conversions(supabase)
+
 # 1. SELECT RFQ
 try:
     rfq_res = supabase.table('rfqs').select('*').order('created_at', desc=True).execute()
@@ -35,176 +199,93 @@ rfq_choice = st.selectbox(
 if rfq_choice and rfq_choice.get('parsed_json') and "items" in rfq_choice['parsed_json']:
     items = rfq_choice['parsed_json']["items"]
     
-    st.divider()
-    st.subheader("🏆 Select Winning Bids")
+    # Restore saved winners when an RFQ is opened, or after an edit renumbered its lines
+    if st.session_state.get('final_rfq_id') != (rfq_choice['id'], rfq_version(rfq_choice)):
+        try:
+            saved_awards = load_awards(supabase, rfq_choice['id'])
+        except Exception:
+            saved_awards = {}  # Awards table not created yet
+        st.session_state['final_rfq_id'] = (rfq_choice['id'], rfq_version(rfq_choice))
+        st.session_state['final_saved'] = saved_awards
+        st.session_state['final_lines'] = {}
+        for idx in range(len(items)):
+            saved = saved_awards.get(idx + 1)
+            st.session_state[f"q_sel_{idx}"] = str(saved['quote_id']) if saved and saved.get('quote_id') else "None"
+    st.session_state['final_rendered'] = False
     
-    final_table_data = []
-    grand_total = 0.0
+    # All lines' candidate quotes in one cached load, in the base currency and per base unit
+    try:
+        awarded = tuple(sorted(a['quote_id'] for a in st.session_state['final_saved'].values() if a.get('quote_id')))
+        products_df, quotes_df = load_candidate_quotes(supabase, tuple(str(i.get('name') or '') for i in items), since, False, awarded)
+    except Exception as e:
+        st.error(f"Error loading quotes: {e}")
+        products_df, quotes_df = pd.DataFrame(), pd.DataFrame()
+    # Every bidding supplier's rank per line is kept for the scorecard
+    line_quotes, line_options, line_ranks = line_candidates(items, products_df, quotes_df, conversions, base_currency, fx_rates)
     
-    # Iterate through items and let user pick a quote
-    for idx, item in enumerate(items):
-        with st.container():
-            col1, col2 = st.columns([1, 2])
+    # --- AUTO-AWARD ---
+    with st.expander("⚡ Auto-Award (minimize grand total)"):
+        st.caption("Pre-fills the winner selections below. You can still override any line manually.")
+        comparable = line_quotes.dropna(subset=['price']) if not line_quotes.empty else line_quotes
+        all_suppliers = sorted(comparable['supplier'].dropna().unique()) if not comparable.empty else []
+        
+        col_aw1, col_aw2, col_aw3 = st.columns(3)
+        with col_aw1:
+            max_suppliers = st.number_input("Max Suppliers (0 = no limit)", min_value=0, value=0, step=1)
+        with col_aw2:
+            min_order_value = st.number_input(f"Min Order Value per Supplier ({base_currency})", min_value=0.0, value=0.0, step=1000.0)
+        with col_aw3:
+            time_limit = st.number_input("Solver Time Limit (s)", min_value=1.0, max_value=60.0, value=5.0, step=1.0)
+        excluded = st.multiselect("Exclude Suppliers", options=all_suppliers)
+        prefer_latest = st.checkbox("Prefer latest quote per supplier", value=False)
+        
+        if st.button("⚡ Run Auto-Award", type="primary"):
+            bids = candidate_bids(comparable, prefer_latest=prefer_latest)
             
-            # Item Details
-            qty = float(item.get('quantity', 1) or 1)
-            desc = f"{item.get('description', '')}"
-            name = item.get('name', 'Unknown')
+            with st.spinner("Solving award..."):
+                award = solve_award(
+                    bids, max_suppliers=max_suppliers or None, min_order_value=min_order_value,
+                    excluded=excluded, time_limit=time_limit
+                )
             
-            with col1:
-                st.markdown(f"**Item {idx+1}: {name}**")
-                st.caption(f"Qty: {qty} | {desc[:100]}...")
+            # Widget state must be set before the selectboxes are created further down
+            for idx in range(len(items)):
+                st.session_state[f"q_sel_{idx}"] = "None"
+            for row in award["awards"].itertuples():
+                st.session_state[f"q_sel_{row.line - 1}"] = str(int(row.quote_id))
             
-            with col2:
-                # Find quotes (Exact Match)
-                target_name = item.get('name', '').strip()
-                try:
-                    # Search for products with matching names
-                    p_res = supabase.table('products').select('id').ilike('name', target_name).execute()
-                    p_ids = [p['id'] for p in p_res.data]
-                    
-                    quotes = []
-                    if p_ids:
-                        q_res = supabase.table('quotes').select('*, suppliers(name)').in_('product_id', p_ids).order('price', desc=False).execute()
-                        quotes = q_res.data
-                    
-                    # Selection Dropdown
-                    if quotes:
-                        # Create a mapping for lookup
-                        quote_map = {f"{q['id']}": q for q in quotes}
-                        
-                        option_ids = ["None"] + list(quote_map.keys())
-                        
-                        def format_func(opt_id):
-                            if opt_id == "None":
-                                return "Select a Quote..."
-                            q = quote_map[opt_id]
-                            return f"{q['suppliers']['name']} - {q['currency']} {float(q['price']):,.0f}"
-
-                        selected_id = st.selectbox(f"Choose Supplier for #{idx+1}", options=option_ids, format_func=format_func, key=f"q_sel_{idx}")
-                        
-                        if selected_id != "None":
-                            selected_quote = quote_map[selected_id]
-                            s_name = selected_quote['suppliers']['name']
-                            price = float(selected_quote['price'])
-                            
-                            line_total = price * qty
-                            grand_total += line_total
-                            
-                            final_table_data.append({
-                                "Item Code": item.get('item_code', '-'),
-                                "Description": desc,
-                                "Qty": qty,
-                                "UOM": item.get('uom', '-'),
-                                "Name": name,
-                                "Brand": item.get('brand', '-'),
-                                "Specs": item.get('specs', '-'),
-                                "Winner": s_name,
-                                "Single Price": f"{selected_quote['currency']} {price:,.0f}",
-                                "Total Price": f"{selected_quote['currency']} {line_total:,.0f}",
-                                "_raw_total": line_total
-                            })
-                        else:
-                             final_table_data.append({
-                                "Item Code": item.get('item_code', '-'),
-                                "Description": desc,
-                                "Qty": qty,
-                                "UOM": item.get('uom', '-'),
-                                "Name": name,
-                                "Brand": item.get('brand', '-'),
-                                "Specs": item.get('specs', '-'),
-                                "Winner": "PENDING",
-                                "Single Price": "-",
-                                "Total Price": "-"
-                            })
-                    else:
-                        st.warning(f"No matching quotes found for '{name}'.")
-                        final_table_data.append({
-                                "Item Code": item.get('item_code', '-'),
-                                "Description": desc,
-                                "Qty": qty,
-                                "UOM": item.get('uom', '-'),
-                                "Name": name,
-                                "Brand": item.get('brand', '-'),
-                                "Specs": item.get('specs', '-'),
-                                "Winner": "NO QUOTES",
-                                "Single Price": "-",
-                                "Total Price": "-"
-                            })
-                except Exception as e:
-                    st.error(f"Error fetching quotes: {e}")
-
-    st.divider()
-    
-    # Final Table
-    st.subheader("📑 Final Recapitulation")
-    df_final = pd.DataFrame(final_table_data)
-    
-    # Enforce Column Order
-    column_order = [
-         "Item Code", "Name", "Qty", "UOM", "Specs", 
-         "Brand", "Description", "Winner", "Single Price", "Total Price"
-    ]
-    
-    for col in column_order:
-        if col not in df_final.columns:
-            df_final[col] = "-"
+            # Save the whole award in one batch
+            new_awards = {}
+            for idx, item in enumerate(items):
+                options = {str(int(q['quote_id'])): q for q in line_options.get(idx + 1, [])}
+                new_awards[idx + 1], _ = line_result(item, options.get(st.session_state[f"q_sel_{idx}"]), base_currency)
+            try:
+                save_awards(supabase, rfq_choice['id'], new_awards, line_ranks, previous=st.session_state['final_saved'])
+                st.session_state['final_saved'] = {line: a for line, a in new_awards.items() if a}
+            except Exception as e:
+                st.error(f"Error saving awards: {e}")
             
-    df_final = df_final[column_order]
-
-    st.dataframe(
-        df_final, 
-        use_container_width=True,
-        hide_index=True
-    )
+            status = "optimal" if award["status"] == "optimal" else "best found within time limit"
+            st.success(f"Awarded {len(award['awards'])} lines to {len(award['suppliers'])} suppliers ({status}): {', '.join(award['suppliers'])}")
+            if award["unawarded"]:
+                st.warning(f"Lines without an eligible quote: {', '.join(str(l) for l in award['unawarded'])}")
     
-    st.markdown(f"### 💰 Grand Total Projection: {grand_total:,.0f}")
+    st.divider()
+    st.subheader("🏆 Select Winning Bids")
     
+    lines_area = st.container()
     st.divider()
-    st.subheader("📤 Export & Communicate")
+    summary = st.empty()
     
-    col_exp1, col_exp2 = st.columns(2)
+    with lines_area:
+        for idx, item in enumerate(items):
+            render_line(rfq_choice['id'], idx, item, line_options.get(idx + 1, []), line_ranks.get(idx + 1, {}), summary, items)
     
-    with col_exp1:
-        csv = df_final.to_csv(index=False).encode('utf-8')
-        st.download_button(
-            label="💾 Download as CSV",
-            data=csv,
-            file_name=f"Final_Quote_{rfq_choice['id']}.csv",
-            mime='text/csv',
-        )
-        
-    with col_exp2:
-        st.write("✉️ **Email Generator**")
-        pre_instruction = st.text_area("Initial Context (Optional)", placeholder="e.g. Offer 5% discount if paid in 7 days", height=100)
-        
-        if st.button("✨ Draft Email Response", type="primary"):
-            from logic.parser import generate_email_response
-            
-            with st.spinner("Drafting email..."):
-                table_md = df_final.drop(columns=["_raw_total"] if "_raw_total" in df_final.columns else []).to_markdown(index=False)
-                original_text = rfq_choice['raw_text']
-                email_draft = generate_email_response(original_text, table_md, pre_instruction)
-                st.session_state['email_draft'] = email_draft
-
-    if 'email_draft' in st.session_state:
-        st.success("Draft generated!")
-        st.caption("📧 Copy & Paste this into your email client:")
-        st.code(st.session_state['email_draft'], language=None)
-        
-        st.divider()
-        st.write("✍️ **Start AI Refinement**")
-        feedback = st.text_input("Enter instructions to refine the email")
-        
-        if st.button("🔄 Refine Draft"):
-            if feedback:
-                from logic.parser import refine_email_response
-                with st.spinner("Refining email..."):
-                    new_draft = refine_email_response(st.session_state['email_draft'], feedback)
-                    st.session_state['email_draft'] = new_draft
-                    st.rerun()
-            else:
-                st.warning("Please enter mapping feedback.")
+    render_summary(summary, items)
+    st.session_state['final_rendered'] = True
+    
+    st.divider()
+    render_export(rfq_choice, items)
 
 else:
     st.info("No items in this RFQ.")
@@ -0,0 +1,88 @@
+import streamlit as st
+import pandas as pd
+from logic.database import get_supabase
+from logic.embedding_store import get_embedding_store, client_store_path
+from logic.dedupe import load_products_for_dedupe, find_duplicate_groups, merge_products
+
+st.set_page_config(page_title="Deduplicate Products", page_icon="🧹", layout="wide")
+
+st.title("🧹 Deduplicate Products")
+st.write("Find near-duplicate products created from different RFQs and merge their quote history.")
+
+# Initialize client
+supabase = get_supabase()
+
+if not supabase:
+    st.warning("⚠️ Supabase is not configured. Please go to Settings.")
+    st.stop()
+
+# --- SCAN ---
+col_t1, col_t2 = st.columns(2)
+with col_t1:
+    cosine_threshold = st.slider("Embedding similarity to merge", 0.80, 0.99, 0.93, 0.01)
+with col_t2:
+    code_jaccard = st.slider("Name overlap when part codes match", 0.1, 0.9, 0.3, 0.05)
+
+if st.button("🔍 Scan Catalog", type="primary"):
+    with st.spinner("Loading products and embeddings..."):
+        products, vectors = load_products_for_dedupe(supabase, store=get_embedding_store(client_store_path(supabase)))
+    with st.spinner(f"Comparing {len(products):,} products..."):
+        st.session_state['dedupe_groups'] = find_duplicate_groups(
+            products, vectors, cosine_threshold=cosine_threshold, code_jaccard_threshold=code_jaccard
+        )
+        st.session_state['dedupe_scan'] = st.session_state.get('dedupe_scan', 0) + 1
+
+# --- REVIEW & MERGE ---
+if 'dedupe_groups' in st.session_state:
+    groups = st.session_state['dedupe_groups']
+    st.divider()
+
+    if not groups:
+        st.success("No duplicate groups found.")
+    else:
+        st.subheader(f"📋 {len(groups)} Proposed Merge Groups")
+        st.caption("Untick products that are not the same item, pick the one to keep, then merge.")
+
+        for g_idx, group in enumerate(groups):
+            # Widgets are keyed by the group (its smallest product id), not its position,
+            # so merging one group never hands its ticks and choice to the next
+            group_key = f"{st.session_state.get('dedupe_scan', 0)}_{min(p['id'] for p in group)}"
+            with st.expander(f"Group {g_idx + 1}: {group[0]['name']} (+{len(group) - 1})"):
+                df_group = pd.DataFrame([
+                    {"Merge": True, "id": p['id'], "Name": p['name'], "Description": p.get('description') or "-", "Score": p['score']}
+                    for p in group
+                ])
+                edited_group = st.data_editor(
+                    df_group,
+                    column_config={
+                        "Merge": st.column_config.CheckboxColumn("Merge"),
+                        "id": st.column_config.NumberColumn("ID", disabled=True),
+                        "Name": st.column_config.TextColumn("Name", disabled=True),
+                        "Description": st.column_config.TextColumn("Description", disabled=True),
+                        "Score": st.column_config.ProgressColumn("Score", min_value=0.0, max_value=1.0, format="%.2f")
+                    },
+                    hide_index=True,
+                    use_container_width=True,
+                    key=f"dedupe_group_{group_key}"
+                )
+
+                selected = edited_group[edited_group["Merge"]]
+                if len(selected) < 2:
+                    st.info("Select at least two products to merge.")
+                    continue
+
+                keep_id = st.selectbox(
+                    "Keep",
+                    options=selected["id"].tolist(),
+                    format_func=lambda x, selected=selected: f"#{x} - {selected.loc[selected['id'] == x, 'Name'].iloc[0]}",
+                    key=f"dedupe_keep_{group_key}"
+                )
+
+                if st.button("🔗 Merge Group", key=f"dedupe_merge_{group_key}"):
+                    try:
+                        merged = merge_products(supabase, keep_id, selected["id"].tolist())
+                        st.session_state['dedupe_groups'].pop(g_idx)
+                        st.success(f"Merged {merged} products into #{keep_id}.")
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"Error merging products: {e}")
@@ -0,0 +1,67 @@
+import streamlit as st
+import altair as alt
+from logic.database import get_supabase
+from logic.scorecard import fetch_scorecard, refresh_scorecard
+
+st.set_page_config(page_title="Supplier Scorecard", page_icon="🏅", layout="wide")
+
+st.title("🏅 Supplier Scorecard")
+st.write("Quote activity, win rate and price competitiveness per supplier, from saved Finalization awards.")
+
+# Initialize client
+supabase = get_supabase()
+
+if not supabase:
+    st.warning("⚠️ Supabase is not configured. Please go to Settings.")
+    st.stop()
+
+try:
+    card = fetch_scorecard(supabase)
+except Exception as e:
+    st.error(f"Error loading scorecard: {e}")
+    st.info("💡 Tip: Make sure the `supplier_scorecard` table and triggers from `schema.sql` are created.")
+    st.stop()
+
+if card.empty:
+    st.info("No scorecard data yet. Log quotes and save awards in Finalization, or rebuild below.")
+else:
+    col_m1, col_m2, col_m3 = st.columns(3)
+    col_m1.metric("Suppliers", len(card))
+    col_m2.metric("Quotes", f"{int(card['quote_count'].sum()):,}")
+    col_m3.metric("Awarded Lines", f"{int(card['lines_won'].sum()):,}")
+
+    st.subheader("🏆 Win Rate")
+    ranked = card.dropna(subset=['win_rate'])
+    if not ranked.empty:
+        chart = alt.Chart(ranked).mark_bar().encode(
+            x=alt.X('supplier', sort='-y', axis=alt.Axis(labelAngle=0, title="Supplier")),
+            y=alt.Y('win_rate', title='Win Rate', axis=alt.Axis(format='%')),
+            tooltip=['supplier', 'lines_bid', 'lines_won', alt.Tooltip('win_rate', format='.0%'), alt.Tooltip('avg_rank', format='.2f')]
+        )
+        st.altair_chart(chart, use_container_width=True)
+    else:
+        st.caption("No saved awards yet.")
+
+    st.subheader("📋 Details")
+    st.dataframe(
+        card[['supplier', 'quote_count', 'last_quote_date', 'days_since_quote', 'lines_bid', 'lines_won', 'win_rate', 'avg_rank']],
+        column_config={
+            "supplier": "Supplier",
+            "quote_count": "Quotes",
+            "last_quote_date": "Last Quote",
+            "days_since_quote": st.column_config.NumberColumn("Days Since Quote", format="%d"),
+            "lines_bid": "Lines Bid",
+            "lines_won": "Lines Won",
+            "win_rate": st.column_config.ProgressColumn("Win Rate", format="percent", min_value=0.0, max_value=1.0),
+            "avg_rank": st.column_config.NumberColumn("Avg. Price Rank", format="%.2f", help="1 = cheapest bid on the line")
+        },
+        hide_index=True,
+        use_container_width=True
+    )
+
+with st.expander("🔧 Maintenance"):
+    st.caption("Counters update automatically. Rebuild only after creating the tables on an existing database.")
+    if st.button("Rebuild Scorecard"):
+        with st.spinner("Rebuilding..."):
+            refresh_scorecard(supabase)
+        st.rerun()
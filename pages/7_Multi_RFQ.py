@@ -0,0 +1,154 @@
+import streamlit as st
+import altair as alt
+from logic.database import get_supabase, CLIENT_HASH_FUNCS
+from logic.analysis import fetch_candidate_quotes
+from logic.consolidate import build_consolidated_bid_tab, merge_rfq_lines
+from logic.fx import get_base_currency, load_fx_rates, latest_rates, normalize_quotes, format_money
+from logic.uom import load_uom_conversions
+from logic.quote_archive import quote_scope, scope_label
+
+st.set_page_config(page_title="Multi-RFQ Workspace", page_icon="🧺", layout="wide")
+
+st.title("🧺 Multi-RFQ Workspace")
+st.write("Combine several RFQs, group the items they share and compare quotes once per distinct item.")
+
+# Initialize client
+supabase = get_supabase()
+
+if not supabase:
+    st.warning("⚠️ Supabase is not configured. Please go to Settings.")
+    st.stop()
+
+@st.cache_data(ttl=60, show_spinner=False, hash_funcs=CLIENT_HASH_FUNCS)
+def load_candidate_quotes(client, names: tuple, since: str, include_archived: bool):
+    return fetch_candidate_quotes(client, names, since=since, include_archived=include_archived)
+
+base_currency = get_base_currency()
+fx_rates = latest_rates(load_fx_rates(supabase))
+scope = quote_scope()
+st.caption(f"{scope_label(*scope)}. Change the window in Settings.")
+
+# 1. SELECT RFQs
+try:
+    rfq_res = supabase.table('rfqs').select('*').order('created_at', desc=True).execute()
+    rfqs = [r for r in rfq_res.data if (r.get('parsed_json') or {}).get('items')]
+except Exception as e:
+    st.error(f"Error loading RFQs: {e}")
+    st.stop()
+
+if not rfqs:
+    st.warning("No RFQs with items found. Please import some in the RFQ Manager.")
+    st.stop()
+
+selected = st.multiselect(
+    "RFQs to combine",
+    options=rfqs,
+    format_func=lambda x: f"{x['parsed_json'].get('title', 'RFQ')} (#{x['id']} - {x['created_at'][:10]})" if 'title' in x['parsed_json'] else f"RFQ #{x['id']} - {x['created_at'][:16]}",
+    placeholder="Choose two or more RFQs..."
+)
+
+if not selected:
+    st.info("Select the RFQs to combine. Lines with the same item code, or the same name when there is no code, are grouped per unit.")
+    st.stop()
+
+# 2. ONE QUOTE LOAD FOR THE DISTINCT NAMES OF ALL LINES
+names = tuple(sorted(set(merge_rfq_lines(selected)['name'].dropna().astype(str).str.strip()) - {""}))
+with st.spinner(f"Loading quotes for {len(names)} distinct items..."):
+    try:
+        products_df, quotes_df = load_candidate_quotes(supabase, names, *scope)
+    except Exception as e:
+        st.error(f"Error loading quotes: {e}")
+        st.stop()
+
+quotes_df = normalize_quotes(quotes_df, base_currency, fx_rates)
+if not quotes_df.empty and quotes_df['price'].isna().any():
+    missing = sorted(quotes_df.loc[quotes_df['price'].isna(), 'original_currency'].unique())
+    st.warning(f"No FX rate for {', '.join(missing)}; those quotes are excluded. Add rates in Settings.")
+    quotes_df = quotes_df.dropna(subset=['price'])
+
+tab = build_consolidated_bid_tab(selected, products_df, quotes_df, load_uom_conversions(supabase))
+lines = tab["lines"]
+
+col_m1, col_m2, col_m3, col_m4 = st.columns(4)
+col_m1.metric("RFQ Lines", f"{len(tab['allocation']):,}", help=f"From {len(selected)} RFQs")
+col_m2.metric("Distinct Items", f"{len(lines):,}", delta=f"{len(lines) - len(tab['allocation']):,}", delta_color="off")
+col_m3.metric("Items with Bids", f"{(lines['bids'] > 0).sum()} / {len(lines)}")
+col_m4.metric("Best-Bid Total", format_money(lines['best_total'].sum(), base_currency))
+
+tab_items, tab_matrix, tab_suppliers, tab_rfqs = st.tabs(["📦 Consolidated Items", "📊 Unit Price Matrix", "🏭 Supplier Totals", "📋 Per RFQ"])
+
+with tab_items:
+    st.caption(f"One row per distinct item with the quantity summed over its RFQ lines, in {base_currency} per base unit.")
+    st.dataframe(
+        lines[['line', 'item_code', 'name', 'quantity', 'uom', 'rfqs', 'source_lines', 'bids', 'best_supplier', 'best_price', 'best_total', 'second_price', 'savings']],
+        column_config={
+            "line": "Item",
+            "quantity": st.column_config.NumberColumn("Total Qty", format="%.0f"),
+            "rfqs": "RFQs",
+            "source_lines": "Lines",
+            "best_price": st.column_config.NumberColumn("Best Price", format="%.0f"),
+            "best_total": st.column_config.NumberColumn("Extended Total", format="%.0f"),
+            "second_price": st.column_config.NumberColumn("2nd Best Price", format="%.0f"),
+            "savings": st.column_config.NumberColumn("Savings vs 2nd", format="%.0f")
+        },
+        hide_index=True,
+        use_container_width=True
+    )
+    shared = lines[lines['rfqs'] > 1]
+    if not shared.empty:
+        st.caption(f"{len(shared)} items appear in more than one RFQ.")
+
+with tab_matrix:
+    unit = tab["unit"]
+    if unit.empty:
+        st.warning("No quotes found for any item.")
+    else:
+        item_names = lines.set_index('line')['name'].astype(str).str[:40]
+        unit.index = [f"{i}. {item_names[i]}" for i in unit.index]
+        st.dataframe(
+            unit.style.highlight_min(axis=1, color="#c8e6c9").format("{:,.0f}", na_rep="-"),
+            use_container_width=True
+        )
+
+with tab_suppliers:
+    suppliers = tab["suppliers"]
+    if suppliers.empty:
+        st.warning("No quotes found for any item.")
+    else:
+        chart = alt.Chart(suppliers).mark_bar().encode(
+            x=alt.X('supplier', sort='-y', axis=alt.Axis(labelAngle=0, title="Supplier")),
+            y=alt.Y('lines_won', title='Items Won'),
+            tooltip=['supplier', 'lines_quoted', 'lines_won', 'won_total']
+        )
+        st.altair_chart(chart, use_container_width=True)
+        st.dataframe(suppliers.rename(columns={'lines_quoted': 'items_quoted', 'lines_won': 'items_won'}), hide_index=True, use_container_width=True)
+
+with tab_rfqs:
+    st.caption("Each RFQ line with its item's best bid, priced pro rata to its quantity.")
+    st.dataframe(
+        tab["rfqs"],
+        column_config={
+            "rfq_id": "RFQ", "rfq_title": "Title", "lines": "Lines", "lines_with_bid": "Lines with Bid",
+            "best_total": st.column_config.NumberColumn(f"Best-Bid Total ({base_currency})", format="%.0f")
+        },
+        hide_index=True,
+        use_container_width=True
+    )
+    allocation = tab["allocation"]
+    st.dataframe(
+        allocation,
+        column_config={
+            "rfq_id": "RFQ", "rfq_title": "Title", "rfq_line": "Line", "item": "Item",
+            "unit_price": st.column_config.NumberColumn("Unit Price", format="%.0f"),
+            "line_total": st.column_config.NumberColumn("Line Total", format="%.0f")
+        },
+        hide_index=True,
+        use_container_width=True
+    )
+    st.download_button(
+        label="💾 Download Allocation (CSV)",
+        data=allocation.to_csv(index=False).encode('utf-8'),
+        file_name=f"Multi_RFQ_{'_'.join(str(r['id']) for r in selected[:10])}.csv",
+        mime='text/csv',
+        on_click="ignore"
+    )
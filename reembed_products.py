@@ -0,0 +1,150 @@
+"""
+Backfills or rebuilds product embeddings.
+
+Scans `products` in id-ordered keyset pages, skips rows whose text hash and
+model are already current, embeds the rest in batches and writes them back in
+one upsert per page. Progress is checkpointed after each page, so an
+interrupted run resumes where it stopped.
+
+Usage:
+    python reembed_products.py                     # fill/refresh `embedding` in place
+    python reembed_products.py --shadow            # write to `embedding_next`, search keeps using `embedding`
+    python reembed_products.py --promote           # swap `embedding_next` into `embedding`
+    python reembed_products.py --reset             # ignore the checkpoint and start over
+"""
+import os
+import json
+import time
+import argparse
+from logic.database import get_supabase, TABLE_PRODUCTS
+from logic.parser import EMBEDDING_MODEL, generate_embeddings
+from logic.embeddings import (
+    product_embedding_text, embedding_hash, needs_embedding, get_product_cache, cache_key
+)
+
+CHECKPOINT_PATH = os.path.join(".cache", "reembed_checkpoint.json")
+
+def load_checkpoint(path, prefix):
+    """
+    Returns the saved progress if it belongs to the same target and model.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        state = json.load(f)
+    if state.get("prefix") != prefix or state.get("model") != EMBEDDING_MODEL:
+        print("Checkpoint is for a different target/model, starting over.")
+        return None
+    return state
+
+def save_checkpoint(path, state):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+def embed_with_retry(texts, retries=3):
+    """
+    Embeds a batch, backing off on transient API errors.
+    """
+    for attempt in range(retries):
+        try:
+            return generate_embeddings(texts)
+        except Exception as e:
+            if attempt == retries - 1:
+                raise
+            wait = 2 ** attempt
+            print(f"Embedding batch failed ({e}), retrying in {wait}s...")
+            time.sleep(wait)
+
+def run_backfill(supabase, prefix, page_size, batch_size, checkpoint_path, force=False):
+    state = load_checkpoint(checkpoint_path, prefix) or {
+        "prefix": prefix, "model": EMBEDDING_MODEL, "last_id": 0, "embedded": 0, "skipped": 0
+    }
+    if state["last_id"]:
+        print(f"Resuming after product #{state['last_id']}.")
+
+    columns = f"id, name, description, specs, {prefix}_hash, {prefix}_model"
+    while True:
+        rows = supabase.table(TABLE_PRODUCTS).select(columns) \
+            .gt('id', state["last_id"]).order('id').limit(page_size).execute().data
+        if not rows:
+            break
+
+        pending = []
+        for row in rows:
+            text = product_embedding_text(row['name'], row.get('description'), row.get('specs'))
+            text_hash = embedding_hash(text)
+            if force or needs_embedding(row, text_hash, prefix=prefix):
+                pending.append((row, text, text_hash))
+        state["skipped"] += len(rows) - len(pending)
+
+        # Identical text embedded earlier (here or in Log Quote) comes from the local cache
+        cache = get_product_cache()
+        cached, to_embed = [], []
+        for row, text, text_hash in pending:
+            vector = None if force else cache.get(cache_key(text_hash))
+            if vector is not None:
+                cached.append((row, text_hash, vector))
+            else:
+                to_embed.append((row, text, text_hash))
+
+        for start in range(0, len(to_embed), batch_size):
+            batch = to_embed[start:start + batch_size]
+            vectors = embed_with_retry([text for _, text, _ in batch])
+            for (row, _, text_hash), vector in zip(batch, vectors):
+                cache.put(cache_key(text_hash), vector)
+                cached.append((row, text_hash, vector))
+
+        updates = []
+        for row, text_hash, vector in cached:
+            updates.append({
+                "id": row['id'],
+                "name": row['name'],
+                prefix: vector,
+                f"{prefix}_hash": text_hash,
+                f"{prefix}_model": EMBEDDING_MODEL
+            })
+
+        if updates:
+            supabase.table(TABLE_PRODUCTS).upsert(updates, on_conflict='id').execute()
+        state["embedded"] += len(updates)
+        state["last_id"] = rows[-1]['id']
+        save_checkpoint(checkpoint_path, state)
+        print(f"Up to product #{state['last_id']}: {state['embedded']} embedded, {state['skipped']} unchanged.")
+
+    print(f"✅ Done. {state['embedded']} embedded, {state['skipped']} unchanged.")
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill or rebuild product embeddings.")
+    parser.add_argument("--shadow", action="store_true", help="Write into embedding_next instead of embedding")
+    parser.add_argument("--promote", action="store_true", help="Swap embedding_next into embedding and exit")
+    parser.add_argument("--force", action="store_true", help="Re-embed even when hash and model are unchanged")
+    parser.add_argument("--reset", action="store_true", help="Discard the checkpoint and start from the first product")
+    parser.add_argument("--page-size", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=100, help="Texts per embedding request")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH)
+    args = parser.parse_args()
+
+    supabase = get_supabase()
+    if not supabase:
+        print("❌ Supabase is not configured (set SUPABASE_URL and SUPABASE_ANON_KEY).")
+        return
+
+    if args.promote:
+        promoted = supabase.rpc('promote_embedding_shadow', {}).execute().data
+        print(f"✅ Promoted {promoted} shadow embeddings.")
+        return
+
+    if args.reset and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
+    prefix = "embedding_next" if args.shadow else "embedding"
+    print(f"Embedding products into '{prefix}' with {EMBEDDING_MODEL}.")
+    run_backfill(supabase, prefix, args.page_size, args.batch_size, args.checkpoint, force=args.force)
+
+if __name__ == "__main__":
+    main()
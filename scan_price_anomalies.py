@@ -0,0 +1,50 @@
+"""
+Table-wide price anomaly scan.
+
+Streams quotes in pages of complete products, flags outliers per product
+(z-score / IQR, see logic.price_history) and writes the flagged quotes to CSV.
+Memory stays bounded by the page size regardless of table size.
+
+Usage:
+    python scan_price_anomalies.py
+    python scan_price_anomalies.py --base USD --z 3 --out anomalies.csv
+"""
+import time
+import argparse
+from logic.database import get_supabase
+from logic.fx import load_fx_rates, latest_rates
+from logic.price_history import iter_quote_history, compute_price_flags
+
+OUTPUT_COLUMNS = ["id", "product_id", "supplier_id", "quote_date", "currency", "price", "cmp_price",
+                  "product_median", "ratio_to_median", "z_score", "z_outlier", "iqr_outlier"]
+
+def main():
+    parser = argparse.ArgumentParser(description="Flag anomalous quote prices across the whole quotes table.")
+    parser.add_argument("--base", default="USD", help="Currency to compare prices in")
+    parser.add_argument("--z", type=float, default=3.0, help="Z-score threshold")
+    parser.add_argument("--iqr-k", type=float, default=1.5, help="IQR fence multiplier")
+    parser.add_argument("--page-size", type=int, default=5000)
+    parser.add_argument("--out", default="price_anomalies.csv")
+    args = parser.parse_args()
+
+    supabase = get_supabase()
+    if not supabase:
+        print("❌ Supabase is not configured (set SUPABASE_URL and SUPABASE_ANON_KEY).")
+        return
+
+    rates = latest_rates(load_fx_rates(supabase))
+    start = time.perf_counter()
+    scanned = flagged = 0
+    with open(args.out, "w", newline="") as f:
+        for i, chunk in enumerate(iter_quote_history(supabase, page_size=args.page_size)):
+            flags = compute_price_flags(chunk, args.base, rates, z_threshold=args.z, iqr_k=args.iqr_k)
+            hits = flags.loc[flags["is_outlier"], OUTPUT_COLUMNS]
+            hits.to_csv(f, header=(i == 0), index=False)
+            scanned += len(chunk)
+            flagged += len(hits)
+            print(f"  {scanned:,} quotes scanned, {flagged:,} flagged", end="\r")
+
+    print(f"\n✅ {flagged:,} of {scanned:,} quotes flagged in {time.perf_counter() - start:.1f}s -> {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,11 @@ CREATE TABLE IF NOT EXISTS products (
     description TEXT,
     specs TEXT,
     embedding vector(768), -- Gemini 2.0 Flash embedding dimension
+    embedding_hash TEXT, -- SHA-256 of the embedded text (name + description + specs)
+    embedding_model TEXT, -- Model that produced `embedding`
+    embedding_next vector(768), -- Shadow column filled by reembed_products.py during a model change
+    embedding_next_hash TEXT,
+    embedding_next_model TEXT,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -30,6 +35,9 @@ CREATE TABLE IF NOT EXISTS quotes (
     source_url TEXT, -- Link to the supplier/product page
     note TEXT,
     quote_date DATE DEFAULT CURRENT_DATE,
+    base_uom TEXT, -- Canonical base unit the quote converts to (e.g. EA, KG, L)
+    uom_factor NUMERIC(18, 6), -- Base units per quoted unit (e.g. 12 for a box of 12)
+    unit_price_base NUMERIC(18, 6), -- price / uom_factor, in the quote currency
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -40,3 +48,543 @@ CREATE TABLE IF NOT EXISTS rfqs (
     parsed_json JSONB,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
+
+-- FX Rates (1 unit of `currency` = `rate_to_usd` USD on `rate_date`)
+CREATE TABLE IF NOT EXISTS fx_rates (
+    id SERIAL PRIMARY KEY,
+    currency TEXT NOT NULL,
+    rate_date DATE NOT NULL DEFAULT CURRENT_DATE,
+    rate_to_usd NUMERIC(20, 10) NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (currency, rate_date)
+);
+
+-- Pack sizes (1 `uom` = `factor` x `base_uom`), optionally scoped to a product and/or supplier
+CREATE TABLE IF NOT EXISTS uom_conversions (
+    id SERIAL PRIMARY KEY,
+    product_id INTEGER REFERENCES products(id) ON DELETE CASCADE,
+    supplier_id INTEGER REFERENCES suppliers(id) ON DELETE CASCADE,
+    uom TEXT NOT NULL,
+    base_uom TEXT NOT NULL,
+    factor NUMERIC(18, 6) NOT NULL CHECK (factor > 0),
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+CREATE UNIQUE INDEX IF NOT EXISTS uom_conversions_scope_idx
+    ON uom_conversions (COALESCE(product_id, 0), COALESCE(supplier_id, 0), uom);
+
+-- Upgrade path for databases created before embedding tracking
+ALTER TABLE products ADD COLUMN IF NOT EXISTS embedding_hash TEXT;
+ALTER TABLE products ADD COLUMN IF NOT EXISTS embedding_model TEXT;
+ALTER TABLE products ADD COLUMN IF NOT EXISTS embedding_next vector(768);
+ALTER TABLE products ADD COLUMN IF NOT EXISTS embedding_next_hash TEXT;
+ALTER TABLE products ADD COLUMN IF NOT EXISTS embedding_next_model TEXT;
+
+-- Upgrade path for databases created before UOM normalization
+ALTER TABLE quotes ADD COLUMN IF NOT EXISTS base_uom TEXT;
+ALTER TABLE quotes ADD COLUMN IF NOT EXISTS uom_factor NUMERIC(18, 6);
+ALTER TABLE quotes ADD COLUMN IF NOT EXISTS unit_price_base NUMERIC(18, 6);
+
+-- Exact-duplicate lookup when a "new" product is logged
+CREATE INDEX IF NOT EXISTS products_embedding_hash_idx ON products (embedding_hash);
+
+-- Semantic search helper used by the Log Quote page.
+-- Reads only `embedding`, so a re-embed into `embedding_next` never disturbs search.
+CREATE OR REPLACE FUNCTION match_products(
+    query_embedding vector(768),
+    match_threshold FLOAT,
+    match_count INT
+)
+RETURNS TABLE (id INT, name TEXT, description TEXT, specs TEXT, similarity FLOAT)
+LANGUAGE sql STABLE
+AS $$
+    SELECT p.id, p.name, p.description, p.specs,
+           1 - (p.embedding <=> query_embedding) AS similarity
+    FROM products p
+    WHERE p.embedding IS NOT NULL
+      AND 1 - (p.embedding <=> query_embedding) > match_threshold
+    ORDER BY p.embedding <=> query_embedding
+    LIMIT match_count;
+$$;
+
+-- Swaps the shadow embeddings in once a re-embed run has completed.
+-- If the new model has a different dimension, ALTER both columns to the new
+-- vector(n) size before backfilling and recreate match_products accordingly.
+CREATE OR REPLACE FUNCTION promote_embedding_shadow()
+RETURNS INT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    promoted INT;
+BEGIN
+    UPDATE products
+    SET embedding = embedding_next,
+        embedding_hash = embedding_next_hash,
+        embedding_model = embedding_next_model,
+        embedding_next = NULL,
+        embedding_next_hash = NULL,
+        embedding_next_model = NULL
+    WHERE embedding_next IS NOT NULL;
+    GET DIAGNOSTICS promoted = ROW_COUNT;
+    RETURN promoted;
+END;
+$$;
+
+-- Per-product price aggregates, kept current by triggers on `quotes`.
+-- supplier_id NULL = across all suppliers. Prices use unit_price_base when known.
+CREATE TABLE IF NOT EXISTS product_price_stats (
+    id SERIAL PRIMARY KEY,
+    product_id INTEGER NOT NULL REFERENCES products(id) ON DELETE CASCADE,
+    supplier_id INTEGER REFERENCES suppliers(id) ON DELETE CASCADE,
+    currency TEXT NOT NULL,
+    quote_count INTEGER NOT NULL,
+    min_price NUMERIC(18, 6),
+    max_price NUMERIC(18, 6),
+    median_price NUMERIC(18, 6),
+    avg_price NUMERIC(18, 6),
+    latest_price NUMERIC(18, 6),
+    latest_date DATE,
+    refreshed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+CREATE UNIQUE INDEX IF NOT EXISTS product_price_stats_scope_idx
+    ON product_price_stats (product_id, COALESCE(supplier_id, 0), currency);
+
+-- Recomputes stats for the given products (all products when NULL).
+-- For a periodic full refresh: SELECT cron.schedule('0 2 * * *', 'SELECT refresh_product_price_stats()');
+CREATE OR REPLACE FUNCTION refresh_product_price_stats(p_product_ids INT[] DEFAULT NULL)
+RETURNS INT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    refreshed INT;
+    lock_class CONSTANT INT := hashtext('product_price_stats');
+BEGIN
+    -- Concurrent refreshes of a product would each delete only the rows they can
+    -- see and then both insert, failing on product_price_stats_scope_idx. Serialize
+    -- them per product (ids in order, so two statements never deadlock); a full
+    -- refresh takes key 0 exclusively, partial ones share it.
+    IF p_product_ids IS NULL THEN
+        PERFORM pg_advisory_xact_lock(lock_class, 0);
+    ELSE
+        PERFORM pg_advisory_xact_lock_shared(lock_class, 0);
+        PERFORM pg_advisory_xact_lock(lock_class, id)
+        FROM (SELECT DISTINCT unnest(p_product_ids) AS id ORDER BY 1) ids;
+    END IF;
+
+    DELETE FROM product_price_stats
+    WHERE p_product_ids IS NULL OR product_id = ANY(p_product_ids);
+
+    INSERT INTO product_price_stats (
+        product_id, supplier_id, currency, quote_count, min_price, max_price,
+        median_price, avg_price, latest_price, latest_date
+    )
+    SELECT
+        q.product_id,
+        q.supplier_id,
+        q.currency,
+        COUNT(*),
+        MIN(COALESCE(q.unit_price_base, q.price)),
+        MAX(COALESCE(q.unit_price_base, q.price)),
+        percentile_cont(0.5) WITHIN GROUP (ORDER BY COALESCE(q.unit_price_base, q.price)),
+        AVG(COALESCE(q.unit_price_base, q.price)),
+        (array_agg(COALESCE(q.unit_price_base, q.price) ORDER BY q.quote_date DESC, q.created_at DESC))[1],
+        MAX(q.quote_date)
+    FROM quotes q
+    WHERE q.product_id IS NOT NULL
+      AND q.supplier_id IS NOT NULL
+      AND (p_product_ids IS NULL OR q.product_id = ANY(p_product_ids))
+    GROUP BY GROUPING SETS ((q.product_id, q.currency), (q.product_id, q.supplier_id, q.currency));
+
+    GET DIAGNOSTICS refreshed = ROW_COUNT;
+    RETURN refreshed;
+END;
+$$;
+
+-- Statement-level triggers: one refresh per statement for the products it touched
+CREATE OR REPLACE FUNCTION quotes_refresh_price_stats()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM refresh_product_price_stats(ARRAY(SELECT DISTINCT product_id FROM new_rows WHERE product_id IS NOT NULL));
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM refresh_product_price_stats(ARRAY(SELECT DISTINCT product_id FROM old_rows WHERE product_id IS NOT NULL));
+    ELSE
+        PERFORM refresh_product_price_stats(ARRAY(
+            SELECT product_id FROM new_rows WHERE product_id IS NOT NULL
+            UNION
+            SELECT product_id FROM old_rows WHERE product_id IS NOT NULL
+        ));
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS quotes_price_stats_insert ON quotes;
+CREATE TRIGGER quotes_price_stats_insert AFTER INSERT ON quotes
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION quotes_refresh_price_stats();
+
+DROP TRIGGER IF EXISTS quotes_price_stats_update ON quotes;
+CREATE TRIGGER quotes_price_stats_update AFTER UPDATE ON quotes
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION quotes_refresh_price_stats();
+
+DROP TRIGGER IF EXISTS quotes_price_stats_delete ON quotes;
+CREATE TRIGGER quotes_price_stats_delete AFTER DELETE ON quotes
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION quotes_refresh_price_stats();
+
+-- Winning quote per RFQ line, saved from Finalization
+CREATE TABLE IF NOT EXISTS awards (
+    id SERIAL PRIMARY KEY,
+    rfq_id INTEGER NOT NULL REFERENCES rfqs(id) ON DELETE CASCADE,
+    line_no INTEGER NOT NULL,
+    item_name TEXT,
+    quote_id INTEGER REFERENCES quotes(id) ON DELETE SET NULL,
+    supplier_id INTEGER REFERENCES suppliers(id) ON DELETE SET NULL,
+    qty NUMERIC(18, 6),
+    unit_price NUMERIC(18, 6),
+    line_total NUMERIC(18, 6),
+    currency TEXT,
+    awarded_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (rfq_id, line_no)
+);
+
+-- Every supplier that bid on an awarded line with its price rank (1 = cheapest)
+CREATE TABLE IF NOT EXISTS award_bids (
+    rfq_id INTEGER NOT NULL REFERENCES rfqs(id) ON DELETE CASCADE,
+    line_no INTEGER NOT NULL,
+    supplier_id INTEGER NOT NULL REFERENCES suppliers(id) ON DELETE CASCADE,
+    rank INTEGER NOT NULL,
+    won BOOLEAN NOT NULL DEFAULT FALSE,
+    PRIMARY KEY (rfq_id, line_no, supplier_id)
+);
+
+-- Running supplier KPIs, adjusted by triggers on quotes and award_bids
+CREATE TABLE IF NOT EXISTS supplier_scorecard (
+    supplier_id INTEGER PRIMARY KEY REFERENCES suppliers(id) ON DELETE CASCADE,
+    quote_count INTEGER NOT NULL DEFAULT 0,
+    last_quote_date DATE,
+    lines_bid INTEGER NOT NULL DEFAULT 0,
+    lines_won INTEGER NOT NULL DEFAULT 0,
+    rank_sum BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS quotes_supplier_date_idx ON quotes (supplier_id, quote_date);
+
+CREATE OR REPLACE FUNCTION quotes_update_scorecard()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    -- Quotes moved by archive_quotes() still count towards the scorecard
+    IF current_setting('procuremind.archiving', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        UPDATE supplier_scorecard s
+        SET quote_count = s.quote_count - d.n, updated_at = CURRENT_TIMESTAMP
+        FROM (SELECT supplier_id, COUNT(*) AS n FROM old_rows WHERE supplier_id IS NOT NULL GROUP BY supplier_id) d
+        WHERE s.supplier_id = d.supplier_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO supplier_scorecard (supplier_id, quote_count, last_quote_date)
+        SELECT supplier_id, COUNT(*), MAX(quote_date) FROM new_rows WHERE supplier_id IS NOT NULL GROUP BY supplier_id
+        ON CONFLICT (supplier_id) DO UPDATE SET
+            quote_count = supplier_scorecard.quote_count + EXCLUDED.quote_count,
+            last_quote_date = GREATEST(supplier_scorecard.last_quote_date, EXCLUDED.last_quote_date),
+            updated_at = CURRENT_TIMESTAMP;
+    END IF;
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        -- A removed or re-dated quote may have been the latest one
+        UPDATE supplier_scorecard s
+        SET last_quote_date = (SELECT MAX(q.quote_date) FROM quotes q WHERE q.supplier_id = s.supplier_id)
+        WHERE s.supplier_id IN (SELECT supplier_id FROM old_rows);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS quotes_scorecard_insert ON quotes;
+CREATE TRIGGER quotes_scorecard_insert AFTER INSERT ON quotes
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION quotes_update_scorecard();
+
+DROP TRIGGER IF EXISTS quotes_scorecard_update ON quotes;
+CREATE TRIGGER quotes_scorecard_update AFTER UPDATE ON quotes
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION quotes_update_scorecard();
+
+DROP TRIGGER IF EXISTS quotes_scorecard_delete ON quotes;
+CREATE TRIGGER quotes_scorecard_delete AFTER DELETE ON quotes
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION quotes_update_scorecard();
+
+CREATE OR REPLACE FUNCTION award_bids_update_scorecard()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        UPDATE supplier_scorecard s
+        SET lines_bid = s.lines_bid - d.n, lines_won = s.lines_won - d.won, rank_sum = s.rank_sum - d.ranks,
+            updated_at = CURRENT_TIMESTAMP
+        FROM (
+            SELECT supplier_id, COUNT(*) AS n, COUNT(*) FILTER (WHERE won) AS won, SUM(rank) AS ranks
+            FROM old_rows GROUP BY supplier_id
+        ) d
+        WHERE s.supplier_id = d.supplier_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO supplier_scorecard (supplier_id, lines_bid, lines_won, rank_sum)
+        SELECT supplier_id, COUNT(*), COUNT(*) FILTER (WHERE won), SUM(rank) FROM new_rows GROUP BY supplier_id
+        ON CONFLICT (supplier_id) DO UPDATE SET
+            lines_bid = supplier_scorecard.lines_bid + EXCLUDED.lines_bid,
+            lines_won = supplier_scorecard.lines_won + EXCLUDED.lines_won,
+            rank_sum = supplier_scorecard.rank_sum + EXCLUDED.rank_sum,
+            updated_at = CURRENT_TIMESTAMP;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS award_bids_scorecard_insert ON award_bids;
+CREATE TRIGGER award_bids_scorecard_insert AFTER INSERT ON award_bids
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION award_bids_update_scorecard();
+
+DROP TRIGGER IF EXISTS award_bids_scorecard_update ON award_bids;
+CREATE TRIGGER award_bids_scorecard_update AFTER UPDATE ON award_bids
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION award_bids_update_scorecard();
+
+DROP TRIGGER IF EXISTS award_bids_scorecard_delete ON award_bids;
+CREATE TRIGGER award_bids_scorecard_delete AFTER DELETE ON award_bids
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION award_bids_update_scorecard();
+
+-- Full rebuild, e.g. after creating these tables on an existing database
+CREATE OR REPLACE FUNCTION refresh_supplier_scorecard()
+RETURNS INT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    refreshed INT;
+BEGIN
+    DELETE FROM supplier_scorecard;
+    INSERT INTO supplier_scorecard (supplier_id, quote_count, last_quote_date, lines_bid, lines_won, rank_sum)
+    SELECT
+        s.id,
+        COALESCE(q.n, 0), q.last_date,
+        COALESCE(b.n, 0), COALESCE(b.won, 0), COALESCE(b.ranks, 0)
+    FROM suppliers s
+    LEFT JOIN (
+        SELECT supplier_id, COUNT(*) AS n, MAX(quote_date) AS last_date
+        FROM (SELECT supplier_id, quote_date FROM quotes UNION ALL SELECT supplier_id, quote_date FROM quotes_archive) all_quotes
+        GROUP BY supplier_id
+    ) q
+        ON q.supplier_id = s.id
+    LEFT JOIN (
+        SELECT supplier_id, COUNT(*) AS n, COUNT(*) FILTER (WHERE won) AS won, SUM(rank) AS ranks
+        FROM award_bids GROUP BY supplier_id
+    ) b ON b.supplier_id = s.id;
+    GET DIAGNOSTICS refreshed = ROW_COUNT;
+    RETURN refreshed;
+END;
+$$;
+
+-- Moves serial sequences past the highest id, e.g. after restoring a snapshot with explicit ids
+CREATE OR REPLACE FUNCTION sync_id_sequences()
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['suppliers', 'products', 'rfqs', 'quotes'] LOOP
+        EXECUTE format(
+            'SELECT setval(pg_get_serial_sequence(%L, ''id''), COALESCE((SELECT MAX(id) FROM %I), 0) + 1, false)',
+            t, t
+        );
+    END LOOP;
+    -- Archived quotes keep their ids
+    PERFORM setval(pg_get_serial_sequence('quotes', 'id'),
+                   GREATEST((SELECT MAX(id) FROM quotes), (SELECT MAX(id) FROM quotes_archive), 0) + 1, false);
+END;
+$$;
+
+-- Change tracking for the local catalog mirror (logic/mirror.py): rows changed since a
+-- watermark are found by `updated_at`, deletes are recorded in `deleted_rows`
+ALTER TABLE suppliers ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP;
+ALTER TABLE products ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP;
+ALTER TABLE quotes ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP;
+
+CREATE INDEX IF NOT EXISTS suppliers_updated_idx ON suppliers (updated_at, id);
+CREATE INDEX IF NOT EXISTS products_updated_idx ON products (updated_at, id);
+CREATE INDEX IF NOT EXISTS quotes_updated_idx ON quotes (updated_at, id);
+
+CREATE TABLE IF NOT EXISTS deleted_rows (
+    id BIGSERIAL PRIMARY KEY,
+    table_name TEXT NOT NULL,
+    row_id INTEGER NOT NULL,
+    deleted_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS deleted_rows_table_idx ON deleted_rows (table_name, id);
+-- Mirror syncs re-read tombstones from a recent window (MIRROR_SYNC_OVERLAP)
+CREATE INDEX IF NOT EXISTS deleted_rows_table_time_idx ON deleted_rows (table_name, deleted_at);
+
+CREATE OR REPLACE FUNCTION touch_updated_at()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    NEW.updated_at := CURRENT_TIMESTAMP;
+    RETURN NEW;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION record_deleted_rows()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO deleted_rows (table_name, row_id)
+    SELECT TG_TABLE_NAME, id FROM old_rows;
+    RETURN NULL;
+END;
+$$;
+
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['suppliers', 'products', 'quotes'] LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', t || '_touch_updated_at', t);
+        EXECUTE format(
+            'CREATE TRIGGER %I BEFORE UPDATE ON %I FOR EACH ROW EXECUTE FUNCTION touch_updated_at()',
+            t || '_touch_updated_at', t
+        );
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', t || '_record_deleted', t);
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER DELETE ON %I REFERENCING OLD TABLE AS old_rows '
+            'FOR EACH STATEMENT EXECUTE FUNCTION record_deleted_rows()',
+            t || '_record_deleted', t
+        );
+    END LOOP;
+END;
+$$;
+
+-- Item-level RFQ edits with an optimistic version check (logic/rfqs.py). `p_changes` is
+-- {"set": {"<index>": {field: value}}, "remove": [index, ...], "append": [item, ...], "title": "..."};
+-- indexes refer to the items as of `p_version`. Returns the new version, or NULL when the
+-- RFQ was changed (or deleted) since that version was read.
+ALTER TABLE rfqs ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;
+
+CREATE OR REPLACE FUNCTION patch_rfq_items(p_rfq_id INTEGER, p_version INTEGER, p_changes JSONB)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    doc JSONB;
+    items JSONB;
+    patched JSONB := '[]'::jsonb;
+    i INTEGER;
+BEGIN
+    SELECT COALESCE(parsed_json, '{}'::jsonb) INTO doc
+    FROM rfqs WHERE id = p_rfq_id AND version = p_version
+    FOR UPDATE;
+    IF NOT FOUND THEN
+        RETURN NULL;
+    END IF;
+
+    items := COALESCE(doc->'items', '[]'::jsonb);
+    FOR i IN 0 .. jsonb_array_length(items) - 1 LOOP
+        CONTINUE WHEN COALESCE(p_changes->'remove' @> to_jsonb(i), FALSE);
+        patched := patched || jsonb_build_array(items->i || COALESCE(p_changes->'set'->(i::text), '{}'::jsonb));
+    END LOOP;
+    doc := jsonb_set(doc, '{items}', patched || COALESCE(p_changes->'append', '[]'::jsonb));
+    IF p_changes ? 'title' THEN
+        doc := jsonb_set(doc, '{title}', p_changes->'title');
+    END IF;
+
+    -- Awards are keyed by 1-based line position: removed lines lose theirs and
+    -- later lines move up. Negated first so UNIQUE (rfq_id, line_no) never collides.
+    IF jsonb_array_length(COALESCE(p_changes->'remove', '[]'::jsonb)) > 0 THEN
+        DELETE FROM award_bids WHERE rfq_id = p_rfq_id AND p_changes->'remove' @> to_jsonb(line_no - 1);
+        DELETE FROM awards WHERE rfq_id = p_rfq_id AND p_changes->'remove' @> to_jsonb(line_no - 1);
+        UPDATE award_bids b SET line_no = -(b.line_no - (
+            SELECT COUNT(*) FROM jsonb_array_elements_text(p_changes->'remove') r WHERE r::int < b.line_no - 1
+        )) WHERE rfq_id = p_rfq_id;
+        UPDATE award_bids SET line_no = -line_no WHERE rfq_id = p_rfq_id;
+        UPDATE awards a SET line_no = -(a.line_no - (
+            SELECT COUNT(*) FROM jsonb_array_elements_text(p_changes->'remove') r WHERE r::int < a.line_no - 1
+        )) WHERE rfq_id = p_rfq_id;
+        UPDATE awards SET line_no = -line_no WHERE rfq_id = p_rfq_id;
+    END IF;
+
+    UPDATE rfqs SET parsed_json = doc, version = version + 1 WHERE id = p_rfq_id;
+    RETURN p_version + 1;
+END;
+$$;
+
+-- Hot/cold quotes (logic/quote_archive.py): `quotes` keeps recent history and
+-- `quotes_archive` the rest, with the same ids. Reads default to a recency window
+-- on `quotes`; archived quotes are only read when a user opts in.
+CREATE TABLE IF NOT EXISTS quotes_archive (
+    id INTEGER PRIMARY KEY, -- Same id it had in `quotes`
+    product_id INTEGER REFERENCES products(id),
+    supplier_id INTEGER REFERENCES suppliers(id),
+    price DECIMAL(12, 2) NOT NULL,
+    currency TEXT,
+    uom TEXT,
+    source_url TEXT,
+    note TEXT,
+    quote_date DATE,
+    base_uom TEXT,
+    uom_factor NUMERIC(18, 6),
+    unit_price_base NUMERIC(18, 6),
+    created_at TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE,
+    archived_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS quotes_product_date_idx ON quotes (product_id, quote_date);
+CREATE INDEX IF NOT EXISTS quotes_archive_product_date_idx ON quotes_archive (product_id, quote_date);
+
+-- Moves up to `p_batch` quotes dated before `p_before` into the archive, oldest first,
+-- and returns how many moved; call until it returns less than `p_batch`.
+-- Quotes an award points at stay hot. Supplier scorecards keep counting archived
+-- quotes (see quotes_update_scorecard); product_price_stats follow `quotes`.
+-- Monthly, e.g.: SELECT cron.schedule('0 3 1 * *', $$SELECT archive_quotes((CURRENT_DATE - INTERVAL '24 months')::date, 1000000)$$);
+CREATE OR REPLACE FUNCTION archive_quotes(p_before DATE, p_batch INT DEFAULT 5000)
+RETURNS INT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    moved INT;
+BEGIN
+    PERFORM set_config('procuremind.archiving', 'on', true);
+    WITH batch AS (
+        SELECT q.id FROM quotes q
+        WHERE q.quote_date < p_before
+          AND NOT EXISTS (SELECT 1 FROM awards a WHERE a.quote_id = q.id)
+        ORDER BY q.quote_date, q.id
+        LIMIT p_batch
+    ), moved_rows AS (
+        DELETE FROM quotes q USING batch WHERE q.id = batch.id
+        RETURNING q.*
+    )
+    INSERT INTO quotes_archive (
+        id, product_id, supplier_id, price, currency, uom, source_url, note, quote_date,
+        base_uom, uom_factor, unit_price_base, created_at, updated_at
+    )
+    SELECT id, product_id, supplier_id, price, currency, uom, source_url, note, quote_date,
+           base_uom, uom_factor, unit_price_base, created_at, updated_at
+    FROM moved_rows;
+    GET DIAGNOSTICS moved = ROW_COUNT;
+    PERFORM set_config('procuremind.archiving', 'off', true);
+    RETURN moved;
+END;
+$$;
@@ -0,0 +1,66 @@
+"""
+Parquet snapshots of suppliers, products (with embeddings), rfqs and quotes.
+
+Export streams each table in keyset pages; restore streams the files back into
+Supabase, a Postgres database (COPY) or a SQLite file.
+
+Usage:
+    python snapshot.py export --out snapshots/2024-06-01
+    python snapshot.py restore --from snapshots/2024-06-01 --target sqlite --path dev.db
+    python snapshot.py restore --from snapshots/2024-06-01 --target postgres --dsn postgresql://localhost/procuremind
+    python snapshot.py restore --from snapshots/2024-06-01 --target supabase
+"""
+import time
+import argparse
+from logic.database import get_supabase
+from logic.snapshot import export_snapshot, restore_snapshot, SupabaseTarget, PostgresTarget, SQLiteTarget
+
+def report(table, count):
+    print(f"  {table}: {count:,} rows", end="\r")
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or restore a Parquet snapshot of the procurement database.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    exp = sub.add_parser("export", help="Write the Supabase tables to Parquet files")
+    exp.add_argument("--out", required=True, help="Snapshot directory")
+    exp.add_argument("--page-size", type=int, default=1000)
+
+    res = sub.add_parser("restore", help="Load a snapshot into a database")
+    res.add_argument("--from", dest="source", required=True, help="Snapshot directory")
+    res.add_argument("--target", choices=["supabase", "postgres", "sqlite"], required=True)
+    res.add_argument("--dsn", help="Postgres connection string (postgres target)")
+    res.add_argument("--path", default="procuremind.db", help="SQLite file (sqlite target)")
+    res.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == "export":
+        supabase = get_supabase()
+        if not supabase:
+            print("❌ Supabase is not configured (set SUPABASE_URL and SUPABASE_ANON_KEY).")
+            return
+        counts = export_snapshot(supabase, args.out, page_size=args.page_size, progress=report)
+    else:
+        if args.target == "supabase":
+            supabase = get_supabase()
+            if not supabase:
+                print("❌ Supabase is not configured (set SUPABASE_URL and SUPABASE_ANON_KEY).")
+                return
+            target = SupabaseTarget(supabase)
+        elif args.target == "postgres":
+            if not args.dsn:
+                print("❌ --dsn is required for the postgres target.")
+                return
+            target = PostgresTarget(args.dsn)
+        else:
+            target = SQLiteTarget(args.path)
+        counts = restore_snapshot(args.source, target, batch_size=args.batch_size, progress=report)
+
+    print()
+    for table, count in counts.items():
+        print(f"  {table}: {count:,} rows")
+    print(f"✅ {args.command.capitalize()} finished in {time.perf_counter() - start:.1f}s.")
+
+if __name__ == "__main__":
+    main()